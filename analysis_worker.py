@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import traceback
+import multiprocessing
+from datetime import datetime
+
+# 将项目根目录和src目录添加到系统路径
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(os.path.join(os.path.abspath(os.path.dirname(__file__)), 'src'))
+
+from job_queue import JobQueue
+from news_priority import NewsPriorityScorer
+from trading_calendar import get_calendar
+from metrics import timer, inc, configure_metrics, write_textfile
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler("analysis_worker.log"),
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("AnalysisWorker")
+
+def load_queue_config(config_file="config.json"):
+    """
+    读取分析任务队列配置（config.json 的 analysis_queue 部分）
+
+    返回:
+    合并了默认值的配置字典
+    """
+    queue_config = {
+        "db_file": "data/job_queue.db",
+        "workers": 2,
+        "max_attempts": 3,
+        "lease_seconds": 1800,
+        "retry_delay_seconds": 60,
+        "poll_seconds": 5
+    }
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                queue_config.update(json.load(f).get("analysis_queue", {}))
+    except Exception as e:
+        logger.error(f"加载任务队列配置时出错: {str(e)}，使用默认配置")
+    return queue_config
+
+def create_job_queue(config_file="config.json"):
+    """根据配置创建任务队列"""
+    queue_config = load_queue_config(config_file)
+    return JobQueue(
+        queue_config["db_file"],
+        max_attempts=queue_config["max_attempts"],
+        lease_seconds=queue_config["lease_seconds"]
+    )
+
+class AnalysisWorker:
+    def __init__(self, config_file="config.json", worker_id=None):
+        """
+        初始化分析工作进程
+
+        参数:
+        config_file: 配置文件路径
+        worker_id: 工作进程标识，默认为 主机名-进程号
+        """
+        self.config = load_queue_config(config_file)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        # 每个工作进程写入单独的指标文件
+        configure_metrics(config_file, process_name=f"worker-{os.getpid()}")
+        self.job_queue = create_job_queue(config_file)
+        self.priority_scorer = NewsPriorityScorer(config_file)
+        self.calendar = get_calendar(config_file)
+        self.prewarmed_day = None
+        self.output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        self.current_analyses = []
+
+        # 分析模块和数据库集成器依赖较多（pandas等），只在工作进程中导入，
+        # 避免监视器导入本模块时加载
+        from data_integrator import NewsDataIntegrator
+        from main import process_news_data
+        from report_renderer import ReportRenderQueue
+        self.integrator = NewsDataIntegrator(config_file)
+        self.process_news_data = process_news_data
+        # 渲染进程池在工作进程内长期复用，避免每个任务都重新启动渲染进程
+        self.render_queue = ReportRenderQueue(self.output_dir)
+
+    def _collect_analysis(self, news, analysis):
+        """保存本任务新闻的分析结果，任务成功完成后再写回数据库"""
+        self.current_analyses.append(analysis)
+
+    def _record_analysis(self, job_key, analysis):
+        """将新闻分析结果写回新闻数据库"""
+        industry_info = analysis.get("industry_info") or {}
+        stock_code = analysis.get("stock_code")
+        self.integrator.mark_analyzed(
+            job_key,
+            importance_level=analysis.get("importance_level"),
+            importance_category=analysis.get("importance_category"),
+            industry_main=industry_info.get("main_category"),
+            industry_sub=industry_info.get("sub_category"),
+            stock_codes=stock_code if stock_code and stock_code != "无相关上市公司" else None
+        )
+
+    def process_job(self, job):
+        """
+        处理一个任务，成功时确认，失败时记录错误并等待重试
+
+        返回:
+        是否处理成功
+        """
+        news = job['payload']
+        title = news.get('title', '无标题')
+        # 排队期间已经过期的新闻（如积压或重试）直接确认，不再分析
+        if self.priority_scorer.is_stale(news):
+            self.job_queue.ack(job['id'], self.worker_id)
+            inc("worker_jobs_total", result="stale")
+            logger.info(f"[{self.worker_id}] 任务 {job['job_key'][:8]} 的新闻已过期，跳过: {title[:30]}")
+            return True
+        logger.info(f"[{self.worker_id}] 开始处理任务 {job['job_key'][:8]} (第{job['attempts']}次): {title[:30]}")
+        self.current_analyses = []
+        try:
+            with timer("worker_job_seconds"):
+                self.process_news_data(
+                    [news],
+                    self.output_dir,
+                    on_news_analyzed=self._collect_analysis,
+                    open_browser=False,
+                    render_queue=self.render_queue
+                )
+            # 股票数据、分析和报告都完成后才标记为已分析，失败重试中的任务不会显示为已分析
+            for analysis in self.current_analyses:
+                self._record_analysis(job['job_key'], analysis)
+        except Exception as e:
+            inc("worker_jobs_total", result="failed")
+            write_textfile()
+            will_retry = self.job_queue.fail(job['id'], f"{e}\n{traceback.format_exc()}", self.config["retry_delay_seconds"], self.worker_id)
+            logger.error(f"[{self.worker_id}] 任务 {job['job_key'][:8]} 处理失败: {str(e)}，{'稍后重试' if will_retry else '不再重试'}")
+            return False
+
+        if not self.job_queue.ack(job['id'], self.worker_id):
+            logger.warning(f"[{self.worker_id}] 任务 {job['job_key'][:8]} 的租约已被其他工作进程接管")
+        inc("worker_jobs_total", result="done")
+        write_textfile()
+        logger.info(f"[{self.worker_id}] 任务 {job['job_key'][:8]} 处理完成")
+        return True
+
+    def prewarm_if_needed(self):
+        """开盘前的预热窗口内预热全市场数据缓存（每个交易日一次）"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        if self.prewarmed_day == today or not self.calendar.should_prewarm():
+            return
+        self.prewarmed_day = today
+        from stock_data import prewarm_market_caches
+        warmed = prewarm_market_caches()
+        logger.info(f"[{self.worker_id}] 开盘前缓存预热完成: {', '.join(warmed) or '无'}")
+
+    def run(self, once=False):
+        """
+        循环领取并处理任务
+
+        参数:
+        once: 为True时处理完当前所有可领取的任务后退出
+        """
+        logger.info(f"分析工作进程 {self.worker_id} 启动")
+        while True:
+            job = self.job_queue.claim(self.worker_id)
+            if job is None:
+                if once:
+                    logger.info(f"分析工作进程 {self.worker_id} 没有待处理任务，退出")
+                    return
+                self.prewarm_if_needed()
+                time.sleep(self.config["poll_seconds"])
+                continue
+            self.process_job(job)
+
+    def shutdown(self):
+        """关闭工作进程的报告渲染进程池（等待已提交的报告渲染完成）"""
+        self.render_queue.shutdown()
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+def run_worker_process(config_file="config.json", once=False):
+    """工作进程入口"""
+    # 收到终止信号（stop_worker_processes）时与Ctrl+C一样正常退出，以便关闭渲染进程池
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    worker = None
+    try:
+        worker = AnalysisWorker(config_file)
+        worker.run(once=once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if worker is not None:
+            worker.shutdown()
+
+def start_worker_processes(config_file="config.json", count=None):
+    """
+    启动多个分析工作进程
+
+    参数:
+    config_file: 配置文件路径
+    count: 工作进程数，默认使用配置中的 workers
+
+    返回:
+    已启动的进程列表
+    """
+    count = count or load_queue_config(config_file)["workers"]
+    processes = []
+    for i in range(count):
+        # 工作进程内部会创建报告渲染进程池，因此不能设置为守护进程
+        process = multiprocessing.Process(
+            target=run_worker_process,
+            args=(config_file,),
+            name=f"AnalysisWorker-{i + 1}"
+        )
+        process.start()
+        processes.append(process)
+    logger.info(f"已启动 {count} 个分析工作进程")
+    return processes
+
+def stop_worker_processes(processes, timeout=10):
+    """
+    停止分析工作进程：发送终止信号，工作进程关闭各自的报告渲染进程池后退出；
+    超时仍未退出的进程强制结束（未完成的任务租约过期后会被重新领取）
+    """
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+def main():
+    parser = argparse.ArgumentParser(description="新闻分析工作进程")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数")
+    parser.add_argument("--once", action="store_true", help="处理完当前任务后退出")
+    args = parser.parse_args()
+
+    job_queue = create_job_queue(args.config)
+    logger.info(f"任务队列状态: {job_queue.stats()}")
+
+    if args.once:
+        run_worker_process(args.config, once=True)
+        return
+
+    processes = start_worker_processes(args.config, args.workers)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        stop_worker_processes(processes)
+
+if __name__ == "__main__":
+    main()
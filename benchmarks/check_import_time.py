@@ -0,0 +1,132 @@
+"""
+启动耗时检查
+
+在独立的子进程中导入监视器、流水线命令行和Web应用（Web应用只执行其顶层导入语句，不运行页面），
+测量导入耗时并检查是否提前加载了应延迟导入的重量级模块（akshare、Ark SDK、matplotlib、plotly等）。
+导入耗时取多次运行的最小值，超过 thresholds.json 中 import[...] 的阈值，或加载了禁止的模块时，进程以退出码1结束。
+
+用法（在项目根目录下运行）:
+    python benchmarks/check_import_time.py             # 检查全部入口
+    python benchmarks/check_import_time.py --top 15    # 同时列出耗时最多的15个模块（python -X importtime）
+"""
+import os
+import ast
+import sys
+import json
+import argparse
+import subprocess
+
+# 不导入 fixtures.py，避免本进程加载numpy/pandas
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+THRESHOLDS_FILE = os.path.join(BENCHMARK_DIR, "thresholds.json")
+
+# 各入口 -> (导入语句所在的文件, 是否只执行顶层导入语句, 导入时不应加载的模块)
+ENTRY_POINTS = {
+    "news_watcher": ("news_watcher.py", False, ["akshare", "volcenginesdkarkruntime", "matplotlib", "plotly", "pandas", "bs4"]),
+    "news_data_pipeline": ("news_data_pipeline.py", False, ["akshare", "volcenginesdkarkruntime", "matplotlib", "plotly", "pandas", "bs4"]),
+    # streamlit 导入时会加载 plotly（设置图表主题），因此Web应用不检查 plotly
+    "app": ("src/app.py", True, ["akshare", "volcenginesdkarkruntime", "matplotlib"])
+}
+
+def import_statements(path):
+    """提取文件中的顶层导入语句（Web应用在导入时会运行页面，只测量其导入部分）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+def build_probe(entry):
+    """生成在子进程中执行的测量代码"""
+    file_name, statements_only, forbidden = ENTRY_POINTS[entry]
+    path = os.path.join(PROJECT_ROOT, file_name)
+    if statements_only:
+        body = import_statements(path)
+    else:
+        body = f"import {os.path.splitext(os.path.basename(file_name))[0]}"
+    return "\n".join([
+        "import sys, time, json",
+        f"sys.path[:0] = [{PROJECT_ROOT!r}, {os.path.join(PROJECT_ROOT, 'src')!r}]",
+        "start = time.perf_counter()",
+        body,
+        "elapsed = time.perf_counter() - start",
+        f"loaded = [name for name in {forbidden!r} if name in sys.modules]",
+        "print(json.dumps({'seconds': elapsed, 'loaded': loaded}))"
+    ])
+
+def measure(entry, importtime=False):
+    """
+    在子进程中导入一次入口
+
+    返回:
+    (结果字典, -X importtime 的输出)
+    """
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", build_probe(entry)]
+    completed = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "导入失败")
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+def top_imports(importtime_output, count):
+    """
+    解析 -X importtime 的输出，返回累计耗时最多的模块 [(模块名, 秒)]
+    只统计前两层（入口本身及其直接导入的模块）
+    """
+    totals = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 模块名前有一个空格，每深一层多两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            totals.append(("  " * depth + name.strip(), int(cumulative) / 1e6))
+    return sorted(totals, key=lambda item: item[1], reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时检查")
+    parser.add_argument("entries", nargs="*", default=list(ENTRY_POINTS), help="要检查的入口，默认全部")
+    parser.add_argument("--repeat", type=int, default=3, help="每个入口的测量次数，取最小值")
+    parser.add_argument("--top", type=int, default=0, help="列出耗时最多的模块数量")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE, help="阈值文件")
+    args = parser.parse_args()
+
+    thresholds = {}
+    if os.path.exists(args.thresholds):
+        with open(args.thresholds, 'r', encoding='utf-8') as f:
+            thresholds = json.load(f)
+
+    failures = []
+    print(f"{'入口':<24}{'最小耗时':>10}{'阈值':>10}  提前加载的模块")
+    for entry in args.entries:
+        try:
+            runs = [measure(entry)[0] for _ in range(args.repeat)]
+        except RuntimeError as e:
+            failures.append(f"{entry}: 导入失败 {e}")
+            print(f"{entry:<24}{'失败':>10}")
+            continue
+        seconds = min(run["seconds"] for run in runs)
+        loaded = runs[0]["loaded"]
+        threshold = thresholds.get(f"import[{entry}]")
+        if threshold is not None and seconds > threshold:
+            failures.append(f"{entry}: 导入耗时 {seconds:.3f}s 超过阈值 {threshold}s")
+        if loaded:
+            failures.append(f"{entry}: 导入时加载了 {', '.join(loaded)}")
+        print(f"{entry:<24}{seconds:>10.3f}{threshold if threshold is not None else '-':>10}  {', '.join(loaded) or '-'}")
+
+        if args.top:
+            _, output = measure(entry, importtime=True)
+            for name, cumulative in top_imports(output, args.top):
+                print(f"    {name:<40}{cumulative:>8.3f}s")
+
+    if failures:
+        print("\n启动耗时检查未通过:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\n启动耗时检查通过")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+基准测试使用的离线数据
+
+- 合成数据：按固定随机种子生成的新闻语料和K线行情，每次运行结果一致
+- 录制数据：record_fixtures.py 从 akshare 录制的真实接口返回值（benchmarks/fixtures/<接口名>.pkl），
+  存在时优先使用，否则使用合成数据
+- FakeAkshare / FakeArkClient：作为行情数据源替换 akshare，并替换分析模块中的 Ark 客户端，
+  基准测试全程不访问网络
+"""
+import os
+import sys
+import time
+import random
+import pickle
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+
+# 将项目根目录和src目录添加到系统路径
+sys.path.append(PROJECT_ROOT)
+sys.path.append(os.path.join(PROJECT_ROOT, 'src'))
+
+from mock_ark_server import canned_response, split_chunks, CANNED_REASONING
+
+STOCK_CODES = ["600519", "000001", "300750", "601318", "000858", "002594", "688981", "600036"]
+STOCK_NAMES = ["贵州茅台", "平安银行", "宁德时代", "中国平安", "五粮液", "比亚迪", "中芯国际", "招商银行"]
+
+NEWS_TEMPLATES = [
+    ("国务院常务会议部署{topic}相关工作", "国务院常务会议今日召开，会议指出要加快推进{topic}，加大财政和金融支持力度，推动相关产业高质量发展。"),
+    ("央行宣布下调存款准备金率", "中国人民银行决定下调金融机构存款准备金率0.25个百分点，释放长期资金约5000亿元，支持{topic}等重点领域。"),
+    ("{company}发布业绩预告", "{company}公告称，预计上半年净利润同比增长35%至45%，主要受益于{topic}业务快速增长和成本下降。"),
+    ("{company}签订重大合同", "{company}与客户签订{topic}领域重大合同，合同金额约12亿元，占公司上年营业收入的8%。"),
+    ("据悉{company}或将推出新产品", "据知情人士透露，{company}或将在下半年推出{topic}相关新产品，公司尚未对此消息作出回应。"),
+    ("{topic}行业迎来技术突破", "国内研究团队在{topic}领域取得重大技术突破，相关成果有望在未来两年内实现产业化，行业格局或将改变。")
+]
+NEWS_TOPICS = ["人工智能", "半导体", "新能源汽车", "光伏", "创新药", "低空经济", "消费电子", "储能"]
+NEWS_SOURCES = ["新华社", "证券时报", "财联社", "上海证券报", "新浪财经"]
+
+def load_recorded(endpoint):
+    """读取录制的接口返回值，不存在时返回None"""
+    path = os.path.join(FIXTURE_DIR, f"{endpoint}.pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def make_news_corpus(count, seed=42, start=None):
+    """
+    生成合成新闻语料
+
+    参数:
+    count: 新闻条数
+    seed: 随机种子
+    start: 最新一条新闻的发布时间，默认为当前时间
+
+    返回:
+    新闻字典列表（title、content、publish_time、source、url）
+    """
+    rng = random.Random(seed)
+    start = start or datetime.now()
+    news = []
+    for i in range(count):
+        title_template, content_template = rng.choice(NEWS_TEMPLATES)
+        company = rng.choice(STOCK_NAMES)
+        topic = rng.choice(NEWS_TOPICS)
+        # 掺入HTML标签和多余空白，覆盖文本清理逻辑
+        content = content_template.format(company=company, topic=topic)
+        content = f"<p>{content}</p>\n\n  " + content * rng.randint(1, 4)
+        news.append({
+            "title": f"{title_template.format(company=company, topic=topic)}（{i}）",
+            "content": content,
+            "publish_time": (start - timedelta(minutes=7 * i)).strftime('%Y-%m-%d %H:%M:%S'),
+            "source": rng.choice(NEWS_SOURCES),
+            "url": f"https://news.example.com/{seed}/{i}.html"
+        })
+    return news
+
+def make_history(days=365, seed=7, start_price=100.0):
+    """
+    生成与 ak.stock_zh_a_hist 返回格式一致的合成日K线数据（几何随机游走）
+    """
+    recorded = load_recorded("stock_zh_a_hist")
+    if recorded is not None and len(recorded) >= days:
+        return recorded.tail(days).reset_index(drop=True)
+
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=datetime.now().date(), periods=days)
+    returns = rng.normal(0.0005, 0.02, days)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.005, days))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, days)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, days)))
+    volume = rng.integers(50_000, 500_000, days)
+    prev_close = np.concatenate([[start_price], close[:-1]])
+    return pd.DataFrame({
+        "日期": dates.strftime('%Y-%m-%d'),
+        "开盘": open_.round(2),
+        "收盘": close.round(2),
+        "最高": high.round(2),
+        "最低": low.round(2),
+        "成交量": volume,
+        "成交额": (volume * close * 100).round(2),
+        "振幅": ((high - low) / prev_close * 100).round(2),
+        "涨跌幅": ((close - prev_close) / prev_close * 100).round(2),
+        "涨跌额": (close - prev_close).round(2),
+        "换手率": rng.uniform(0.2, 5, days).round(2)
+    })
+
+class FakeAkshare:
+    """按 akshare 的函数名和返回格式提供离线数据，优先使用录制数据"""
+
+    def __init__(self, history_days=365):
+        self.history_days = history_days
+        self.calls = {}
+
+    def _replay(self, endpoint, default_factory):
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+        recorded = load_recorded(endpoint)
+        return recorded.copy() if recorded is not None else default_factory()
+
+    def stock_zh_a_hist(self, symbol=None, period=None, adjust=None, **kwargs):
+        self.calls["stock_zh_a_hist"] = self.calls.get("stock_zh_a_hist", 0) + 1
+        return make_history(self.history_days)
+
+    def stock_zh_a_daily(self, symbol=None, adjust=None, **kwargs):
+        def build():
+            history = make_history(self.history_days)
+            return pd.DataFrame({
+                "date": history["日期"], "open": history["开盘"], "high": history["最高"],
+                "low": history["最低"], "close": history["收盘"], "volume": history["成交量"]
+            })
+        return self._replay("stock_zh_a_daily", build)
+
+    def stock_info_a_code_name(self):
+        return self._replay("stock_info_a_code_name", lambda: pd.DataFrame({"code": STOCK_CODES, "name": STOCK_NAMES}))
+
+    def stock_zh_a_spot_em(self):
+        def build():
+            rng = np.random.default_rng(3)
+            # 全市场快照约5000行
+            codes = [f"{600000 + i:06d}" for i in range(5000)]
+            codes[:len(STOCK_CODES)] = STOCK_CODES
+            return pd.DataFrame({
+                "代码": codes,
+                "名称": [STOCK_NAMES[i] if i < len(STOCK_NAMES) else f"股票{i}" for i in range(len(codes))],
+                "最新价": rng.uniform(3, 300, len(codes)).round(2),
+                "涨跌幅": rng.normal(0, 2, len(codes)).round(2)
+            })
+        return self._replay("stock_zh_a_spot_em", build)
+
+    def stock_individual_info_em(self, symbol=None, **kwargs):
+        return self._replay("stock_individual_info_em", lambda: pd.DataFrame({
+            "item": ["股票代码", "股票简称", "行业", "上市时间", "总市值"],
+            "value": [symbol, "贵州茅台", "酿酒行业", "20010827", 2.1e12]
+        }))
+
+    def stock_individual_spot_xq(self, symbol=None, **kwargs):
+        return self._replay("stock_individual_spot_xq", lambda: pd.DataFrame({
+            "item": ["名称", "现价", "涨幅", "涨跌", "今开", "最高", "最低", "市盈率(TTM)", "市净率", "资产净值/总市值", "流通值", "成交量", "成交额"],
+            "value": ["贵州茅台", 1688.0, 1.25, 20.8, 1670.0, 1695.0, 1662.0, 24.6, 8.1, 2.1e12, 2.1e12, 35210, 5.9e9]
+        }))
+
+    def stock_financial_analysis_indicator(self, symbol=None, start_year=None, **kwargs):
+        return self._replay("stock_financial_analysis_indicator", lambda: pd.DataFrame([{
+            "日期": "2024-12-31", "加权每股收益(元)": 68.64, "净资产收益率(%)": 36.0, "每股净资产_调整后(元)": 185.6,
+            "销售毛利率(%)": 91.9, "销售净利率(%)": 52.3, "资产负债率(%)": 19.0, "流动比率": 4.4, "速动比率": 3.6
+        }]))
+
+    def stock_financial_report_sina(self, stock=None, symbol=None, **kwargs):
+        reports = {
+            "资产负债表": {"报告日": "20241231", "资产总计": 2.9e11, "负债合计": 5.5e10, "所有者权益(或股东权益)合计": 2.35e11, "货币资金": 5.9e10},
+            "利润表": {"报告日": "20241231", "营业总收入": 1.74e11, "营业利润": 1.19e11, "利润总额": 1.19e11, "净利润": 8.9e10},
+            "现金流量表": {"报告日": "20241231", "经营活动产生的现金流量净额": 9.2e10, "投资活动产生的现金流量净额": -2.1e9, "筹资活动产生的现金流量净额": -7.0e10}
+        }
+        return self._replay(f"stock_financial_report_sina_{symbol}", lambda: pd.DataFrame([reports.get(symbol, {})]))
+
+    def tool_trade_date_hist_sina(self):
+        return self._replay("tool_trade_date_hist_sina", lambda: pd.DataFrame({
+            "trade_date": pd.bdate_range(end=datetime.now().date() + timedelta(days=365), periods=2000).date
+        }))
+
+class FakeArkClient:
+    """
+    模拟 volcenginesdkarkruntime.Ark 客户端的 chat.completions.create 接口
+
+    参数:
+    latency: 每次调用模拟的延迟（秒），默认为0，只测量本地处理耗时
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model=None, messages=None, stream=False, **kwargs):
+        prompt = messages[-1]["content"] if messages else ""
+        self.requests.append({"model": model, "prompt": prompt})
+        if self.latency:
+            time.sleep(self.latency)
+        content = canned_response(prompt)
+        usage = SimpleNamespace(prompt_tokens=len(prompt), completion_tokens=len(content), total_tokens=len(prompt) + len(content))
+        if stream:
+            return self._stream(content, usage)
+        message = SimpleNamespace(content=content, reasoning_content="")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _stream(self, content, usage):
+        """按流式接口的分片格式返回：先推理过程，再正文，最后是只包含用量的分片"""
+        for text in split_chunks(CANNED_REASONING):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(reasoning_content=text, content=None))], usage=None)
+        for text in split_chunks(content):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(reasoning_content=None, content=text))], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+class FakeDingTalkBot:
+    """不发送消息的钉钉机器人"""
+
+    def __init__(self, *args, **kwargs):
+        self.messages = []
+
+    def send_markdown(self, title, content, *args, **kwargs):
+        self.messages.append(title)
+        return True
+
+    def send_text(self, content, *args, **kwargs):
+        self.messages.append(content)
+        return True
+
+def install_offline_fixtures(llm_latency=0.0):
+    """
+    将行情接口、大模型客户端和钉钉机器人替换为离线实现
+
+    返回:
+    (FakeAkshare, FakeArkClient) 元组，可用于检查调用次数
+    """
+    import stock_data
+    import news_analyzer
+    import stock_analyzer
+    import main
+    from market_data import AkshareProvider, CompositeProvider, set_market_data_provider
+
+    fake_ak = FakeAkshare()
+    fake_client = FakeArkClient(llm_latency)
+    set_market_data_provider(CompositeProvider([AkshareProvider(fake_ak)]))
+    stock_data._market_cache.clear()
+    news_analyzer.client = fake_client
+    stock_analyzer.client = fake_client
+    main.DingTalkBot = FakeDingTalkBot
+    return fake_ak, fake_client
@@ -0,0 +1,92 @@
+"""
+使用本地模拟的Ark服务对新闻分析流程进行压测
+
+启动 mock_ark_server（或使用 --base-url 指定已启动的服务），通过真实的Ark客户端并发调用 analyze_news，
+统计吞吐量、延迟分位数和错误数，用于验证并发、重试和缓存行为；行情数据使用离线数据。
+
+用法（在项目根目录下运行）:
+    python benchmarks/load_test_llm.py --news 200 --concurrency 8 --latency 0.5 --error-rate 0.05 --rate-limit-rate 0.05
+"""
+import os
+import sys
+import time
+import json
+import argparse
+import threading
+import statistics
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fixtures import make_news_corpus, FakeAkshare
+from mock_ark_server import create_server
+
+def main():
+    parser = argparse.ArgumentParser(description="新闻分析流程压测")
+    parser.add_argument("--news", type=int, default=100, help="新闻条数")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发线程数")
+    parser.add_argument("--base-url", default=None, help="已启动的模拟服务地址，不指定时在本进程中启动")
+    parser.add_argument("--latency", type=float, default=0.2, help="模拟服务的平均延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="模拟服务返回500的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="模拟服务返回429的概率")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="模拟服务的最大并发数")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = create_server(
+            port=0, latency=args.latency, error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate, max_concurrency=args.max_concurrency, seed=1
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/api/v3"
+
+    # 必须在导入分析模块之前设置，客户端在导入时读取服务地址
+    os.environ["ARK_BASE_URL"] = base_url
+    from market_data import AkshareProvider, CompositeProvider, set_market_data_provider
+    from news_analyzer import analyze_news
+    set_market_data_provider(CompositeProvider([AkshareProvider(FakeAkshare())]))
+
+    news_list = make_news_corpus(args.news)
+    latencies = []
+    errors = []
+
+    def analyze(news):
+        start = time.perf_counter()
+        try:
+            analyze_news(news["content"])
+            latencies.append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    print(f"压测开始: {args.news} 条新闻，并发 {args.concurrency}，服务地址 {base_url}")
+    start = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(executor.map(analyze, news_list))
+        finally:
+            sys.stdout = stdout
+    elapsed = time.perf_counter() - start
+
+    print(f"总耗时: {elapsed:.2f}s，吞吐量: {len(latencies) / elapsed:.2f} 条/秒")
+    if latencies:
+        ordered = sorted(latencies)
+        print(f"单条新闻耗时: p50={statistics.median(ordered):.3f}s "
+              f"p95={ordered[int(0.95 * (len(ordered) - 1))]:.3f}s 最大={ordered[-1]:.3f}s")
+    print(f"成功 {len(latencies)} 条，失败 {len(errors)} 条")
+    for error in sorted(set(errors))[:5]:
+        print(f"  {error}")
+
+    stats_url = base_url.split("/api/")[0] + "/stats"
+    try:
+        print(f"模拟服务统计: {json.load(urllib.request.urlopen(stats_url))}")
+    except Exception as e:
+        print(f"读取模拟服务统计失败: {e}")
+
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
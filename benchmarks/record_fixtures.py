@@ -0,0 +1,52 @@
+"""
+从 akshare 录制基准测试使用的接口返回值，保存到 benchmarks/fixtures/<接口名>.pkl
+
+需要联网，录制后的数据在 fixtures.FakeAkshare 中优先于合成数据使用，
+使基准测试覆盖真实的数据规模和字段格式。
+
+用法:
+    python benchmarks/record_fixtures.py --stock 600519
+"""
+import os
+import pickle
+import argparse
+from datetime import datetime
+
+from fixtures import FIXTURE_DIR
+
+def record(endpoint, func, **kwargs):
+    """调用接口并保存返回值"""
+    try:
+        data = func(**kwargs)
+    except Exception as e:
+        print(f"录制 {endpoint} 失败: {e}")
+        return False
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    with open(os.path.join(FIXTURE_DIR, f"{endpoint}.pkl"), 'wb') as f:
+        pickle.dump(data, f)
+    print(f"已录制 {endpoint}: {len(data)} 行")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description="录制akshare接口数据")
+    parser.add_argument("--stock", default="600519", help="6位股票代码")
+    args = parser.parse_args()
+
+    import akshare as ak
+    code = args.stock
+    market = "sh" if code.startswith(('6', '9')) else "sz"
+
+    record("stock_zh_a_hist", ak.stock_zh_a_hist, symbol=code, period="daily", adjust="qfq")
+    record("stock_zh_a_daily", ak.stock_zh_a_daily, symbol=f"{market}{code}", adjust="qfq")
+    record("stock_zh_a_spot_em", ak.stock_zh_a_spot_em)
+    record("stock_info_a_code_name", ak.stock_info_a_code_name)
+    record("stock_individual_info_em", ak.stock_individual_info_em, symbol=code)
+    record("stock_individual_spot_xq", ak.stock_individual_spot_xq, symbol=f"{market.upper()}{code}")
+    record("stock_financial_analysis_indicator", ak.stock_financial_analysis_indicator,
+           symbol=code, start_year=str(datetime.now().year - 3))
+    for report in ("资产负债表", "利润表", "现金流量表"):
+        record(f"stock_financial_report_sina_{report}", ak.stock_financial_report_sina, stock=f"{market}{code}", symbol=report)
+    record("tool_trade_date_hist_sina", ak.tool_trade_date_hist_sina)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+离线基准测试
+
+覆盖新闻清洗、入库、导出、技术指标计算、索引页生成以及端到端的 process_news_data，
+行情接口和大模型调用使用 fixtures.py 中的录制/合成数据，不访问网络。
+
+用法（在项目根目录下运行）:
+    python benchmarks/run_benchmarks.py                       # 运行全部基准并检查阈值
+    python benchmarks/run_benchmarks.py -k chip -k support    # 只运行名称包含关键字的基准
+    python benchmarks/run_benchmarks.py --save baseline.json  # 保存本次结果作为基线
+    python benchmarks/run_benchmarks.py --compare baseline.json --tolerance 0.2
+
+每个基准取多次运行的中位数，超过 thresholds.json 中的绝对阈值，
+或比基线慢 tolerance 以上时视为性能回退，进程以退出码1结束。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import contextlib
+
+import pandas as pd
+
+from fixtures import PROJECT_ROOT, BENCHMARK_DIR, make_news_corpus, make_history, install_offline_fixtures
+
+THRESHOLDS_FILE = os.path.join(BENCHMARK_DIR, "thresholds.json")
+
+BENCHMARKS = []
+
+def benchmark(name, repeat=5):
+    """
+    注册一个基准
+
+    被装饰的函数接收临时目录，返回一个无参函数（被计时的部分）；
+    准备数据的耗时不计入结果，每次重复都会重新准备
+    """
+    def decorator(setup):
+        BENCHMARKS.append({"name": name, "setup": setup, "repeat": repeat})
+        return setup
+    return decorator
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测代码的print输出"""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def _write_integrator_config(work_dir):
+    """生成指向临时数据库的配置文件"""
+    config_file = os.path.join(work_dir, "config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            "integration": {
+                "target_db_file": os.path.join(work_dir, "news.db"),
+                "table_name": "news_articles"
+            },
+            "data_paths": {"output_dir": os.path.join(work_dir, "processed")}
+        }, f)
+    return config_file
+
+def _processed_csv(work_dir, count):
+    """生成清洗后的新闻CSV文件"""
+    from data_processor import NewsDataProcessor
+    processor = NewsDataProcessor(os.path.join(work_dir, "raw"), os.path.join(work_dir, "processed"))
+    df = processor.clean_news_data(pd.DataFrame(make_news_corpus(count)))
+    path = os.path.join(work_dir, "processed", "bench_news.csv")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path, index=False, encoding='utf-8')
+    return path
+
+@benchmark("clean_news_data[5000]")
+def bench_clean_news_data(work_dir):
+    from data_processor import NewsDataProcessor
+    processor = NewsDataProcessor(os.path.join(work_dir, "raw"), os.path.join(work_dir, "processed"))
+    df = pd.DataFrame(make_news_corpus(5000))
+    return lambda: processor.clean_news_data(df.copy())
+
+@benchmark("import_to_database[5000]")
+def bench_import_to_database(work_dir):
+    from data_integrator import NewsDataIntegrator
+    csv_file = _processed_csv(work_dir, 5000)
+    integrator = NewsDataIntegrator(_write_integrator_config(work_dir))
+    return lambda: integrator.import_to_database(csv_file)
+
+@benchmark("export_to_json[5000]")
+def bench_export_to_json(work_dir):
+    from data_integrator import NewsDataIntegrator
+    csv_file = _processed_csv(work_dir, 5000)
+    integrator = NewsDataIntegrator(_write_integrator_config(work_dir))
+    integrator.import_to_database(csv_file)
+    output_file = os.path.join(work_dir, "news_data.json")
+    return lambda: integrator.export_to_json(output_file)
+
+@benchmark("calculate_chip_distribution[365d]", repeat=10)
+def bench_chip_distribution(work_dir):
+    from stock_data import calculate_chip_distribution
+    history = make_history(365)
+    return lambda: calculate_chip_distribution(history.copy())
+
+@benchmark("calculate_support_resistance[365d]", repeat=10)
+def bench_support_resistance(work_dir):
+    from stock_data import calculate_support_resistance
+    history = make_history(365)
+    return lambda: calculate_support_resistance(history.copy())
+
+@benchmark("calculate_technical_indicators[365d]", repeat=10)
+def bench_technical_indicators(work_dir):
+    from stock_data import calculate_technical_indicators
+    history = make_history(365)
+    return lambda: calculate_technical_indicators(history.copy())
+
+@benchmark("generate_index_page[2000 reports]")
+def bench_generate_index_page(work_dir):
+    from datetime import datetime, timedelta
+    from report_store import append_report_manifest
+    from visualization import generate_index_page
+    output_dir = os.path.join(work_dir, "output")
+    os.makedirs(output_dir)
+    start = datetime.now()
+    results = []
+    for i in range(2000):
+        created = start - timedelta(hours=3 * i)
+        record = {
+            "stock_code": f"{600000 + i % 50:06d}",
+            "stock_name": f"股票{i % 50}",
+            "report_file": f"reports/{created:%Y%m%d}/{600000 + i % 50:06d}/report_{i}.html",
+            "created_at": created.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        append_report_manifest(output_dir, record)
+        results.append(dict(record, report_file=os.path.join(output_dir, record["report_file"])))
+    # 第一次生成全部日期页，计时部分为新增一批报告后的增量更新
+    generate_index_page(results, output_dir)
+    return lambda: generate_index_page(results[:20], output_dir)
+
+@benchmark("process_news_data[end-to-end, 10 news]", repeat=3)
+def bench_process_news_data(work_dir):
+    import main
+    install_offline_fixtures()
+    news = make_news_corpus(10)
+    output_dir = os.path.join(work_dir, "output")
+    return lambda: main.process_news_data(news, output_dir, open_browser=False)
+
+def run_benchmark(spec):
+    """运行单个基准，返回各次耗时（秒）"""
+    timings = []
+    for _ in range(spec["repeat"]):
+        work_dir = tempfile.mkdtemp(prefix="bench_")
+        cwd = os.getcwd()
+        try:
+            # 被测代码会写入相对路径（日志、缓存等），在临时目录中运行
+            os.chdir(work_dir)
+            with quiet():
+                func = spec["setup"](work_dir)
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return timings
+
+def load_json(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试")
+    parser.add_argument("-k", dest="keywords", action="append", default=[], help="只运行名称包含该关键字的基准")
+    parser.add_argument("--save", help="将结果保存为基线JSON文件")
+    parser.add_argument("--compare", help="与基线JSON文件比较")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线允许变慢的比例，默认0.2")
+    parser.add_argument("--thresholds", default=THRESHOLDS_FILE, help="绝对阈值文件（中位数秒数）")
+    args = parser.parse_args()
+
+    thresholds = load_json(args.thresholds)
+    baseline = load_json(args.compare)
+    save_file = os.path.abspath(args.save) if args.save else None
+    os.chdir(PROJECT_ROOT)
+
+    results = {}
+    failures = []
+    print(f"{'基准':<42}{'中位数':>10}{'最小':>10}{'最大':>10}{'阈值':>10}{'基线':>10}")
+    for spec in BENCHMARKS:
+        if args.keywords and not any(keyword in spec["name"] for keyword in args.keywords):
+            continue
+        timings = run_benchmark(spec)
+        median = statistics.median(timings)
+        results[spec["name"]] = {"median": median, "min": min(timings), "max": max(timings), "runs": len(timings)}
+
+        threshold = thresholds.get(spec["name"])
+        base = baseline.get(spec["name"], {}).get("median")
+        status = ""
+        if threshold is not None and median > threshold:
+            failures.append(f"{spec['name']}: 中位数 {median:.4f}s 超过阈值 {threshold}s")
+            status = " ✗阈值"
+        if base is not None and median > base * (1 + args.tolerance):
+            failures.append(f"{spec['name']}: 中位数 {median:.4f}s 比基线 {base:.4f}s 慢 {median / base - 1:.0%}")
+            status += " ✗回退"
+        print(f"{spec['name']:<42}{median:>10.4f}{min(timings):>10.4f}{max(timings):>10.4f}"
+              f"{threshold if threshold is not None else '-':>10}{f'{base:.4f}' if base is not None else '-':>10}{status}")
+
+    if save_file:
+        with open(save_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到 {save_file}")
+
+    if failures:
+        print("\n性能回退:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\n全部基准通过")
+
+if __name__ == "__main__":
+    main()
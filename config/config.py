@@ -1,5 +1,29 @@
+import os
+
 # Doubao-1.5-lite API 的访问地址和密钥（请根据实际情况替换）
 ARK_API_KEY = "eb66b444-6d15-4aec-8ba3-890fbbdf0a53"
+# API 服务地址，可通过环境变量 ARK_BASE_URL 覆盖（如指向 mock_ark_server.py 启动的本地模拟服务进行压测）
+ARK_BASE_URL = os.environ.get("ARK_BASE_URL", "https://ark.cn-beijing.volces.com/api/v3")
+# 各任务使用的模型：重要性分级、行业分类、股票代码提取等简单任务使用轻量快速模型，
+# 推理模型只用于最终的投资分析；模型名称可通过环境变量覆盖
+FAST_MODEL = os.environ.get("ARK_FAST_MODEL", "doubao-1-5-lite-32k-250115")
+REASONING_MODEL = os.environ.get("ARK_REASONING_MODEL", "deepseek-r1-distill-qwen-32b-250120")
+TASK_MODELS = {
+    "importance": FAST_MODEL,
+    "industry": FAST_MODEL,
+    "stock_code": FAST_MODEL,
+    "stock_code_fallback": FAST_MODEL,
+    "batch_triage": FAST_MODEL,
+    "investment_advice": REASONING_MODEL,
+}
+# 快速模型的输出未通过校验（格式错误、不在有效分类中等）时改用的模型；
+# 批量分级不升级，解析失败的新闻逐条重新分级
+ESCALATION_MODELS = {
+    "importance": REASONING_MODEL,
+    "industry": REASONING_MODEL,
+    "stock_code": REASONING_MODEL,
+    "stock_code_fallback": REASONING_MODEL,
+}
 # 钉钉机器人配置
 # DINGTALK_WEBHOOK = "https://oapi.dingtalk.com/robot/send?access_token=2f2d98f57716848ee869ed50e26e3daa51125e5e8415e385435f35640443bfbe"
 # DINGTALK_SECRET = "SEC9337ee5cc76236a359060febbae7354bb748f35713d1006046ed744b35bc7a4a"
@@ -1,9 +1,11 @@
 import os
 import json
+import hashlib
 import pandas as pd
 import sqlite3
 import logging
 from datetime import datetime
+from metrics import timer, inc
 
 # 配置日志
 logging.basicConfig(
@@ -16,6 +18,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger("NewsDataIntegrator")
 
+# 数据库结构版本（保存在 PRAGMA user_version 中）
+# 修改表结构时递增该版本号，并在 NewsDataIntegrator._get_schema_migrations 中追加对应的迁移步骤
+SCHEMA_VERSION = 2
+
+# 版本2新增的分析结果相关字段
+ANALYSIS_COLUMNS = [
+    ("content_hash", "TEXT"),
+    ("importance_level", "INTEGER"),
+    ("importance_category", "TEXT"),
+    ("industry_main", "TEXT"),
+    ("industry_sub", "TEXT"),
+    ("stock_codes", "TEXT"),
+    ("analyzed_at", "TIMESTAMP")
+]
+
+def compute_content_hash(title, content):
+    """
+    计算新闻内容哈希（标题+内容的MD5）
+    
+    与 NewsWatcher.generate_record_id 的算法保持一致，
+    因此数据库中的 content_hash 可以直接作为新闻记录ID使用
+    """
+    title = title if isinstance(title, str) else ''
+    content = content if isinstance(content, str) else ''
+    return hashlib.md5((title + content).encode('utf-8')).hexdigest()
+
 class NewsDataIntegrator:
     def __init__(self, config_file="config.json"):
         """
@@ -56,39 +84,162 @@ class NewsDataIntegrator:
             }
     
     def _init_database(self):
-        """初始化数据库和表"""
+        """初始化数据库和表，并将表结构升级到最新版本"""
         try:
             conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # 创建新闻文章表
-            cursor.execute(f'''
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                content TEXT,
-                publish_time TIMESTAMP,
-                source TEXT,
-                url TEXT,
-                processed_at TIMESTAMP,
-                imported_at TIMESTAMP
-            )
-            ''')
-            
-            # 创建索引
-            cursor.execute(f'''
-            CREATE INDEX IF NOT EXISTS idx_title ON {self.table_name} (title)
-            ''')
-            cursor.execute(f'''
-            CREATE INDEX IF NOT EXISTS idx_publish_time ON {self.table_name} (publish_time)
-            ''')
-            
-            conn.commit()
+            self._migrate_schema(conn)
             conn.close()
             logger.info(f"数据库初始化完成: {self.db_file}")
         except Exception as e:
             logger.error(f"初始化数据库时出错: {str(e)}")
     
+    def _get_schema_migrations(self):
+        """按版本号顺序返回所有迁移步骤，第i个步骤将结构升级到版本i+1"""
+        return [
+            self._migrate_v1_create_table,
+            self._migrate_v2_analysis_columns
+        ]
+    
+    def _migrate_schema(self, conn):
+        """
+        根据 PRAGMA user_version 逐步执行尚未应用的迁移
+        
+        参数:
+        conn: 数据库连接
+        """
+        current_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        migrations = self._get_schema_migrations()
+        
+        for version, migration in enumerate(migrations, start=1):
+            if version <= current_version:
+                continue
+            
+            logger.info(f"正在将数据库结构升级到版本 {version}")
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+    
+    def _migrate_v1_create_table(self, conn):
+        """版本1: 创建新闻文章表及基础索引"""
+        cursor = conn.cursor()
+        
+        # 创建新闻文章表
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {self.table_name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            content TEXT,
+            publish_time TIMESTAMP,
+            source TEXT,
+            url TEXT,
+            processed_at TIMESTAMP,
+            imported_at TIMESTAMP
+        )
+        ''')
+        
+        # 创建索引
+        cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_title ON {self.table_name} (title)
+        ''')
+        cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_publish_time ON {self.table_name} (publish_time)
+        ''')
+    
+    def _migrate_v2_analysis_columns(self, conn):
+        """
+        版本2: 增加内容哈希、分析结果字段和全文索引
+        
+        - content_hash: 唯一索引，用于导入时去重
+        - importance_level/importance_category/industry_main/industry_sub/stock_codes: 分析结果
+        - analyzed_at: 分析完成时间，与publish_time组成联合索引，支持"某时间以来未分析"的查询
+        - {table}_fts: 标题和内容的FTS5全文索引，通过触发器与主表保持同步
+        """
+        cursor = conn.cursor()
+        
+        # 1. 增加新字段
+        existing_columns = {row[1] for row in cursor.execute(f"PRAGMA table_info({self.table_name})")}
+        for column_name, column_type in ANALYSIS_COLUMNS:
+            if column_name not in existing_columns:
+                cursor.execute(f"ALTER TABLE {self.table_name} ADD COLUMN {column_name} {column_type}")
+        
+        # 2. 为已有记录回填内容哈希
+        rows = cursor.execute(
+            f"SELECT id, title, content FROM {self.table_name} WHERE content_hash IS NULL"
+        ).fetchall()
+        cursor.executemany(
+            f"UPDATE {self.table_name} SET content_hash = ? WHERE id = ?",
+            [(compute_content_hash(title, content), row_id) for row_id, title, content in rows]
+        )
+        
+        # 3. 删除重复记录（保留最早导入的一条），否则无法建立唯一索引
+        cursor.execute(f'''
+        DELETE FROM {self.table_name}
+        WHERE id NOT IN (SELECT MIN(id) FROM {self.table_name} GROUP BY content_hash)
+        ''')
+        if cursor.rowcount > 0:
+            logger.info(f"已删除 {cursor.rowcount} 条重复的新闻记录")
+        
+        # 4. 创建索引
+        cursor.execute(f'''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_content_hash ON {self.table_name} (content_hash)
+        ''')
+        cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_analyzed_at ON {self.table_name} (analyzed_at, publish_time)
+        ''')
+        
+        # 5. 创建全文索引
+        self._create_fts_index(cursor)
+    
+    def _create_fts_index(self, cursor):
+        """
+        创建标题和内容的FTS5全文索引及同步触发器
+        
+        优先使用trigram分词器（支持中文子串匹配），
+        SQLite版本过低时退回unicode61分词器，不支持FTS5时跳过
+        """
+        fts_table = f"{self.table_name}_fts"
+        
+        created = False
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                    title, content,
+                    content='{self.table_name}', content_rowid='id',
+                    tokenize='{tokenizer}'
+                )
+                ''')
+                created = True
+                logger.info(f"已创建全文索引 {fts_table}（分词器: {tokenizer}）")
+                break
+            except sqlite3.OperationalError as e:
+                logger.warning(f"使用分词器 {tokenizer} 创建全文索引失败: {str(e)}")
+        
+        if not created:
+            logger.warning("当前SQLite不支持FTS5，跳过全文索引的创建")
+            return
+        
+        # 通过触发器保持全文索引与主表同步（更新分析结果字段时不会触发重建）
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {self.table_name}_ai AFTER INSERT ON {self.table_name} BEGIN
+            INSERT INTO {fts_table}(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {self.table_name}_ad AFTER DELETE ON {self.table_name} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {self.table_name}_au AFTER UPDATE OF title, content ON {self.table_name} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO {fts_table}(rowid, title, content) VALUES (new.id, new.title, new.content);
+        END
+        ''')
+        
+        # 为已有记录建立索引
+        cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+    
     def get_processed_files(self):
         """获取处理后的数据文件"""
         files = []
@@ -101,11 +252,13 @@ class NewsDataIntegrator:
         """
         将处理后的数据导入到数据库
         
+        根据内容哈希去重，已存在的新闻会被跳过
+        
         参数:
         file_path: 处理后的数据文件路径
         
         返回:
-        导入的记录数
+        新导入的记录数，导入失败时返回None
         """
         try:
             # 读取CSV文件
@@ -114,22 +267,113 @@ class NewsDataIntegrator:
                 logger.warning(f"文件 {file_path} 没有数据，跳过导入")
                 return 0
             
-            # 添加导入时间戳
-            df['imported_at'] = datetime.now()
+            # 添加导入时间戳和内容哈希
+            df['imported_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            df['content_hash'] = [
+                compute_content_hash(title, content)
+                for title, content in zip(df.get('title', [None] * len(df)), df.get('content', [None] * len(df)))
+            ]
             
             # 连接数据库
             conn = sqlite3.connect(self.db_file)
             
-            # 导入数据
-            records_count = len(df)
-            df.to_sql(self.table_name, conn, if_exists='append', index=False)
+            # 只导入表中存在的字段
+            table_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({self.table_name})")}
+            columns = [col for col in df.columns if col in table_columns and col != 'id']
+            df = df[columns].astype(object).where(pd.notnull(df[columns]), None)
             
+            # 导入数据（内容哈希重复的记录会被忽略）
+            placeholders = ', '.join(['?'] * len(columns))
+            cursor = conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table_name} ({', '.join(columns)}) VALUES ({placeholders})",
+                df.itertuples(index=False, name=None)
+            )
+            records_count = cursor.rowcount
+            conn.commit()
             conn.close()
-            logger.info(f"已将 {records_count} 条记录从 {file_path} 导入到数据库")
+            
+            skipped_count = len(df) - records_count
+            inc("integrator_records_total", records_count, result="imported")
+            inc("integrator_records_total", skipped_count, result="duplicate")
+            logger.info(f"已将 {records_count} 条记录从 {file_path} 导入到数据库，跳过 {skipped_count} 条重复记录")
             return records_count
         except Exception as e:
             logger.error(f"导入数据到数据库时出错: {str(e)}")
-            return 0
+            return None
+    
+    def mark_analyzed(self, content_hash, importance_level=None, importance_category=None,
+                      industry_main=None, industry_sub=None, stock_codes=None):
+        """
+        记录新闻的分析结果并标记为已分析
+        
+        参数:
+        content_hash: 新闻内容哈希
+        importance_level: 重要性等级
+        importance_category: 重要性分类
+        industry_main: 行业大类
+        industry_sub: 细分领域
+        stock_codes: 相关股票代码，多个代码以逗号分隔
+        
+        返回:
+        是否找到并更新了对应记录
+        """
+        try:
+            conn = sqlite3.connect(self.db_file)
+            cursor = conn.execute(f'''
+            UPDATE {self.table_name} SET
+                analyzed_at = ?,
+                importance_level = COALESCE(?, importance_level),
+                importance_category = COALESCE(?, importance_category),
+                industry_main = COALESCE(?, industry_main),
+                industry_sub = COALESCE(?, industry_sub),
+                stock_codes = COALESCE(?, stock_codes)
+            WHERE content_hash = ?
+            ''', (
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                importance_level, importance_category,
+                industry_main, industry_sub, stock_codes,
+                content_hash
+            ))
+            updated = cursor.rowcount > 0
+            conn.commit()
+            conn.close()
+            return updated
+        except Exception as e:
+            logger.error(f"记录新闻分析结果时出错: {str(e)}")
+            return False
+    
+    def get_unanalyzed_news(self, since=None, limit=None):
+        """
+        获取尚未分析的新闻（使用 analyzed_at + publish_time 联合索引）
+        
+        参数:
+        since: 只返回该发布时间之后的新闻，可以是datetime或"YYYY-MM-DD HH:MM:SS"格式的字符串
+        limit: 限制返回的记录数
+        
+        返回:
+        新闻记录字典列表，按发布时间倒序排列
+        """
+        try:
+            query = f"SELECT * FROM {self.table_name} WHERE analyzed_at IS NULL"
+            params = []
+            if since is not None:
+                if isinstance(since, datetime):
+                    since = since.strftime('%Y-%m-%d %H:%M:%S')
+                query += " AND publish_time >= ?"
+                params.append(since)
+            query += " ORDER BY publish_time DESC"
+            if limit:
+                query += " LIMIT ?"
+                params.append(int(limit))
+            
+            conn = sqlite3.connect(self.db_file)
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query, params).fetchall()
+            conn.close()
+            return [dict(row) for row in rows]
+        except Exception as e:
+            logger.error(f"查询未分析新闻时出错: {str(e)}")
+            return []
     
     def move_imported_file(self, file_path, imported_dir="data/imported"):
         """
@@ -175,7 +419,8 @@ class NewsDataIntegrator:
                 query += f" LIMIT {limit}"
             
             # 读取数据
-            df = pd.read_sql_query(query, conn)
+            with timer("export_stage_seconds", stage="query"):
+                df = pd.read_sql_query(query, conn)
             conn.close()
             
             if df.empty:
@@ -190,13 +435,18 @@ class NewsDataIntegrator:
                     except:
                         pass
             
+            # 空值转换为None，避免JSON中出现NaN
+            df = df.astype(object).where(pd.notnull(df), None)
+            
             # 转换为字典列表
             records = df.to_dict(orient='records')
             
             # 保存为JSON文件
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(records, f, ensure_ascii=False, indent=4)
+            with timer("export_stage_seconds", stage="write"):
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(records, f, ensure_ascii=False, indent=4)
             
+            inc("export_records_total", len(records))
             logger.info(f"已将 {len(records)} 条记录导出到 {output_file}")
             return len(records)
         except Exception as e:
@@ -215,11 +465,14 @@ class NewsDataIntegrator:
         
         for file_path in files:
             logger.info(f"正在导入文件: {file_path}")
-            records = self.import_to_database(file_path)
-            total_records += records
+            with timer("integrator_file_seconds"):
+                records = self.import_to_database(file_path)
+            if records is None:
+                # 导入失败，保留文件等待下次重试
+                continue
             
-            if records > 0:
-                self.move_imported_file(file_path)
+            total_records += records
+            self.move_imported_file(file_path)
         
         logger.info(f"数据集成完成，共导入 {total_records} 条记录")
         
@@ -7,6 +7,8 @@ import logging
 import re
 import html
 from bs4 import BeautifulSoup
+from raw_scanner import get_scanner
+from metrics import timer, inc
 
 # 配置日志
 logging.basicConfig(
@@ -40,34 +42,15 @@ class NewsDataProcessor:
             os.makedirs(archive_dir, exist_ok=True)
     
     def get_new_files(self):
-        """获取输入目录中尚未处理的新文件"""
-        files = []
-        
-        # 原有的非递归搜索
-        logger.info(f"搜索目录: {self.input_dir}")
-        for filename in os.listdir(self.input_dir):
-            file_path = os.path.join(self.input_dir, filename)
-            # 如果是文件且符合扩展名要求，添加到列表
-            if os.path.isfile(file_path) and (filename.endswith('.json') or filename.endswith('.csv')):
-                files.append(file_path)
-                logger.info(f"找到文件: {file_path}")
-        
-        # 递归搜索子目录
-        for root, dirs, dir_files in os.walk(self.input_dir):
-            # 跳过顶级目录，因为已经在上面处理过了
-            if root == self.input_dir:
-                continue
-                
-            logger.info(f"搜索子目录: {root}")
-            for filename in dir_files:
-                if filename.endswith('.json') or filename.endswith('.csv'):
-                    file_path = os.path.join(root, filename)
-                    files.append(file_path)
-                    logger.info(f"在子目录中找到文件: {file_path}")
+        """获取输入目录（包括子目录）中尚未处理的新文件"""
+        # 使用共享扫描器，未变化的目录直接使用缓存
+        files = [file_info['path'] for file_info in get_scanner(self.input_dir).scan()]
         
         if not files:
             logger.info("没有找到任何符合条件的文件")
         else:
+            for file_path in files:
+                logger.info(f"找到文件: {file_path}")
             logger.info(f"总共找到 {len(files)} 个文件")
             
         return files
@@ -276,20 +259,27 @@ class NewsDataProcessor:
         for file_path in files:
             logger.info(f"正在处理文件: {file_path}")
             
-            # 加载数据
-            df = self.load_file(file_path)
-            if df.empty:
-                logger.warning(f"文件 {file_path} 没有有效数据，跳过")
-                continue
+            with timer("processor_file_seconds"):
+                # 加载数据
+                df = self.load_file(file_path)
+                if df.empty:
+                    logger.warning(f"文件 {file_path} 没有有效数据，跳过")
+                    inc("processor_files_total", result="empty")
+                    continue
+                    
+                # 清理数据
+                with timer("processor_clean_seconds"):
+                    cleaned_df = self.clean_news_data(df)
                 
-            # 清理数据
-            cleaned_df = self.clean_news_data(df)
-            
-            # 保存处理后的数据
-            self.save_processed_data(cleaned_df, file_path)
+                # 保存处理后的数据
+                self.save_processed_data(cleaned_df, file_path)
+                
+                # 归档原始文件
+                self.archive_file(file_path)
             
-            # 归档原始文件
-            self.archive_file(file_path)
+            inc("processor_files_total", result="processed")
+            inc("processor_rows_total", len(df), stage="loaded")
+            inc("processor_rows_total", len(cleaned_df), stage="cleaned")
             
         logger.info("所有文件处理完成")
 
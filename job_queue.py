@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+
+logger = logging.getLogger("JobQueue")
+
+# 任务状态
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+class JobQueue:
+    def __init__(self, db_file="data/job_queue.db", max_attempts=3, lease_seconds=1800):
+        """
+        初始化基于SQLite的持久化任务队列
+
+        新闻检测（监视器）只负责入队，分析由一个或多个工作进程领取任务完成：
+        工作进程领取任务时获得一段时间的租约，完成后确认(ack)，失败时延迟重试；
+        工作进程崩溃导致租约过期的任务会被其他工作进程重新领取
+
+        参数:
+        db_file: 队列数据库文件路径
+        max_attempts: 每个任务的最大尝试次数，超过后标记为失败
+        lease_seconds: 任务租约时长（秒），应大于单条新闻分析的最长耗时
+        """
+        self.db_file = db_file
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_database()
+
+    def _connect(self):
+        """连接队列数据库（多进程并发访问，使用WAL模式并等待锁释放）"""
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_database(self):
+        """创建任务表"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_key TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                priority REAL NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            ''')
+            conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority DESC, id)
+            ''')
+        finally:
+            conn.close()
+
+    def enqueue(self, job_key, payload, priority=0):
+        """
+        添加任务，相同job_key的任务只会入队一次
+
+        参数:
+        job_key: 任务唯一标识（如新闻内容哈希）
+        payload: 任务内容，需要可以序列化为JSON
+        priority: 优先级，数值越大越先处理
+
+        返回:
+        是否新增了任务
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+            INSERT OR IGNORE INTO jobs (job_key, payload, priority, status, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (job_key, json.dumps(payload, ensure_ascii=False), priority, STATUS_PENDING, now, now, now))
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def claim(self, worker_id):
+        """
+        领取一个待处理任务（优先级最高、入队最早的任务优先）
+
+        参数:
+        worker_id: 工作进程标识
+
+        返回:
+        任务字典（包含 id、job_key、payload、priority、attempts），没有可领取的任务时返回None
+        """
+        conn = self._connect()
+        try:
+            while True:
+                now = time.time()
+                # 立即获取写锁，避免多个工作进程领取同一个任务
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute('''
+                SELECT id, job_key, payload, priority, status, attempts FROM jobs
+                WHERE (status = ? AND available_at <= ?)
+                   OR (status = ? AND lease_expires < ?)
+                ORDER BY priority DESC, id
+                LIMIT 1
+                ''', (STATUS_PENDING, now, STATUS_RUNNING, now)).fetchone()
+
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+
+                if row['status'] == STATUS_RUNNING and row['attempts'] >= self.max_attempts:
+                    # 租约过期且已达到最大尝试次数（工作进程多次在处理该任务时崩溃）
+                    conn.execute('''
+                    UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL,
+                        last_error = ?, updated_at = ?
+                    WHERE id = ?
+                    ''', (STATUS_FAILED, "租约过期次数超过上限", now, row['id']))
+                    conn.execute("COMMIT")
+                    logger.warning(f"任务 {row['job_key']} 多次处理超时，标记为失败")
+                    continue
+
+                if row['status'] == STATUS_RUNNING:
+                    logger.warning(f"任务 {row['job_key']} 的租约已过期，重新领取")
+
+                conn.execute('''
+                UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?,
+                    lease_expires = ?, updated_at = ?
+                WHERE id = ?
+                ''', (STATUS_RUNNING, worker_id, now + self.lease_seconds, now, row['id']))
+                conn.execute("COMMIT")
+
+                return {
+                    'id': row['id'],
+                    'job_key': row['job_key'],
+                    'payload': json.loads(row['payload']),
+                    'priority': row['priority'],
+                    'attempts': row['attempts'] + 1
+                }
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def ack(self, job_id, worker_id=None):
+        """
+        确认任务已完成
+
+        参数:
+        job_id: 任务ID
+        worker_id: 工作进程标识，指定时只有持有租约的工作进程才能确认
+
+        返回:
+        是否确认成功（租约已被其他工作进程接管时返回False）
+        """
+        conn = self._connect()
+        try:
+            sql = "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?"
+            params = [STATUS_DONE, time.time(), job_id]
+            if worker_id is not None:
+                sql += " AND lease_owner = ?"
+                params.append(worker_id)
+            return conn.execute(sql, params).rowcount > 0
+        finally:
+            conn.close()
+
+    def fail(self, job_id, error, retry_delay=60, worker_id=None):
+        """
+        记录任务失败，未达到最大尝试次数时延迟重试（重试间隔随尝试次数指数增长）
+
+        参数:
+        job_id: 任务ID
+        error: 错误信息
+        retry_delay: 首次重试的延迟秒数
+        worker_id: 工作进程标识，指定时只有持有租约的工作进程才能记录失败
+
+        返回:
+        任务是否会被重试（租约已被其他工作进程接管时返回False，任务状态不变）
+        """
+        now = time.time()
+        owner_clause = ""
+        owner_params = []
+        if worker_id is not None:
+            owner_clause = " AND lease_owner = ?"
+            owner_params.append(worker_id)
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id = ?" + owner_clause, [job_id] + owner_params).fetchone()
+            if row is None:
+                return False
+            will_retry = row['attempts'] < self.max_attempts
+            cursor = conn.execute('''
+            UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires = NULL,
+                last_error = ?, updated_at = ?
+            WHERE id = ? AND attempts = ?''' + owner_clause, [
+                STATUS_PENDING if will_retry else STATUS_FAILED,
+                now + retry_delay * (2 ** max(row['attempts'] - 1, 0)),
+                str(error)[:2000],
+                now,
+                job_id,
+                row['attempts']
+            ] + owner_params)
+            return will_retry and cursor.rowcount > 0
+        finally:
+            conn.close()
+
+    def stats(self):
+        """
+        统计各状态的任务数量
+
+        返回:
+        字典，键为任务状态，值为数量
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+            return {row['status']: row['count'] for row in rows}
+        finally:
+            conn.close()
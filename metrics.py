@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("Metrics")
+
+# 耗时直方图的分桶上限（秒），覆盖从本地数据处理（毫秒级）到大模型调用（分钟级）的范围
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# 每个直方图保留的最近样本数，用于计算本轮运行的分位数
+MAX_RUN_SAMPLES = 10000
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(label_key, extra=()):
+    items = list(label_key) + list(extra)
+    if not items:
+        return ""
+    escaped = [(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in items]
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(percent / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.run_samples = deque(maxlen=MAX_RUN_SAMPLES)
+        self.run_count = 0
+        self.run_sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.run_samples.append(value)
+        self.run_count += 1
+        self.run_sum += value
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        初始化指标注册表
+
+        支持计数器（累计值，如处理的新闻条数）和直方图（如各阶段耗时），可以附带标签；
+        累计值按Prometheus文本格式导出，本轮运行（start_run之后）的数据用于生成运行摘要
+        """
+        self.counters = {}
+        self.run_counters = {}
+        self.histograms = {}
+        self.descriptions = {}
+        self.run_started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """
+        增加计数器
+
+        参数:
+        name: 指标名称，如 pipeline_records_total
+        value: 增加的数值
+        labels: 指标标签
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.run_counters[key] = self.run_counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        """
+        记录一个直方图样本
+
+        参数:
+        name: 指标名称，如 pipeline_stage_seconds
+        value: 样本值
+        buckets: 直方图分桶上限，只在首次记录时生效
+        labels: 指标标签
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(tuple(buckets))
+            histogram.observe(value)
+
+    def describe(self, name, description):
+        """设置指标的说明（导出为 # HELP）"""
+        self.descriptions[name] = description
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        计时上下文管理器，退出时记录耗时（秒），出错时同时记录 status="error"
+
+        用法:
+        with registry.timer("pipeline_stage_seconds", stage="integrate"):
+            ...
+        """
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, status=status, **labels)
+
+    def timed(self, name, **labels):
+        """计时装饰器，记录被装饰函数每次调用的耗时"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def start_run(self):
+        """开始新一轮运行，清空本轮统计（累计值不受影响）"""
+        with self._lock:
+            self.run_counters = {}
+            for histogram in self.histograms.values():
+                histogram.run_samples.clear()
+                histogram.run_count = 0
+                histogram.run_sum = 0.0
+            self.run_started = time.time()
+
+    def run_summary(self):
+        """
+        生成本轮运行的摘要
+
+        返回:
+        字典，包含 duration_seconds、counters（数值和每秒速率）和 timers（次数、总耗时、p50/p95/p99、最大值）
+        """
+        with self._lock:
+            duration = max(time.time() - self.run_started, 1e-6)
+            counters = {}
+            for (name, label_key), value in sorted(self.run_counters.items()):
+                counters[name + _format_labels(label_key)] = {
+                    "value": value,
+                    "per_second": round(value / duration, 3)
+                }
+            timers = {}
+            for (name, label_key), histogram in sorted(self.histograms.items()):
+                if not histogram.run_count:
+                    continue
+                samples = sorted(histogram.run_samples)
+                timers[name + _format_labels(label_key)] = {
+                    "count": histogram.run_count,
+                    "total": round(histogram.run_sum, 3),
+                    "p50": round(_percentile(samples, 50), 3),
+                    "p95": round(_percentile(samples, 95), 3),
+                    "p99": round(_percentile(samples, 99), 3),
+                    "max": round(samples[-1], 3)
+                }
+        return {"duration_seconds": round(duration, 3), "counters": counters, "timers": timers}
+
+    def render_prometheus(self, extra_labels=None):
+        """
+        按Prometheus文本格式导出所有累计指标
+
+        参数:
+        extra_labels: 附加到每个序列的标签（如 process），多个进程写入同一目录时用于区分
+        """
+        extra = _label_key(extra_labels or {})
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                if name in self.descriptions:
+                    lines.append(f"# HELP {name} {self.descriptions[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for (series_name, label_key), value in sorted(self.counters.items()):
+                    if series_name == name:
+                        lines.append(f"{name}{_format_labels(label_key, extra)} {value}")
+
+            histogram_names = sorted({name for name, _ in self.histograms})
+            for name in histogram_names:
+                if name in self.descriptions:
+                    lines.append(f"# HELP {name} {self.descriptions[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for (series_name, label_key), histogram in sorted(self.histograms.items()):
+                    if series_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                        cumulative += count
+                        le = (("le", f"{bound:g}"),)
+                        lines.append(f"{name}_bucket{_format_labels(label_key, extra + le)} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(label_key, extra + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(label_key, extra)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(label_key, extra)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+# 进程内共享的指标注册表
+registry = MetricsRegistry()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+timed = registry.timed
+
+_settings = {
+    "enabled": True,
+    "textfile_dir": "data/metrics",
+    "http_port": None,
+    "process_name": "main"
+}
+
+def configure_metrics(config_file="config.json", process_name=None):
+    """
+    读取指标导出配置（config.json 的 metrics 部分）
+
+    参数:
+    config_file: 配置文件路径
+    process_name: 当前进程名称，作为 process 标签和导出文件名
+
+    返回:
+    合并了默认值的配置字典
+    """
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                _settings.update(json.load(f).get("metrics", {}))
+    except Exception as e:
+        logger.error(f"加载指标配置时出错: {str(e)}，使用默认配置")
+    if process_name:
+        _settings["process_name"] = process_name
+    return dict(_settings)
+
+def write_textfile():
+    """
+    将指标写入 textfile_dir/<进程名>.prom（供 node_exporter 的 textfile collector 读取）
+
+    返回:
+    写入的文件路径，未启用时返回None
+    """
+    if not _settings["enabled"] or not _settings["textfile_dir"]:
+        return None
+    try:
+        os.makedirs(_settings["textfile_dir"], exist_ok=True)
+        path = os.path.join(_settings["textfile_dir"], f"{_settings['process_name']}.prom")
+        # 先写临时文件再替换，避免采集到写了一半的文件
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(registry.render_prometheus({"process": _settings["process_name"]}))
+        os.replace(temp_path, path)
+        return path
+    except Exception as e:
+        logger.warning(f"写入指标文件时出错: {str(e)}")
+        return None
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = registry.render_prometheus({"process": _settings["process_name"]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port=None, host="127.0.0.1"):
+    """
+    在后台线程中启动 /metrics HTTP 端点
+
+    参数:
+    port: 端口，默认使用配置中的 http_port，未配置时不启动
+    host: 监听地址，默认只监听本机
+
+    返回:
+    HTTP服务器对象，未启动时返回None
+    """
+    port = port or _settings["http_port"]
+    if not _settings["enabled"] or not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.warning(f"启动指标HTTP端点失败: {str(e)}")
+        return None
+    threading.Thread(target=server.serve_forever, name="MetricsHTTPServer", daemon=True).start()
+    logger.info(f"指标HTTP端点已启动: http://{host}:{port}/metrics")
+    return server
+
+def log_run_summary(title, log=None):
+    """
+    输出本轮运行摘要（各阶段耗时分位数和每秒处理量），并写入指标文件
+
+    参数:
+    title: 摘要标题，如 "数据处理流水线"
+    log: 日志记录器，默认使用本模块的记录器
+    """
+    log = log or logger
+    summary = registry.run_summary()
+    log.info(f"{title} 运行摘要（耗时 {summary['duration_seconds']} 秒）:")
+    for name, stats in summary["timers"].items():
+        log.info(f"  {name}: 次数={stats['count']} 总耗时={stats['total']}s "
+                 f"p50={stats['p50']}s p95={stats['p95']}s p99={stats['p99']}s 最大={stats['max']}s")
+    for name, stats in summary["counters"].items():
+        log.info(f"  {name}: {stats['value']} ({stats['per_second']}/s)")
+    write_textfile()
+    return summary
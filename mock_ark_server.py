@@ -0,0 +1,296 @@
+import re
+import time
+import json
+import uuid
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("MockArkServer")
+
+# 固定回复，按提示词中的关键字选择（第一个匹配的关键字生效，空关键字为默认回复）
+CANNED_RESPONSES = [
+    ("按照重要性和影响力进行分级", "分级：1\n分类：国家政策"),
+    ("确定其所属的行业领域类别", "主要行业类别：科技与创新类\n细分领域：人工智能（AI）\n相关度评分：8\n分类解释：新闻涉及人工智能产业政策"),
+    ("6位数字", "600519"),
+    ("", "1. 新闻影响分析：政策利好，公司有望受益。\n2. 投资决策：建议买入\n3. 建议仓位10%，中期持有，买入区间1650-1700元，止损位1580元。\n4. 风险提示：估值偏高，需关注消费复苏进度。")
+]
+
+# 批量分级提示词的关键字，回复按新闻条数生成
+BATCH_KEYWORD = "逐条完成重要性分级和行业分类"
+
+# 流式回复中模拟的推理过程
+CANNED_REASONING = "首先分析新闻的核心信息，然后结合公司基本面和技术面数据，最后给出投资建议。"
+
+def canned_batch_response(prompt):
+    """批量分级的固定回复：为提示词中的每个【编号N】返回一条结果"""
+    items = [
+        {"id": int(n), "level": 1, "category": "国家政策", "main_category": "科技与创新类",
+         "sub_category": "人工智能（AI）", "relevance": 8}
+        for n in re.findall(r"【编号(\d+)】", prompt)
+    ]
+    return json.dumps(items, ensure_ascii=False)
+
+def canned_response(prompt):
+    """根据提示词选择固定回复"""
+    if BATCH_KEYWORD in prompt:
+        return canned_batch_response(prompt)
+    for keyword, content in CANNED_RESPONSES:
+        if keyword in prompt:
+            return content
+    return CANNED_RESPONSES[-1][1]
+
+def split_chunks(text, size=8):
+    """将文本按固定长度切分为流式分片"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class MockArkState:
+    def __init__(self, latency=0.5, jitter=0.2, error_rate=0.0, rate_limit_rate=0.0,
+                 max_concurrency=None, retry_after=1, seed=None):
+        """
+        模拟服务的行为配置和统计
+
+        参数:
+        latency: 每次请求的平均延迟（秒）
+        jitter: 延迟的随机波动比例，实际延迟在 latency*(1±jitter) 之间
+        error_rate: 返回500错误的概率
+        rate_limit_rate: 返回429限流的概率
+        max_concurrency: 最大并发请求数，超过时返回429，None表示不限制
+        retry_after: 429响应中的 Retry-After 秒数
+        seed: 随机种子
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.max_concurrency = max_concurrency
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.stats = {
+            "requests": 0,
+            "completed": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "max_active": 0,
+            "prompt_chars": 0
+        }
+
+    def enter(self):
+        """
+        登记一个新请求
+
+        返回:
+        None表示正常处理，否则为需要返回的错误状态码
+        """
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.max_concurrency is not None and self.active >= self.max_concurrency:
+                self.stats["rate_limited"] += 1
+                return 429
+            roll = self.random.random()
+            if roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                return 429
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 500
+            self.active += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self.active)
+            return None
+
+    def leave(self):
+        with self.lock:
+            self.active -= 1
+            self.stats["completed"] += 1
+
+    def delay(self):
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.jitter, self.jitter)
+        return max(self.latency * factor, 0)
+
+class MockArkHandler(BaseHTTPRequestHandler):
+    # 由 create_server 设置
+    state = None
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == "/stats":
+            with self.state.lock:
+                stats = dict(self.state.stats, active=self.state.active)
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length) if length else b""
+        if not self.path.rstrip('/').endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        try:
+            request = json.loads(raw_body or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid json", "type": "BadRequest"}})
+            return
+
+        status = self.state.enter()
+        if status == 429:
+            self._send_json(429, {"error": {"code": "RateLimitExceeded", "message": "mock rate limit", "type": "TooManyRequests"}},
+                            {"Retry-After": str(self.state.retry_after)})
+            return
+        if status == 500:
+            self._send_json(500, {"error": {"code": "InternalServiceError", "message": "mock server error", "type": "InternalServerError"}})
+            return
+
+        try:
+            messages = request.get("messages") or []
+            prompt = messages[-1].get("content", "") if messages else ""
+            with self.state.lock:
+                self.state.stats["prompt_chars"] += len(prompt)
+            content = canned_response(prompt)
+            if request.get("stream"):
+                self._send_stream(request, prompt, content)
+                return
+            time.sleep(self.state.delay())
+            self._send_json(200, {
+                "id": f"mock-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content, "reasoning_content": ""},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": len(prompt),
+                    "completion_tokens": len(content),
+                    "total_tokens": len(prompt) + len(content)
+                }
+            })
+        finally:
+            self.state.leave()
+
+    def _send_stream(self, request, prompt, content):
+        """
+        以SSE（text/event-stream）格式流式返回：先返回推理过程，再返回正文，
+        总延迟的30%作为首个分片的等待时间，其余平均分摊到各分片之间
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"mock-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = request.get("model", "mock")
+        deltas = [{"role": "assistant", "content": "", "reasoning_content": text} for text in split_chunks(CANNED_REASONING)]
+        deltas += [{"role": "assistant", "content": text} for text in split_chunks(content)]
+
+        def send_event(payload):
+            data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+            self.wfile.write(f"data: {data}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        total_delay = self.state.delay()
+        time.sleep(total_delay * 0.3)
+        interval = total_delay * 0.7 / max(len(deltas), 1)
+        for index, delta in enumerate(deltas):
+            if index:
+                time.sleep(interval)
+            send_event({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+            })
+        send_event({
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        if (request.get("stream_options") or {}).get("include_usage"):
+            send_event({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [],
+                "usage": {
+                    "prompt_tokens": len(prompt),
+                    "completion_tokens": len(CANNED_REASONING) + len(content),
+                    "total_tokens": len(prompt) + len(CANNED_REASONING) + len(content)
+                }
+            })
+        send_event("[DONE]")
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+def create_server(host="127.0.0.1", port=8765, **options):
+    """
+    创建模拟服务（不启动）
+
+    参数:
+    host: 监听地址
+    port: 端口，0表示随机端口
+    options: MockArkState 的参数（latency、error_rate 等）
+
+    返回:
+    ThreadingHTTPServer 对象，server.state 为统计信息
+    """
+    state = MockArkState(**options)
+    handler = type("ConfiguredMockArkHandler", (MockArkHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的Ark/OpenAI兼容对话补全服务（支持 stream=true 的SSE流式返回），用于离线压测分析流程")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    parser.add_argument("--latency", type=float, default=0.5, help="平均响应延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟随机波动比例")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500错误的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="返回429限流的概率")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="最大并发请求数，超过时返回429")
+    parser.add_argument("--retry-after", type=int, default=1, help="429响应的Retry-After秒数")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host, args.port,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, max_concurrency=args.max_concurrency,
+        retry_after=args.retry_after, seed=args.seed
+    )
+    logger.info(f"模拟Ark服务已启动: http://{args.host}:{args.port}/api/v3 （统计信息: /stats）")
+    logger.info(f"设置环境变量 ARK_BASE_URL=http://{args.host}:{args.port}/api/v3 后运行分析流程即可使用本服务")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with server.state.lock:
+            logger.info(f"统计: {server.state.stats}")
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,9 @@ import time
 import logging
 import schedule
 from datetime import datetime
-from data_processor import NewsDataProcessor
-from data_integrator import NewsDataIntegrator
+from raw_scanner import get_scanner
+from trading_calendar import get_calendar
+from metrics import registry, timer, configure_metrics, log_run_summary
 
 # 配置日志
 logging.basicConfig(
@@ -37,16 +38,39 @@ class NewsDataPipeline:
         self.archive_dir = self.config["data_paths"]["archive_dir"]
         self.interval_minutes = self.config["processing"]["interval_minutes"]
         self.run_continuously = self.config["processing"]["run_continuously"]
+        # fixed: 按固定间隔运行；trading_calendar: 按交易时段调整运行间隔（夜间和非交易日降低频率）
+        self.schedule_mode = self.config["processing"]["schedule_mode"]
+        self.calendar = get_calendar(config_file)
+        configure_metrics(config_file, process_name="pipeline")
         
         # 确保所有目录存在
         os.makedirs(self.input_dir, exist_ok=True)
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.archive_dir, exist_ok=True)
         
-        logger.info(f"初始化数据处理器和集成器")
-        # 初始化处理器和集成器
-        self.processor = NewsDataProcessor(self.input_dir, self.output_dir, self.archive_dir)
-        self.integrator = NewsDataIntegrator(config_file)
+        # 处理器和集成器依赖pandas等较重的模块，在第一次运行流水线时才创建，
+        # 使监视器等导入本模块的进程能够快速启动
+        self.config_file = config_file
+        self._processor = None
+        self._integrator = None
+
+    @property
+    def processor(self):
+        """数据处理器（第一次使用时创建）"""
+        if self._processor is None:
+            from data_processor import NewsDataProcessor
+            logger.info("初始化数据处理器")
+            self._processor = NewsDataProcessor(self.input_dir, self.output_dir, self.archive_dir)
+        return self._processor
+
+    @property
+    def integrator(self):
+        """数据集成器（第一次使用时创建）"""
+        if self._integrator is None:
+            from data_integrator import NewsDataIntegrator
+            logger.info("初始化数据集成器")
+            self._integrator = NewsDataIntegrator(self.config_file)
+        return self._integrator
     
     def _ensure_config_keys(self):
         """确保配置中包含所有必要的键"""
@@ -72,6 +96,9 @@ class NewsDataPipeline:
         if "run_continuously" not in self.config["processing"]:
             self.config["processing"]["run_continuously"] = False
             
+        if "schedule_mode" not in self.config["processing"]:
+            self.config["processing"]["schedule_mode"] = "fixed"
+            
         if "integration" not in self.config:
             self.config["integration"] = {}
             
@@ -105,7 +132,8 @@ class NewsDataPipeline:
             },
             "processing": {
                 "interval_minutes": 10,
-                "run_continuously": False
+                "run_continuously": False,
+                "schedule_mode": "fixed"
             },
             "integration": {
                 "target_db_file": "news_database.db",
@@ -121,57 +149,66 @@ class NewsDataPipeline:
     def run_pipeline(self):
         """运行完整的数据处理流水线"""
         logger.info("开始运行数据处理流水线...")
+        registry.start_run()
         
         try:
-            # 步骤1: 处理新数据
-            logger.info("步骤1: 处理新数据")
-            
-            # 添加调试信息 - 检查目录结构
-            logger.info(f"数据输入目录: {self.input_dir} (存在: {os.path.exists(self.input_dir)})")
-            logger.info(f"数据输出目录: {self.output_dir} (存在: {os.path.exists(self.output_dir)})")
-            logger.info(f"数据归档目录: {self.archive_dir} (存在: {os.path.exists(self.archive_dir)})")
-            
-            # 添加调试信息 - 列出目录中的文件
-            if os.path.exists(self.input_dir):
-                all_files = os.listdir(self.input_dir)
-                logger.info(f"输入目录中的所有项: {all_files}")
-                
-                # 检查子目录内容
-                for item in all_files:
-                    item_path = os.path.join(self.input_dir, item)
-                    if os.path.isdir(item_path):
-                        logger.info(f"子目录 {item} 中的文件: {os.listdir(item_path)[:5]}...等")
-            
-            # 处理数据
-            self.processor.process()
-            
-            # 步骤2: 将处理后的数据集成到数据库
-            logger.info("步骤2: 将处理后的数据集成到数据库")
-            self.integrator.integrate()
-            
-            # 步骤3: 导出为JSON文件，用于现有系统
-            logger.info("步骤3: 导出为JSON文件，用于现有系统")
-            json_output_file = self.config.get("output_json_file", "data/news_data.json")
-            
-            # 确保输出目录存在
-            os.makedirs(os.path.dirname(json_output_file), exist_ok=True)
-            
-            records_exported = self.integrator.export_to_json(json_output_file)
-            if records_exported > 0:
-                logger.info(f"已将 {records_exported} 条记录导出到 {json_output_file}")
-            
+            with timer("pipeline_run_seconds"):
+                self._run_stages()
             logger.info("数据处理流水线运行完成")
         except Exception as e:
             logger.error(f"运行数据处理流水线时出错: {str(e)}")
+        finally:
+            log_run_summary("数据处理流水线", logger)
+    
+    def _run_stages(self):
+        """依次运行流水线各阶段（每个阶段单独计时）"""
+        # 步骤1: 处理新数据
+        logger.info("步骤1: 处理新数据")
+        
+        # 添加调试信息 - 检查目录结构
+        logger.info(f"数据输入目录: {self.input_dir} (存在: {os.path.exists(self.input_dir)})")
+        logger.info(f"数据输出目录: {self.output_dir} (存在: {os.path.exists(self.output_dir)})")
+        logger.info(f"数据归档目录: {self.archive_dir} (存在: {os.path.exists(self.archive_dir)})")
+        
+        # 添加调试信息 - 输入目录中的文件（共享扫描器，未变化的目录不会重复扫描）
+        with timer("pipeline_stage_seconds", stage="scan"):
+            raw_files = get_scanner(self.input_dir).scan()
+        logger.info(f"输入目录中共有 {len(raw_files)} 个待处理文件")
+        
+        # 处理数据
+        with timer("pipeline_stage_seconds", stage="process"):
+            self.processor.process()
+        
+        # 步骤2: 将处理后的数据集成到数据库
+        logger.info("步骤2: 将处理后的数据集成到数据库")
+        with timer("pipeline_stage_seconds", stage="integrate"):
+            self.integrator.integrate()
+        
+        # 步骤3: 导出为JSON文件，用于现有系统
+        logger.info("步骤3: 导出为JSON文件，用于现有系统")
+        json_output_file = self.config.get("output_json_file", "data/news_data.json")
+        
+        # 确保输出目录存在
+        os.makedirs(os.path.dirname(json_output_file), exist_ok=True)
+        
+        with timer("pipeline_stage_seconds", stage="export"):
+            records_exported = self.integrator.export_to_json(json_output_file)
+        if records_exported > 0:
+            logger.info(f"已将 {records_exported} 条记录导出到 {json_output_file}")
     
     def start(self):
         """启动数据处理流水线"""
-        logger.info(f"数据处理流水线启动，间隔时间: {self.interval_minutes} 分钟")
+        if self.schedule_mode == "trading_calendar":
+            logger.info("数据处理流水线启动，按交易时段调整运行间隔")
+        else:
+            logger.info(f"数据处理流水线启动，间隔时间: {self.interval_minutes} 分钟")
         
         # 立即运行一次
         self.run_pipeline()
         
-        if self.run_continuously:
+        if self.run_continuously and self.schedule_mode == "trading_calendar":
+            self._run_with_trading_calendar()
+        elif self.run_continuously:
             # 设置定时任务
             schedule.every(self.interval_minutes).minutes.do(self.run_pipeline)
             
@@ -180,6 +217,18 @@ class NewsDataPipeline:
                 schedule.run_pending()
                 time.sleep(1)
 
+    def _run_with_trading_calendar(self):
+        """按交易时段持续运行：交易时段内频繁运行，夜间和非交易日降低频率，时段切换时立即按新间隔运行"""
+        last_session = None
+        while True:
+            wait_seconds = self.calendar.pipeline_wait_seconds()
+            session = self.calendar.get_session()
+            if session != last_session:
+                logger.info(f"当前交易时段: {session}，下次运行将在 {wait_seconds:.0f} 秒后")
+                last_session = session
+            time.sleep(wait_seconds)
+            self.run_pipeline()
+
 def main():
     pipeline = NewsDataPipeline()
     pipeline.start()
@@ -0,0 +1,155 @@
+import os
+import json
+import logging
+from datetime import datetime
+
+from trading_calendar import get_calendar, SESSION_PRE_OPEN, SESSION_CONTINUOUS
+
+logger = logging.getLogger("NewsPriority")
+
+# 本地预评分关键词，对应 news_analyzer 中的五级重要性分级（不调用大模型，只用于排序）
+IMPORTANCE_KEYWORDS = {
+    1: ["国务院", "中共中央", "央行", "人民银行", "财政部", "发改委", "证监会", "金融监管总局",
+        "降准", "降息", "加息", "LPR", "专项债", "国常会", "政治局", "两会", "政府工作报告"],
+    2: ["行业", "产业政策", "工信部", "商务部", "关税", "补贴", "技术突破", "集采", "产能", "出口管制"],
+    3: ["业绩预告", "业绩快报", "净利润", "重组", "并购", "收购", "中标", "签订", "合同",
+        "回购", "增持", "减持", "定增", "董事长", "停牌", "复牌", "立案"],
+    5: ["传闻", "据悉", "知情人士", "网传", "或将", "消息人士", "未经证实"]
+}
+
+# 没有匹配任何关键词时的预估等级
+DEFAULT_IMPORTANCE_LEVEL = 4
+
+def parse_publish_time(value):
+    """
+    解析新闻发布时间
+
+    返回:
+    datetime对象，无法解析时返回None
+    """
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str) or not value.strip():
+        return None
+    value = value.strip()
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value[:19], fmt)
+        except ValueError:
+            continue
+    return None
+
+class NewsPriorityScorer:
+    def __init__(self, config_file="config.json"):
+        """
+        初始化新闻优先级评分器
+
+        优先级 = 本地预评分（关键词预估的重要性） + 来源权重 + 时效性得分，
+        交易时段内时效性得分按 market_hours_multiplier 加倍；发布时间超过 max_age_hours 的新闻视为过期，不再分析
+
+        参数:
+        config_file: 配置文件路径，读取其中的 priority 部分
+        """
+        self.config = self._load_config(config_file)
+        self.max_age_hours = self.config["max_age_hours"]
+        self.recency_half_life_hours = self.config["recency_half_life_hours"]
+        self.recency_weight = self.config["recency_weight"]
+        self.market_hours_multiplier = self.config["market_hours_multiplier"]
+        self.source_weights = self.config["source_weights"]
+        self.calendar = get_calendar(config_file)
+
+    def _load_config(self, config_file):
+        """加载优先级配置"""
+        priority_config = self._get_default_config()
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    priority_config.update(json.load(f).get("priority", {}))
+        except Exception as e:
+            logger.error(f"加载优先级配置时出错: {str(e)}，使用默认配置")
+        return priority_config
+
+    def _get_default_config(self):
+        """获取默认配置"""
+        return {
+            "max_age_hours": 24,
+            "recency_half_life_hours": 2,
+            "recency_weight": 30,
+            "market_hours_multiplier": 2,
+            "source_weights": {}
+        }
+
+    def estimate_importance(self, news):
+        """
+        根据关键词预估新闻重要性等级（1-5，数字越小越重要）
+        """
+        text = f"{news.get('title', '') or ''} {news.get('content', '') or ''}"
+        # 市场传闻关键词优先判断，避免“据悉央行将……”之类的传闻被当作政策
+        if any(keyword in text for keyword in IMPORTANCE_KEYWORDS[5]):
+            return 5
+        for level in (1, 2, 3):
+            if any(keyword in text for keyword in IMPORTANCE_KEYWORDS[level]):
+                return level
+        return DEFAULT_IMPORTANCE_LEVEL
+
+    def is_stale(self, news, now=None):
+        """判断新闻是否已经过期（没有发布时间的新闻不视为过期）"""
+        published = parse_publish_time(news.get('publish_time'))
+        if published is None or self.max_age_hours is None:
+            return False
+        now = now or datetime.now()
+        return (now - published).total_seconds() > self.max_age_hours * 3600
+
+    def score(self, news, now=None):
+        """
+        计算新闻的分析优先级
+
+        参数:
+        news: 新闻记录
+        now: 当前时间，默认为系统时间
+
+        返回:
+        优先级分数（越大越优先），新闻已过期时返回None
+        """
+        now = now or datetime.now()
+        if self.is_stale(news, now):
+            return None
+
+        # 本地预评分：1级100分，每降一级减20分
+        score = (6 - self.estimate_importance(news)) * 20
+
+        # 来源权重
+        score += self.source_weights.get(news.get('source') or '', 0)
+
+        # 时效性：按半衰期衰减，交易时段内的新鲜新闻更可能立即影响股价
+        published = parse_publish_time(news.get('publish_time'))
+        if published is not None:
+            age_hours = max((now - published).total_seconds() / 3600, 0)
+            recency = 0.5 ** (age_hours / self.recency_half_life_hours)
+            weight = self.recency_weight
+            # 交易时段（含开盘前的预热窗口）内发布的新闻可能立即影响股价
+            if self.calendar.get_session(now) in (SESSION_PRE_OPEN, SESSION_CONTINUOUS) or self.calendar.should_prewarm(now):
+                weight *= self.market_hours_multiplier
+            score += weight * recency
+
+        return round(score, 2)
+
+    def prioritize(self, news_list, now=None):
+        """
+        按优先级排序新闻并去除过期新闻
+
+        返回:
+        (排序后的新闻列表, 过期新闻数量) 元组
+        """
+        now = now or datetime.now()
+        scored = []
+        stale_count = 0
+        for news in news_list:
+            priority = self.score(news, now)
+            if priority is None:
+                stale_count += 1
+                continue
+            scored.append((priority, news))
+        # 稳定排序，同分数保持原有顺序
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [news for _, news in scored], stale_count
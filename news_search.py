@@ -0,0 +1,252 @@
+import os
+import re
+import sqlite3
+import pathlib
+from datetime import datetime, timedelta
+
+# trigram分词器只能匹配长度不小于3个字符的词
+TRIGRAM_MIN_TERM_LENGTH = 3
+
+# 列表中只返回内容摘要，完整内容通过 get_news 按需加载
+SUMMARY_LENGTH = 120
+
+class NewsSearcher:
+    def __init__(self, db_file="news_database.db", table_name="news_articles"):
+        """
+        初始化新闻搜索器（基于 NewsDataIntegrator 维护的SQLite数据库，只读访问）
+
+        参数:
+        db_file: 新闻数据库文件路径
+        table_name: 新闻表名
+        """
+        self.db_file = db_file
+        self.table_name = table_name
+        self.fts_table = f"{table_name}_fts"
+
+    def _connect(self):
+        """以只读模式连接数据库"""
+        if not os.path.exists(self.db_file):
+            raise FileNotFoundError(f"新闻数据库 {self.db_file} 不存在")
+        uri = pathlib.Path(self.db_file).absolute().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _get_fts_tokenizer(self, conn):
+        """
+        获取全文索引使用的分词器
+
+        返回:
+        分词器名称，没有全文索引时返回None
+        """
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (self.fts_table,)
+        ).fetchone()
+        if not row:
+            return None
+        match = re.search(r"tokenize\s*=\s*'(\w+)", row['sql'])
+        return match.group(1) if match else "unicode61"
+
+    @staticmethod
+    def _format_date(value, add_days=0):
+        """将日期转换为与publish_time可比较的字符串"""
+        if isinstance(value, str):
+            value = datetime.strptime(value[:10], '%Y-%m-%d').date()
+        if isinstance(value, datetime):
+            value = value.date()
+        return (value + timedelta(days=add_days)).strftime('%Y-%m-%d')
+
+    def _build_filters(self, start_date=None, end_date=None, source=None, alias="a"):
+        """构建日期和来源的过滤条件"""
+        conditions = []
+        params = []
+        if start_date:
+            conditions.append(f"{alias}.publish_time >= ?")
+            params.append(self._format_date(start_date))
+        if end_date:
+            # 结束日期包含当天
+            conditions.append(f"{alias}.publish_time < ?")
+            params.append(self._format_date(end_date, add_days=1))
+        if source:
+            conditions.append(f"{alias}.source = ?")
+            params.append(source)
+        return conditions, params
+
+    @staticmethod
+    def _quote_fts_term(term):
+        """将搜索词转换为FTS5字符串，避免特殊字符被解析为查询语法"""
+        return '"' + term.replace('"', '""') + '"'
+
+    def search(self, keyword=None, start_date=None, end_date=None, source=None, page=1, page_size=20):
+        """
+        搜索新闻
+
+        有关键词时优先使用FTS5全文索引并按相关度(bm25)排序，
+        无法使用全文索引的短词退化为LIKE匹配；
+        没有关键词时按发布时间倒序列出
+
+        参数:
+        keyword: 搜索关键词，多个关键词以空格分隔（需同时匹配）
+        start_date: 发布日期下限（包含）
+        end_date: 发布日期上限（包含）
+        source: 新闻来源
+        page: 页码，从1开始
+        page_size: 每页条数
+
+        返回:
+        字典，包含 total（总条数）、page、page_size 和 items（当前页的新闻摘要列表）
+        """
+        page = max(int(page), 1)
+        page_size = max(int(page_size), 1)
+        terms = keyword.split() if keyword else []
+
+        conn = self._connect()
+        try:
+            conditions, params = self._build_filters(start_date, end_date, source)
+
+            # 区分可以使用全文索引的词和需要LIKE匹配的词
+            tokenizer = self._get_fts_tokenizer(conn) if terms else None
+            if tokenizer == "trigram":
+                fts_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_TERM_LENGTH]
+            else:
+                # unicode61分词器无法切分中文，只能使用LIKE匹配
+                fts_terms = []
+            like_terms = [t for t in terms if t not in fts_terms]
+
+            for term in like_terms:
+                conditions.append("(a.title LIKE ? OR a.content LIKE ?)")
+                params.extend([f"%{term}%", f"%{term}%"])
+
+            columns = f"a.id, a.title, a.publish_time, a.source, a.url, substr(a.content, 1, {SUMMARY_LENGTH}) AS summary"
+            if fts_terms:
+                conditions.insert(0, f"{self.fts_table} MATCH ?")
+                params.insert(0, " AND ".join(self._quote_fts_term(t) for t in fts_terms))
+                from_clause = f"{self.fts_table} JOIN {self.table_name} a ON a.id = {self.fts_table}.rowid"
+                order_clause = f"bm25({self.fts_table}), a.publish_time DESC"
+            else:
+                from_clause = f"{self.table_name} a"
+                order_clause = "a.publish_time DESC, a.id DESC"
+
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM {from_clause} {where_clause}", params
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {columns} FROM {from_clause} {where_clause} ORDER BY {order_clause} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            ).fetchall()
+
+            return {
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "items": [dict(row) for row in rows]
+            }
+        finally:
+            conn.close()
+
+    def count_news(self, start_date=None, end_date=None, source=None):
+        """
+        统计符合日期和来源条件的新闻数量
+
+        返回:
+        新闻条数
+        """
+        conn = self._connect()
+        try:
+            conditions, params = self._build_filters(start_date, end_date, source)
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            return conn.execute(
+                f"SELECT COUNT(*) FROM {self.table_name} a {where_clause}", params
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def list_news(self, start_date=None, end_date=None, source=None, cursor=None, page_size=20):
+        """
+        按发布时间倒序分页列出新闻（键集分页，翻页代价与页码无关）
+
+        参数:
+        start_date: 发布日期下限（包含）
+        end_date: 发布日期上限（包含）
+        source: 新闻来源
+        cursor: 上一页最后一条新闻的 (publish_time, id)，为None时从最新的新闻开始
+        page_size: 每页条数
+
+        返回:
+        字典，包含 items（当前页的新闻摘要列表）和 next_cursor（下一页的游标，没有下一页时为None）
+        """
+        page_size = max(int(page_size), 1)
+
+        conn = self._connect()
+        try:
+            conditions, params = self._build_filters(start_date, end_date, source)
+
+            # 倒序排列时publish_time为空的新闻排在最后
+            if cursor is not None:
+                cursor_time, cursor_id = cursor
+                if cursor_time is None:
+                    conditions.append("(a.publish_time IS NULL AND a.id < ?)")
+                    params.append(cursor_id)
+                else:
+                    conditions.append(
+                        "(a.publish_time < ? OR (a.publish_time = ? AND a.id < ?) OR a.publish_time IS NULL)"
+                    )
+                    params.extend([cursor_time, cursor_time, cursor_id])
+
+            where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+            # 多取一条用于判断是否还有下一页
+            rows = conn.execute(
+                f"""
+                SELECT a.id, a.title, a.publish_time, a.source, a.url, substr(a.content, 1, {SUMMARY_LENGTH}) AS summary
+                FROM {self.table_name} a {where_clause}
+                ORDER BY a.publish_time DESC, a.id DESC
+                LIMIT ?
+                """,
+                params + [page_size + 1]
+            ).fetchall()
+
+            items = [dict(row) for row in rows[:page_size]]
+            next_cursor = None
+            if len(rows) > page_size:
+                next_cursor = (items[-1]['publish_time'], items[-1]['id'])
+
+            return {
+                "items": items,
+                "next_cursor": next_cursor
+            }
+        finally:
+            conn.close()
+
+    def get_news(self, news_id):
+        """
+        获取单条新闻的完整内容
+
+        参数:
+        news_id: 新闻ID
+
+        返回:
+        新闻记录字典，不存在时返回None
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                f"SELECT * FROM {self.table_name} WHERE id = ?", (news_id,)
+            ).fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def list_sources(self):
+        """获取所有新闻来源"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT DISTINCT source FROM {self.table_name} WHERE source IS NOT NULL ORDER BY source"
+            ).fetchall()
+            return [row['source'] for row in rows]
+        finally:
+            conn.close()
@@ -2,8 +2,10 @@ import os
 import sys
 import json
 import time
+import queue
 import logging
 import hashlib
+import threading
 from datetime import datetime
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -13,20 +15,11 @@ sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 # 导入需要的模块
 from news_data_pipeline import NewsDataPipeline
-
-# 添加src目录到系统路径
-src_dir = os.path.join(os.path.dirname(__file__), 'src')
-if os.path.exists(src_dir):
-    sys.path.append(src_dir)
-    try:
-        from main import process_news_data
-        MAIN_MODULE_AVAILABLE = True
-    except ImportError as e:
-        logging.error(f"无法导入main模块: {e}")
-        MAIN_MODULE_AVAILABLE = False
-else:
-    MAIN_MODULE_AVAILABLE = False
-    logging.error("src目录不存在，无法导入main模块")
+from raw_scanner import get_scanner
+from news_priority import NewsPriorityScorer
+from trading_calendar import get_calendar
+from metrics import configure_metrics, start_http_server
+from analysis_worker import create_job_queue, load_queue_config, start_worker_processes, stop_worker_processes
 
 # 配置日志
 logging.basicConfig(
@@ -56,10 +49,30 @@ class NewsWatcher:
         self.news_data_file = self.config.get("output_json_file", "data/news_data.json")
         self.processed_records_file = self.config.get("watcher", {}).get("processed_records_file", "data/processed_records.json")
         self.check_interval = self.config.get("watcher", {}).get("check_interval_seconds", 30)
+        # 为True时按交易时段调整主动检查间隔，否则使用固定的 check_interval_seconds
+        self.use_trading_calendar = self.config.get("watcher", {}).get("use_trading_calendar", False)
+        self.calendar = get_calendar(config_file)
+        # 文件大小和修改时间保持不变超过该时间后才认为写入完成
+        self.file_stable_seconds = self.config.get("watcher", {}).get("file_stable_seconds", 2)
+        # 报告清理（压缩、删除旧报告）只在监视器中定期执行，与分析工作进程使用同一个报告目录
+        self.report_retention_interval = self.config.get("watcher", {}).get("report_retention_interval_hours", 24) * 3600
+        self.report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+        self.last_report_retention = None
+        
+        # raw目录扫描器（与流水线、处理器共享目录缓存）
+        self.scanner = get_scanner(self.input_dir)
+        
+        # 文件事件队列：监视器线程只负责入队，由单个工作线程合并事件并处理
+        self.event_queue = queue.Queue()
+        self.worker_thread = None
         
-        # 加载已处理记录
+        # 加载已入队的记录
         self.processed_records = self.load_processed_records()
         
+        # 分析任务队列：监视器只负责检测新记录并入队，由分析工作进程完成分析
+        self.job_queue = create_job_queue(config_file)
+        self.priority_scorer = NewsPriorityScorer(config_file)
+        
         # 初始化数据处理流水线
         self.pipeline = NewsDataPipeline(config_file)
         
@@ -114,7 +127,10 @@ class NewsWatcher:
             "watcher": {
                 "enabled": True,
                 "check_interval_seconds": 30,
-                "processed_records_file": "data/processed_records.json"
+                "use_trading_calendar": False,
+                "file_stable_seconds": 2,
+                "processed_records_file": "data/processed_records.json",
+                "report_retention_interval_hours": 24
             }
         }
     
@@ -170,38 +186,8 @@ class NewsWatcher:
         return hashlib.md5(data_to_hash.encode('utf-8')).hexdigest()
     
     def get_raw_files_info(self):
-        """获取raw目录下的文件信息"""
-        if not os.path.exists(self.input_dir):
-            logger.warning(f"输入目录 {self.input_dir} 不存在")
-            return []
-            
-        # 获取raw目录下的所有文件（包括子目录）
-        files = []
-        
-        # 递归扫描目录函数
-        def scan_directory(directory):
-            for item in os.listdir(directory):
-                item_path = os.path.join(directory, item)
-                if os.path.isdir(item_path):
-                    # 如果是目录，递归扫描
-                    scan_directory(item_path)
-                elif os.path.isfile(item_path):
-                    # 仅处理JSON和CSV文件
-                    if item_path.endswith('.json') or item_path.endswith('.csv'):
-                        mtime = os.path.getmtime(item_path)
-                        size = os.path.getsize(item_path)
-                        files.append({
-                            'path': item_path,
-                            'name': item,
-                            'mtime': mtime,
-                            'size': size,
-                            'mtime_str': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-                        })
-        
-        # 开始递归扫描
-        scan_directory(self.input_dir)
-        
-        return files
+        """获取raw目录下的文件信息（包括子目录，未变化的目录使用扫描器缓存）"""
+        return self.scanner.scan()
     
     def has_new_raw_files(self):
         """检查raw目录是否有新文件或文件变化"""
@@ -213,8 +199,13 @@ class NewsWatcher:
         
         # 检查文件是否有变化
         has_new = False
+        now = time.time()
         for file_info in files_info:
             file_path = file_info['path']
+            # 最近仍在修改的文件可能还没有写完，留到下次检查
+            if now - file_info['mtime'] < self.file_stable_seconds:
+                logger.debug(f"文件仍在写入，稍后再检查: {file_path}")
+                continue
             # 计算文件的指纹（使用修改时间和大小）
             file_fingerprint = f"{file_info['mtime']}_{file_info['size']}"
             
@@ -231,24 +222,31 @@ class NewsWatcher:
             
         return has_new
     
-    def process_news_data(self, new_records):
-        """使用main模块处理新闻数据"""
-        if not MAIN_MODULE_AVAILABLE:
-            logger.warning("main模块不可用，无法进行新闻分析")
-            return False
+    def enqueue_news_records(self, new_records):
+        """
+        将新记录加入分析任务队列
         
-        try:
-            # 导入时已经尝试过导入process_news_data
-            output_dir = os.path.join(os.path.dirname(__file__), 'output')
-            logger.info(f"开始使用main.process_news_data处理 {len(new_records)} 条记录...")
-            process_news_data(new_records, output_dir)
-            logger.info("新闻分析处理完成")
-            return True
-        except Exception as e:
-            logger.error(f"调用process_news_data处理新闻时出错: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return False
+        按新闻优先级入队，工作进程优先领取重要、新鲜的新闻；
+        超过最长时效的新闻不再分析，直接视为已处理
+        
+        返回:
+        成功入队的记录ID列表（已在队列中的记录和过期跳过的记录也视为成功）
+        """
+        enqueued = []
+        now = datetime.now()
+        for record_id, news in new_records:
+            priority = self.priority_scorer.score(news, now)
+            if priority is None:
+                logger.info(f"新闻已过期，跳过分析: {news.get('title', '无标题')[:30]}... (发布时间: {news.get('publish_time', '未知')})")
+                enqueued.append(record_id)
+                continue
+            try:
+                if self.job_queue.enqueue(record_id, news, priority=priority):
+                    logger.info(f"已加入分析队列(优先级 {priority}): {news.get('title', '无标题')[:30]}... (ID: {record_id[:8]})")
+                enqueued.append(record_id)
+            except Exception as e:
+                logger.error(f"新闻加入分析队列时出错: {str(e)}")
+        return enqueued
     
     def print_news_data_summary(self, news_data):
         """打印新闻数据摘要"""
@@ -301,89 +299,203 @@ class NewsWatcher:
             for news in news_data:
                 record_id = self.generate_record_id(news)
                 if record_id not in self.processed_records:
-                    new_records.append(news)
-                    # 将其标记为已处理
-                    self.processed_records[record_id] = {
-                        "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "title": news.get('title', '无标题')
-                    }
+                    new_records.append((record_id, news))
                     logger.info(f"找到新记录: {news.get('title', '无标题')[:30]}... (ID: {record_id[:8]})")
                 else:
                     logger.debug(f"记录已处理过: {news.get('title', '无标题')[:30]}... (ID: {record_id[:8]})")
             
+            if not new_records:
+                logger.info("没有新的新闻记录需要处理")
+                return
+            
+            # 入队成功后才标记为已处理，入队失败的记录下次检查时重试；
+            # 分析在工作进程中进行，完成确认前崩溃的任务会被重新领取
+            logger.info(f"发现 {len(new_records)} 条新的新闻记录，加入分析队列...")
+            titles = {record_id: news.get('title', '无标题') for record_id, news in new_records}
+            for record_id in self.enqueue_news_records(new_records):
+                self.processed_records[record_id] = {
+                    "processed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "title": titles[record_id]
+                }
+            
             # 保存已处理记录
             self.save_processed_records()
-            
-            # 如果有新记录，处理它们
-            if new_records:
-                logger.info(f"发现 {len(new_records)} 条新的新闻记录，开始处理...")
-                # 调用main模块中的process_news_data处理新闻
-                self.process_news_data(new_records)
-            else:
-                logger.info("没有新的新闻记录需要处理")
                 
         except Exception as e:
             logger.error(f"处理新数据时出错: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
 
+    def run_report_retention_if_due(self):
+        """距离上次报告清理超过 report_retention_interval_hours 时执行一次清理"""
+        now = time.time()
+        if self.last_report_retention is not None and now - self.last_report_retention < self.report_retention_interval:
+            return
+        self.last_report_retention = now
+        try:
+            # 报告模块只在清理时导入，不影响监视器的启动耗时
+            from visualization import apply_report_retention
+            refresh_dates = apply_report_retention(self.report_dir)
+            if refresh_dates:
+                logger.info(f"报告清理完成，刷新了 {len(refresh_dates)} 个日期的索引页")
+        except Exception as e:
+            logger.error(f"清理报告时出错: {str(e)}")
+
+    def next_check_seconds(self):
+        """下次主动检查前的等待秒数（按交易时段调整，或使用配置的固定间隔）"""
+        if self.use_trading_calendar:
+            return self.calendar.watcher_wait_seconds()
+        return self.check_interval
+    
+    def enqueue_event(self, kind, path=None):
+        """
+        将文件事件加入队列（由监视器线程调用，不做任何耗时操作）
+        
+        参数:
+        kind: 事件类型，raw（raw目录文件变化）、news_data（新闻数据文件变化）或 tick（定时检查）
+        path: 发生变化的文件路径
+        """
+        self.event_queue.put((kind, path))
+    
+    def start_worker(self):
+        """启动处理事件队列的工作线程"""
+        self.worker_thread = threading.Thread(target=self._event_worker, name="NewsWatcherWorker", daemon=True)
+        self.worker_thread.start()
+    
+    def stop_worker(self):
+        """停止工作线程（等待正在进行的处理完成）"""
+        if self.worker_thread is not None:
+            self.event_queue.put(None)
+            self.worker_thread.join()
+            self.worker_thread = None
+    
+    @staticmethod
+    def _file_fingerprint(path):
+        """获取文件的大小和修改时间，文件不存在时返回None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime)
+    
+    def _event_worker(self):
+        """
+        事件处理循环
+        
+        同一文件的多次事件合并为一次；文件大小和修改时间在 file_stable_seconds 内保持不变后
+        才开始处理，避免读取写了一半的文件。处理期间到达的事件留在队列中，处理完后统一合并，不会丢失
+        """
+        # 等待写入完成的文件: path -> [事件类型, 指纹, 指纹开始保持不变的时间]
+        pending = {}
+        tick_requested = False
+        
+        while True:
+            # 有待确认的文件时定期轮询文件状态，否则阻塞等待新事件
+            try:
+                events = [self.event_queue.get(timeout=0.5 if pending else None)]
+            except queue.Empty:
+                events = []
+            # 取出队列中已有的全部事件一起合并
+            while True:
+                try:
+                    events.append(self.event_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if None in events:
+                logger.info("事件处理线程退出")
+                return
+            
+            now = time.time()
+            for kind, path in events:
+                if kind == "tick":
+                    tick_requested = True
+                elif path not in pending:
+                    pending[path] = [kind, self._file_fingerprint(path), now]
+            
+            # 检查文件是否已经写入完成
+            ready_kinds = set()
+            for path in list(pending):
+                kind, fingerprint, stable_since = pending[path]
+                current = self._file_fingerprint(path)
+                if current is None:
+                    # 文件已被删除或移走
+                    del pending[path]
+                elif current != fingerprint:
+                    pending[path] = [kind, current, now]
+                elif now - stable_since >= self.file_stable_seconds:
+                    logger.info(f"文件写入完成: {path}")
+                    ready_kinds.add(kind)
+                    # 原地修改文件不会改变目录修改时间，需要让扫描器重新扫描该目录
+                    if kind == "raw":
+                        self.scanner.invalidate(path)
+                    del pending[path]
+            
+            # 还有文件在写入时推迟定时检查，避免读取写了一半的文件
+            if tick_requested and pending:
+                continue
+            
+            if ready_kinds or tick_requested:
+                tick_requested = False
+                # raw目录有文件写入完成时强制运行流水线；新闻数据文件变化可能是由流水线引起的，不强制运行
+                self.process_new_data(force_pipeline_run="raw" in ready_kinds)
+                self.run_report_retention_if_due()
+
 class RawFileHandler(FileSystemEventHandler):
     def __init__(self, watcher):
         super().__init__()
         self.watcher = watcher
-        self.last_processed = 0
-        # 设置一个合理的防抖时间（秒）
-        self.debounce_seconds = 3
+    
+    @staticmethod
+    def _is_news_file(path):
+        return path.endswith('.json') or path.endswith('.csv')
     
     def on_created(self, event):
-        # 只处理文件创建事件
-        if not event.is_directory and (event.src_path.endswith('.json') or event.src_path.endswith('.csv')):
-            if event.src_path.startswith(self.watcher.input_dir):
-                self._handle_event(event)
+        # 文件创建事件
+        if not event.is_directory and self._is_news_file(event.src_path):
+            self.watcher.enqueue_event("raw", event.src_path)
     
     def on_modified(self, event):
-        # 只处理文件修改事件
-        if not event.is_directory and (event.src_path.endswith('.json') or event.src_path.endswith('.csv')):
-            if event.src_path.startswith(self.watcher.input_dir):
-                self._handle_event(event)
-            
-    def _handle_event(self, event):
-        current_time = time.time()
-        # 防抖：确保在短时间内多次触发事件只处理一次
-        if current_time - self.last_processed > self.debounce_seconds:
-            logger.info(f"检测到raw目录文件变化: {event.src_path}")
-            self.last_processed = current_time
-            # 强制运行流水线处理
-            self.watcher.process_new_data(force_pipeline_run=True)
+        # 文件修改事件
+        if not event.is_directory and self._is_news_file(event.src_path):
+            self.watcher.enqueue_event("raw", event.src_path)
+    
+    def on_moved(self, event):
+        # 爬虫先写临时文件再重命名时，只会产生移动事件
+        if not event.is_directory and self._is_news_file(event.dest_path):
+            self.watcher.enqueue_event("raw", event.dest_path)
 
 class NewsDataFileHandler(FileSystemEventHandler):
     def __init__(self, watcher):
         super().__init__()
         self.watcher = watcher
-        self.last_processed = 0
-        # 设置一个合理的防抖时间（秒）
-        self.debounce_seconds = 2
     
     def on_modified(self, event):
         # 只处理目标文件的修改事件
-        if not event.is_directory and event.src_path.endswith(self.watcher.news_data_file):
-            current_time = time.time()
-            # 防抖：确保在短时间内多次触发事件只处理一次
-            if current_time - self.last_processed > self.debounce_seconds:
-                logger.info(f"检测到新闻数据文件变化: {event.src_path}")
-                self.last_processed = current_time
-                # 由于文件变化可能是由pipeline引起的，我们不强制运行流水线
-                self.watcher.process_new_data(force_pipeline_run=False)
+        if not event.is_directory and os.path.abspath(event.src_path) == os.path.abspath(self.watcher.news_data_file):
+            self.watcher.enqueue_event("news_data", event.src_path)
 
 def main():
     # 创建实例并传入配置文件路径
     config_file = "config.json"
     watcher = NewsWatcher(config_file)
     
+    # 监视器进程提供 /metrics 端点（需配置 metrics.http_port），流水线指标也记录在本进程中
+    configure_metrics(config_file, process_name="watcher")
+    start_http_server()
+    
+    # 启动分析工作进程（也可以设置 start_workers_with_watcher 为false，单独运行 analysis_worker.py）
+    worker_processes = []
+    if load_queue_config(config_file).get("start_workers_with_watcher", True):
+        worker_processes = start_worker_processes(config_file)
+    
     # 首次运行，处理现有数据
     logger.info("首次运行，处理现有数据...")
     watcher.process_new_data(force_pipeline_run=True)
     
+    # 启动事件处理线程，之后所有处理都在该线程中进行
+    watcher.start_worker()
+    
     # 设置文件系统监视器：监控raw目录
     logger.info(f"开始监视raw目录 {watcher.input_dir} 的变化...")
     raw_event_handler = RawFileHandler(watcher)
@@ -401,14 +513,16 @@ def main():
     try:
         while True:
             # 每隔一段时间主动检查一次（作为备选机制）
-            time.sleep(watcher.check_interval)  # 使用配置的检查间隔
-            watcher.process_new_data()
+            time.sleep(watcher.next_check_seconds())
+            watcher.enqueue_event("tick")
     except KeyboardInterrupt:
         raw_observer.stop()
         news_data_observer.stop()
     
     raw_observer.join()
     news_data_observer.join()
+    watcher.stop_worker()
+    stop_worker_processes(worker_processes)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("RawFileScanner")
+
+# 需要处理的原始数据文件扩展名
+RAW_FILE_EXTENSIONS = ('.json', '.csv')
+
+# 修改时间距扫描时不超过该秒数的文件视为可能仍在写入，下次扫描时即使目录未变化也重新获取其状态
+HOT_FILE_SECONDS = 60
+
+class RawFileScanner:
+    def __init__(self, root_dir, extensions=RAW_FILE_EXTENSIONS):
+        """
+        初始化原始数据目录扫描器
+
+        使用 os.scandir 扫描目录，并缓存每个目录的修改时间和内容：
+        目录修改时间不变（没有新增、删除或重命名文件）时直接使用缓存，不再列目录和获取文件状态，
+        空闲时每次扫描只需要对每个目录执行一次stat
+
+        参数:
+        root_dir: 原始数据根目录
+        extensions: 需要处理的文件扩展名
+        """
+        self.root_dir = root_dir
+        self.extensions = tuple(extensions)
+        # 目录缓存: 目录路径 -> (目录修改时间, {文件路径: 文件信息}, [子目录路径])
+        self._dir_cache = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, path=None):
+        """
+        使缓存失效
+
+        原地修改已有文件不会改变目录的修改时间，文件系统事件到达时应调用该方法使文件所在目录重新扫描
+
+        参数:
+        path: 发生变化的文件或目录路径，为None时清空全部缓存
+        """
+        with self._lock:
+            if path is None:
+                self._dir_cache.clear()
+                return
+            directory = path if os.path.isdir(path) else os.path.dirname(path)
+            self._dir_cache.pop(directory, None)
+
+    @staticmethod
+    def _file_info(path, name, stat):
+        return {
+            'path': path,
+            'name': name,
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'mtime_str': datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+    def _scan_directory(self, directory, dir_mtime, now, results):
+        """扫描单个目录，目录未变化时使用缓存"""
+        cached = self._dir_cache.get(directory)
+        if cached is not None and cached[0] == dir_mtime:
+            files, subdirs = cached[1], cached[2]
+            # 最近修改过的文件可能仍在写入，重新获取状态
+            for path, info in files.items():
+                if now - info['mtime'] < HOT_FILE_SECONDS:
+                    try:
+                        files[path] = self._file_info(path, info['name'], os.stat(path))
+                    except OSError:
+                        continue
+            subdir_mtimes = []
+            for subdir in subdirs:
+                try:
+                    subdir_mtimes.append((subdir, os.stat(subdir).st_mtime_ns))
+                except OSError:
+                    continue
+        else:
+            files = {}
+            subdir_mtimes = []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir():
+                                subdir_mtimes.append((entry.path, entry.stat().st_mtime_ns))
+                            elif entry.is_file() and entry.name.endswith(self.extensions):
+                                files[entry.path] = self._file_info(entry.path, entry.name, entry.stat())
+                        except OSError:
+                            # 文件在扫描过程中被移走
+                            continue
+            except OSError as e:
+                logger.warning(f"扫描目录 {directory} 时出错: {str(e)}")
+                self._dir_cache.pop(directory, None)
+                return
+            self._dir_cache[directory] = (dir_mtime, files, [subdir for subdir, _ in subdir_mtimes])
+
+        results.extend(files.values())
+        for subdir, subdir_mtime in subdir_mtimes:
+            self._scan_directory(subdir, subdir_mtime, now, results)
+
+    def scan(self):
+        """
+        扫描原始数据目录（包括子目录）
+
+        返回:
+        文件信息列表，每项包含 path、name、mtime、size、mtime_str
+        """
+        with self._lock:
+            try:
+                root_mtime = os.stat(self.root_dir).st_mtime_ns
+            except OSError:
+                logger.warning(f"输入目录 {self.root_dir} 不存在")
+                self._dir_cache.clear()
+                return []
+
+            results = []
+            self._scan_directory(self.root_dir, root_mtime, time.time(), results)
+
+            # 移除已经不存在的目录的缓存
+            scanned_dirs = set()
+            pending = [self.root_dir]
+            while pending:
+                directory = pending.pop()
+                scanned_dirs.add(directory)
+                cached = self._dir_cache.get(directory)
+                if cached is not None:
+                    pending.extend(cached[2])
+            for directory in list(self._dir_cache):
+                if directory not in scanned_dirs:
+                    del self._dir_cache[directory]
+
+            return results
+
+_scanners = {}
+_scanners_lock = threading.Lock()
+
+def get_scanner(root_dir):
+    """
+    获取指定目录的共享扫描器（同一进程中监视器、流水线和处理器共用同一个缓存）
+    """
+    key = os.path.abspath(root_dir)
+    with _scanners_lock:
+        if key not in _scanners:
+            _scanners[key] = RawFileScanner(root_dir)
+        return _scanners[key]
@@ -1,29 +1,29 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import json
 import os
+import hashlib
 import numpy as np
 import random
 import sys
+from collections import OrderedDict
 from datetime import datetime
-import akshare as ak
 
 # 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
 
 # 导入自定义模块
 from news_analyzer import analyze_news
-from stock_data import get_stock_data, get_stock_history_data, calculate_chip_distribution, calculate_support_resistance, calculate_technical_indicators
-from stock_analyzer import analyze_stock
+from stock_data import fetch_market_data, get_stock_data, get_stock_history_data, calculate_chip_distribution, calculate_support_resistance, calculate_technical_indicators
+from stock_analyzer import analyze_stock_stream
 from dingtalk_bot import DingTalkBot
 from config.config import DINGTALK_WEBHOOK, DINGTALK_SECRET
-
-# 初始化钉钉机器人
-dingtalk_bot = DingTalkBot(DINGTALK_WEBHOOK, DINGTALK_SECRET)
+from trading_calendar import get_calendar
+from charts import build_technical_figure, build_chip_figure, summarize_chip_distribution
+from news_repository import (
+    get_news_db_config, get_db_mtime, fetch_news_page, fetch_news_list,
+    count_news, fetch_news_sources, fetch_news_detail
+)
 
 # 设置页面标题和配置
 st.set_page_config(
@@ -202,7 +202,7 @@ def get_market_indices():
         
         # 获取上证系列指数
         try:
-            sh_indices = ak.stock_zh_index_spot_em(symbol="上证系列指数")
+            sh_indices = fetch_market_data("stock_zh_index_spot_em", symbol="上证系列指数")
             # 提取上证指数数据
             sh_index = sh_indices[sh_indices['名称'] == '上证指数']
             if not sh_index.empty:
@@ -223,7 +223,7 @@ def get_market_indices():
         
         # 获取深证系列指数
         try:
-            sz_indices = ak.stock_zh_index_spot_em(symbol="深证系列指数")
+            sz_indices = fetch_market_data("stock_zh_index_spot_em", symbol="深证系列指数")
             # 提取深证成指数据
             sz_index = sz_indices[sz_indices['名称'] == '深证成指']
             if not sz_index.empty:
@@ -354,732 +354,560 @@ def format_value(value):
     else:
         return str(value)  # 其他情况转为字符串
 
-# 根据选择显示不同的内容
-if option == "分析新闻数据":
-    st.markdown('<h2 class="sub-header">📰 分析已爬取的新闻数据</h2>', unsafe_allow_html=True)
+# ---------------------------------------------------------------------------
+# 新闻分析渲染流程
+# Streamlit每次控件交互都会从头重新运行脚本。分析流程中的每个耗时阶段
+# （新闻分析、行情获取、指标计算、AI投资分析）都通过缓存函数执行，
+# 缓存键包含交易日，同一交易日内重新运行时直接读取缓存，只重新绘制页面。
+# ---------------------------------------------------------------------------
+
+@st.cache_resource
+def get_dingtalk_bot():
+    """获取钉钉机器人（整个应用进程共享一个实例）"""
+    return DingTalkBot(DINGTALK_WEBHOOK, DINGTALK_SECRET)
+
+def get_trading_day():
+    """获取最近的交易日，用作行情数据缓存键的一部分（周末和节假日沿用上一交易日的缓存）"""
+    return get_calendar(os.path.join(PROJECT_ROOT, 'config.json')).trading_day()
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def cached_analyze_news(news_text):
+    """分析新闻重要性及相关行业、股票（结果缓存）"""
+    return analyze_news(news_text)
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def cached_stock_data(stock_code, trading_day):
+    """获取股票基本信息、行情和财务数据（trading_day仅用作缓存键）"""
+    return get_stock_data(stock_code)
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def cached_stock_history(stock_code, period, trading_day):
+    """
+    获取历史行情数据并规范化列名（trading_day仅用作缓存键）
     
-    # 获取新闻数据文件路径
-    current_dir = os.path.dirname(__file__)
-    json_path = os.path.join(current_dir, '..', 'data', 'news_data.json')
+    返回:
+    列名为中文（日期、开盘、最高、最低、收盘、成交量）的DataFrame
+    """
+    history_data = get_stock_history_data(stock_code, period=period)
+    if history_data.empty:
+        return history_data
     
-    # 加载新闻数据
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            news_data = json.load(f)
-        
-        # 显示新闻列表
-        st.markdown(f"### 已加载 {len(news_data)} 条新闻")
-        
-        # 创建新闻选择器
-        news_titles = [news.get('title', f"新闻 {i+1}") for i, news in enumerate(news_data)]
-        selected_news_index = st.selectbox("选择要分析的新闻", range(len(news_titles)), format_func=lambda x: news_titles[x])
-        
-        # 显示选中的新闻内容
-        selected_news = news_data[selected_news_index]
-        st.markdown("### 新闻内容")
-        st.markdown(f'<div class="news-container">{selected_news.get("content", "无内容")}</div>', unsafe_allow_html=True)
+    # 规范化列名
+    column_map = {
+        'date': '日期', '日期': '日期',
+        'open': '开盘', '开盘': '开盘',
+        'high': '最高', '最高': '最高',
+        'low': '最低', '最低': '最低',
+        'close': '收盘', '收盘': '收盘',
+        'volume': '成交量', '成交量': '成交量'
+    }
+    
+    # 重命名列，确保标准化
+    for old_col, new_col in column_map.items():
+        if old_col in history_data.columns:
+            history_data = history_data.rename(columns={old_col: new_col})
+    
+    # 确保日期列为datetime类型
+    if '日期' in history_data.columns:
+        history_data['日期'] = pd.to_datetime(history_data['日期'])
+    
+    return history_data
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def cached_technical_analysis(stock_code, period, trading_day):
+    """
+    计算技术指标和支撑位/压力位（trading_day仅用作缓存键）
+    
+    返回:
+    (带技术指标的历史数据, 支撑位压力位字典) 元组
+    """
+    history_data = cached_stock_history(stock_code, period, trading_day)
+    return calculate_technical_indicators(history_data), calculate_support_resistance(history_data)
+
+@st.cache_data(max_entries=100, show_spinner=False)
+def cached_chip_distribution(stock_code, period, trading_day):
+    """计算筹码分布（trading_day仅用作缓存键）"""
+    return calculate_chip_distribution(cached_stock_history(stock_code, period, trading_day))
+
+# 缓存的投资分析结果数量上限
+MAX_CACHED_ANALYSES = 100
+
+@st.cache_resource
+def get_analysis_store():
+    """
+    已完成的投资分析结果，键为 新闻哈希:股票代码:交易日，值为 (推理过程, 分析正文)
+    （流式生成的结果无法用st.cache_data缓存，整个应用进程共享这一个字典）
+    """
+    return OrderedDict()
+
+def split_reasoning_stream(events):
+    """
+    将 analyze_stock_stream 的事件流拆分为推理过程和分析正文两个文本生成器，
+    推理模型先输出完整的推理过程再输出正文，两个生成器需要按顺序消费
+    """
+    events = iter(events)
+    first_content = []
+
+    def reasoning():
+        for kind, text in events:
+            if kind == "content":
+                first_content.append(text)
+                return
+            yield text
+
+    def content():
+        yield from first_content
+        for kind, text in events:
+            if kind == "content":
+                yield text
+
+    return reasoning(), content()
+
+def stream_stock_analysis(news_text, stock_code, trading_day, report_key, reasoning_area, result_placeholder):
+    """
+    流式生成投资分析：推理过程和分析正文边生成边显示，完成后写入缓存
+
+    返回:
+    (推理过程, 分析正文) 元组
+    """
+    events = analyze_stock_stream(news_text, cached_stock_data(stock_code, trading_day))
+    reasoning, content = split_reasoning_stream(events)
+    with reasoning_area, st.status("🧠 正在分析股票投资价值...", expanded=True) as status:
+        reasoning_text = st.write_stream(reasoning) or ""
+        status.update(label="🧠 推理过程", state="complete", expanded=False)
+    with result_placeholder.container():
+        analysis_result = st.write_stream(content) or ""
+
+    store = get_analysis_store()
+    store[report_key] = (reasoning_text, analysis_result)
+    while len(store) > MAX_CACHED_ANALYSES:
+        store.popitem(last=False)
+    return reasoning_text, analysis_result
+
+def render_news_analysis(news_text):
+    """
+    渲染新闻分析结果：新闻重要性与行业 -> 股票数据 -> 技术分析 -> 财务指标 -> 投资分析
+    
+    参数:
+    news_text: 新闻内容
+    """
+    trading_day = get_trading_day()
+    with st.spinner("🔄 正在分析新闻并提取相关股票..."):
+        result = cached_analyze_news(news_text)
         
-        # 分析按钮
-        if st.button("🔍 分析该新闻"):
-            with st.spinner("🔄 正在分析新闻并提取相关股票..."):
-                news_text = selected_news.get('content', '')
-                result = analyze_news(news_text)
+        if not result["analyze"]:
+            st.warning(f"⚠️ 新闻重要性等级为{result['importance_level']}（{result['importance_category']}），不进行分析")
+        elif result["stock_code"] == "无相关上市公司":
+            st.warning("⚠️ 该新闻没有相关的已上市公司")
+            # 显示行业信息
+            if result["industry_info"]:
+                st.info(f"📊 所属行业: {result['industry_info']['main_category']} - {result['industry_info']['sub_category']} (相关度: {result['industry_info']['relevance_score']})")
+        else:
+            # 显示分析结果
+            importance_level = result["importance_level"]
+            importance_category = result["importance_category"]
+            industry_info = result["industry_info"]
+            stock_code = result["stock_code"]
+            
+            st.success(f"✅ 找到相关股票代码: {stock_code}")
+            st.info(f"📊 新闻重要性: {importance_level}级 ({importance_category})")
+            st.info(f"📊 所属行业: {industry_info['main_category']} - {industry_info['sub_category']} (相关度: {industry_info['relevance_score']})")
+            
+            with st.spinner(f"🔄 正在获取股票 {stock_code} 的数据..."):
+                stock_data = cached_stock_data(stock_code, trading_day)
                 
-                if not result["analyze"]:
-                    st.warning(f"⚠️ 新闻重要性等级为{result['importance_level']}（{result['importance_category']}），不进行分析")
-                elif result["stock_code"] == "无相关上市公司":
-                    st.warning("⚠️ 该新闻没有相关的已上市公司")
-                    # 显示行业信息
-                    if result["industry_info"]:
-                        st.info(f"📊 所属行业: {result['industry_info']['main_category']} - {result['industry_info']['sub_category']} (相关度: {result['industry_info']['relevance_score']})")
+                if not stock_data or not stock_data.get('basic', {}).get('name', ''):
+                    st.error(f"❌ 未能获取到股票 {stock_code} 的有效数据")
                 else:
-                    # 显示分析结果
-                    importance_level = result["importance_level"]
-                    importance_category = result["importance_category"]
-                    industry_info = result["industry_info"]
-                    stock_code = result["stock_code"]
+                    # 显示股票基本信息
+                    st.markdown(f'<h3 class="sub-header">🏢 股票信息: {stock_data["basic"]["name"]} ({stock_code})</h3>', unsafe_allow_html=True)
                     
-                    st.success(f"✅ 找到相关股票代码: {stock_code}")
-                    st.info(f"📊 新闻重要性: {importance_level}级 ({importance_category})")
-                    st.info(f"📊 所属行业: {industry_info['main_category']} - {industry_info['sub_category']} (相关度: {industry_info['relevance_score']})")
+                    # 创建两列布局
+                    col1, col2 = st.columns(2)
                     
-                    with st.spinner(f"🔄 正在获取股票 {stock_code} 的数据..."):
-                        stock_data = get_stock_data(stock_code)
-                        
-                        if not stock_data or not stock_data.get('basic', {}).get('name', ''):
-                            st.error(f"❌ 未能获取到股票 {stock_code} 的有效数据")
+                    # 基本信息表格
+                    with col1:
+                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                        st.markdown("**📋 基本信息**")
+                        basic_df = pd.DataFrame({
+                            "项目": ["股票代码", "股票名称", "所属行业", "上市日期"],
+                            "数值": [
+                                stock_data['basic']['ts_code'],
+                                stock_data['basic']['name'],
+                                stock_data['basic']['industry'],
+                                stock_data['basic']['list_date']
+                            ]
+                        })
+                        st.table(basic_df.set_index('项目'))
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    # 实时市场数据区域
+                    st.markdown("### 📈 实时市场数据")
+                    col2, col3, col4 = st.columns(3)
+                    
+                    # 价格信息合并到实时市场数据
+                    with col2:
+                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                        st.markdown("**💰 价格信息**")
+                        # 处理百分号问题
+                        pct_chg = stock_data['price']['pct_chg']
+                        if isinstance(pct_chg, (int, float)):
+                            pct_chg_str = f"{pct_chg}%"
                         else:
-                            # 显示股票基本信息
-                            st.markdown(f'<h3 class="sub-header">🏢 股票信息: {stock_data["basic"]["name"]} ({stock_code})</h3>', unsafe_allow_html=True)
+                            pct_chg_str = pct_chg
+                        
+                        price_df = pd.DataFrame({
+                            "项目": ["最新价", "涨跌额", "涨跌幅", "今日开盘", "最高价", "最低价"],
+                            "数值": [
+                                format_value(stock_data['price']['close']),
+                                format_value(stock_data['price']['change']),
+                                pct_chg_str,
+                                format_value(stock_data['price']['open']),
+                                format_value(stock_data['price']['high']),
+                                format_value(stock_data['price']['low'])
+                            ]
+                        })
+                        st.table(price_df.set_index('项目'))
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    with col3:
+                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                        st.markdown("**🔍 市场表现**")
+                        market_df = pd.DataFrame({
+                            "项目": ["成交量", "成交额", "市盈率(TTM)", "市净率", "市值/资产净值", "流通值"],
+                            "数值": [
+                                format_value(stock_data['price'].get('成交量', '未知')),
+                                format_value(stock_data['price'].get('成交额', '未知')),
+                                format_value(stock_data['price']['pe']),
+                                format_value(stock_data['price']['pb']),
+                                format_value(stock_data['price']['total_mv']),
+                                format_value(stock_data['price']['circ_mv'])
+                            ]
+                        })
+                        st.table(market_df.set_index('项目'))
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    with col4:
+                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                        st.markdown("**📅 52周表现**")
+                        performance_df = pd.DataFrame({
+                            "项目": ["52周最高", "52周最低", "今年以来涨幅", "振幅", "昨收", "周转率"],
+                            "数值": [
+                                format_value(stock_data['price'].get('52周最高', '未知')),
+                                format_value(stock_data['price'].get('52周最低', '未知')),
+                                format_value(stock_data['price'].get('今年以来涨幅', '未知')),
+                                format_value(stock_data['price'].get('振幅', '未知')),
+                                format_value(stock_data['price'].get('昨收', '未知')),
+                                format_value(stock_data['price'].get('周转率', '未知'))
+                            ]
+                        })
+                        st.table(performance_df.set_index('项目'))
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    # 获取历史数据并计算技术指标
+                    with st.spinner("获取历史行情数据..."):
+                        history_period = st.selectbox("选择历史数据时间跨度", ["90", "180", "365", "730", "1095"], index=2)
+                        history_data = cached_stock_history(stock_code, history_period, trading_day)
+                        
+                        if not history_data.empty:
+                            # 计算技术指标、支撑位和压力位（已缓存）
+                            history_data_with_indicators, support_resistance = cached_technical_analysis(stock_code, history_period, trading_day)
                             
-                            # 创建两列布局
-                            col1, col2 = st.columns(2)
+                            # 创建技术分析图（K线、成交量、MACD、RSI），长周期数据自动降采样
+                            fig = build_technical_figure(
+                                history_data,
+                                history_data_with_indicators,
+                                support_resistance,
+                                title=f"{stock_data['basic']['name']} ({stock_code}) 技术分析图"
+                            )
                             
-                            # 基本信息表格
-                            with col1:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**📋 基本信息**")
-                                basic_df = pd.DataFrame({
-                                    "项目": ["股票代码", "股票名称", "所属行业", "上市日期"],
-                                    "数值": [
-                                        stock_data['basic']['ts_code'],
-                                        stock_data['basic']['name'],
-                                        stock_data['basic']['industry'],
-                                        stock_data['basic']['list_date']
-                                    ]
-                                })
-                                st.table(basic_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
+                            # 显示图表
+                            st.plotly_chart(fig, use_container_width=True)
                             
-                            # 实时市场数据区域
-                            st.markdown("### 📈 实时市场数据")
-                            col2, col3, col4 = st.columns(3)
+                            # 显示技术指标分析结果
+                            st.markdown("### 📊 技术指标分析")
+                            tech_cols = st.columns(2)
                             
-                            # 价格信息合并到实时市场数据
-                            with col2:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**💰 价格信息**")
-                                # 处理百分号问题
-                                pct_chg = stock_data['price']['pct_chg']
-                                if isinstance(pct_chg, (int, float)):
-                                    pct_chg_str = f"{pct_chg}%"
-                                else:
-                                    pct_chg_str = pct_chg
+                            with tech_cols[0]:
+                                st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
+                                st.markdown("**MACD分析**")
+                                
+                                # 获取最新的MACD值
+                                last_macd = history_data_with_indicators['MACD'].iloc[-1]
+                                last_signal = history_data_with_indicators['MACD_Signal'].iloc[-1]
+                                last_hist = history_data_with_indicators['MACD_Histogram'].iloc[-1]
+                                
+                                # 前一个交易日的值
+                                prev_hist = history_data_with_indicators['MACD_Histogram'].iloc[-2]
+                                
+                                # 判断MACD金叉/死叉信号
+                                macd_signal = "中性"
+                                if last_macd > last_signal and history_data_with_indicators['MACD'].iloc[-2] <= history_data_with_indicators['MACD_Signal'].iloc[-2]:
+                                    macd_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
+                                elif last_macd < last_signal and history_data_with_indicators['MACD'].iloc[-2] >= history_data_with_indicators['MACD_Signal'].iloc[-2]:
+                                    macd_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
+                                
+                                # 判断柱状图趋势
+                                hist_trend = "持平"
+                                if last_hist > prev_hist:
+                                    hist_trend = "<span style='color:red;'>上升趋势增强</span>"
+                                elif last_hist < prev_hist:
+                                    hist_trend = "<span style='color:green;'>下降趋势增强</span>"
+                                
+                                st.markdown(f"""
+                                **最新值:**
+                                - MACD值: {last_macd:.4f}
+                                - 信号线: {last_signal:.4f}
+                                - 柱状图: {last_hist:.4f}
+                                
+                                **信号:**
+                                - MACD信号: {macd_signal}
+                                - 柱状图趋势: {hist_trend}
+                                """, unsafe_allow_html=True)
                                 
-                                price_df = pd.DataFrame({
-                                    "项目": ["最新价", "涨跌额", "涨跌幅", "今日开盘", "最高价", "最低价"],
-                                    "数值": [
-                                        format_value(stock_data['price']['close']),
-                                        format_value(stock_data['price']['change']),
-                                        pct_chg_str,
-                                        format_value(stock_data['price']['open']),
-                                        format_value(stock_data['price']['high']),
-                                        format_value(stock_data['price']['low'])
-                                    ]
-                                })
-                                st.table(price_df.set_index('项目'))
                                 st.markdown('</div>', unsafe_allow_html=True)
                             
-                            with col3:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**🔍 市场表现**")
-                                market_df = pd.DataFrame({
-                                    "项目": ["成交量", "成交额", "市盈率(TTM)", "市净率", "市值/资产净值", "流通值"],
-                                    "数值": [
-                                        format_value(stock_data['price'].get('成交量', '未知')),
-                                        format_value(stock_data['price'].get('成交额', '未知')),
-                                        format_value(stock_data['price']['pe']),
-                                        format_value(stock_data['price']['pb']),
-                                        format_value(stock_data['price']['total_mv']),
-                                        format_value(stock_data['price']['circ_mv'])
-                                    ]
-                                })
-                                st.table(market_df.set_index('项目'))
+                            with tech_cols[1]:
+                                st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
+                                st.markdown("**RSI分析**")
+                                
+                                # 获取最新的RSI值
+                                last_rsi = history_data_with_indicators['RSI'].iloc[-1]
+                                
+                                # 判断RSI超买/超卖状态
+                                rsi_signal = "中性区间"
+                                rsi_color = "black"
+                                if last_rsi >= 70:
+                                    rsi_signal = "超买区域(可能回调)"
+                                    rsi_color = "red"
+                                elif last_rsi <= 30:
+                                    rsi_signal = "超卖区域(可能反弹)"
+                                    rsi_color = "green"
+                                
+                                st.markdown(f"""
+                                **最新值:**
+                                - RSI(14): <span style='color:{rsi_color};font-weight:bold;'>{last_rsi:.2f}</span>
+                                
+                                **信号:**
+                                - RSI状态: <span style='color:{rsi_color};font-weight:bold;'>{rsi_signal}</span>
+                                
+                                **参考标准:**
+                                - RSI > 70: 超买区域，可能存在回调风险
+                                - RSI < 30: 超卖区域，可能存在反弹机会
+                                - 50左右: 多空平衡
+                                """, unsafe_allow_html=True)
+                                
                                 st.markdown('</div>', unsafe_allow_html=True)
                             
-                            with col4:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**📅 52周表现**")
-                                performance_df = pd.DataFrame({
-                                    "项目": ["52周最高", "52周最低", "今年以来涨幅", "振幅", "昨收", "周转率"],
-                                    "数值": [
-                                        format_value(stock_data['price'].get('52周最高', '未知')),
-                                        format_value(stock_data['price'].get('52周最低', '未知')),
-                                        format_value(stock_data['price'].get('今年以来涨幅', '未知')),
-                                        format_value(stock_data['price'].get('振幅', '未知')),
-                                        format_value(stock_data['price'].get('昨收', '未知')),
-                                        format_value(stock_data['price'].get('周转率', '未知'))
-                                    ]
-                                })
-                                st.table(performance_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
+                            # KDJ指标分析
+                            st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
+                            st.markdown("**KDJ指标分析**")
                             
-                            # 获取历史数据并计算技术指标
-                            with st.spinner("获取历史行情数据..."):
-                                history_period = st.selectbox("选择历史数据时间跨度", ["90", "180", "365", "730", "1095"], index=2)
-                                history_data = get_stock_history_data(stock_code, period=history_period)
-                                
-                                if not history_data.empty:
-                                    # 规范化列名
-                                    column_map = {
-                                        'date': '日期', '日期': '日期',
-                                        'open': '开盘', '开盘': '开盘',
-                                        'high': '最高', '最高': '最高',
-                                        'low': '最低', '最低': '最低',
-                                        'close': '收盘', '收盘': '收盘',
-                                        'volume': '成交量', '成交量': '成交量'
-                                    }
-                                    
-                                    # 重命名列，确保标准化
-                                    for old_col, new_col in column_map.items():
-                                        if old_col in history_data.columns:
-                                            history_data = history_data.rename(columns={old_col: new_col})
-                                    
-                                    # 确保日期列为datetime类型
-                                    if '日期' in history_data.columns:
-                                        history_data['日期'] = pd.to_datetime(history_data['日期'])
-                                    
-                                    # 计算技术指标
-                                    history_data_with_indicators = calculate_technical_indicators(history_data)
-                                    
-                                    # 获取支撑位和压力位
-                                    support_resistance = calculate_support_resistance(history_data)
-                                    
-                                    # 创建一个带有多个子图的图表
-                                    fig = make_subplots(
-                                        rows=4, 
-                                        cols=1, 
-                                        shared_xaxes=True, 
-                                        vertical_spacing=0.05, 
-                                        row_heights=[0.5, 0.15, 0.15, 0.15],
-                                        subplot_titles=("K线图 (带支撑位和压力位)", "成交量", "MACD", "RSI")
-                                    )
-                                    
-                                    # 添加K线图
-                                    fig.add_trace(
-                                        go.Candlestick(
-                                            x=history_data['日期'],
-                                            open=history_data['开盘'],
-                                            high=history_data['最高'],
-                                            low=history_data['最低'],
-                                            close=history_data['收盘'],
-                                            name="K线"
-                                        ),
-                                        row=1, col=1
-                                    )
-                                    
-                                    # 添加支撑位水平线
-                                    for i, support in enumerate(support_resistance["支撑位"]):
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=support,
-                                            y1=support,
-                                            line=dict(
-                                                color="green",
-                                                width=2,
-                                                dash="dash",
-                                            ),
-                                            row=1, col=1
-                                        )
-                                        # 添加支撑位标签
-                                        fig.add_annotation(
-                                            x=history_data['日期'].iloc[-1],
-                                            y=support,
-                                            text=f"S{i+1}: {support}",
-                                            showarrow=False,
-                                            yshift=10,
-                                            xshift=50,
-                                            bgcolor="green",
-                                            font=dict(color="white"),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加压力位水平线
-                                    for i, resistance in enumerate(support_resistance["压力位"]):
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=resistance,
-                                            y1=resistance,
-                                            line=dict(
-                                                color="red",
-                                                width=2,
-                                                dash="dash",
-                                            ),
-                                            row=1, col=1
-                                        )
-                                        # 添加压力位标签
-                                        fig.add_annotation(
-                                            x=history_data['日期'].iloc[-1],
-                                            y=resistance,
-                                            text=f"R{i+1}: {resistance}",
-                                            showarrow=False,
-                                            yshift=-10,
-                                            xshift=50,
-                                            bgcolor="red",
-                                            font=dict(color="white"),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加移动平均线
-                                    ma_periods = [5, 10, 20, 60]
-                                    ma_colors = ['blue', 'orange', 'purple', 'brown']
-                                    for i, period in enumerate(ma_periods):
-                                        ma_name = f"MA{period}"
-                                        history_data[ma_name] = history_data['收盘'].rolling(window=period).mean()
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data[ma_name],
-                                                mode='lines',
-                                                line=dict(
-                                                    color=ma_colors[i],
-                                                    width=1
-                                                ),
-                                                name=ma_name
-                                            ),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加成交量柱状图
-                                    colors = ['red' if row['收盘'] >= row['开盘'] else 'green' for _, row in history_data.iterrows()]
-                                    fig.add_trace(
-                                        go.Bar(
-                                            x=history_data['日期'],
-                                            y=history_data['成交量'],
-                                            marker_color=colors,
-                                            name="成交量"
-                                        ),
-                                        row=2, col=1
-                                    )
-                                    
-                                    # 添加MACD图表
-                                    if 'MACD' in history_data_with_indicators.columns:
-                                        # MACD线
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD'],
-                                                mode='lines',
-                                                line=dict(color='blue'),
-                                                name="MACD"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # 信号线
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD_Signal'],
-                                                mode='lines',
-                                                line=dict(color='orange'),
-                                                name="MACD信号线"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # MACD柱状图
-                                        histogram_colors = [
-                                            'red' if val >= 0 else 'green' 
-                                            for val in history_data_with_indicators['MACD_Histogram']
-                                        ]
-                                        fig.add_trace(
-                                            go.Bar(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD_Histogram'],
-                                                marker_color=histogram_colors,
-                                                name="MACD柱状图"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # 添加零线
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=0,
-                                            y1=0,
-                                            line=dict(color="gray", width=1),
-                                            row=3, col=1
-                                        )
-                                    
-                                    # 添加RSI图表
-                                    if 'RSI' in history_data_with_indicators.columns:
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['RSI'],
-                                                mode='lines',
-                                                line=dict(color='purple'),
-                                                name="RSI(14)"
-                                            ),
-                                            row=4, col=1
-                                        )
-                                        # 添加超买线（70）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=70,
-                                            y1=70,
-                                            line=dict(color="red", width=1, dash="dash"),
-                                            row=4, col=1
-                                        )
-                                        # 添加超卖线（30）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=30,
-                                            y1=30,
-                                            line=dict(color="green", width=1, dash="dash"),
-                                            row=4, col=1
-                                        )
-                                        # 添加中间线（50）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=50,
-                                            y1=50,
-                                            line=dict(color="gray", width=1, dash="dot"),
-                                            row=4, col=1
-                                        )
-                                    
-                                    # 更新图表布局
-                                    fig.update_layout(
-                                        title=f"{stock_data['basic']['name']} ({stock_code}) 技术分析图",
-                                        xaxis_title="日期",
-                                        height=800,  # 增加图表高度以适应多个子图
-                                        xaxis_rangeslider_visible=False,
-                                        legend=dict(
-                                            orientation="h",
-                                            yanchor="bottom",
-                                            y=1.02,
-                                            xanchor="right",
-                                            x=1
-                                        ),
-                                        hovermode="x unified"
-                                    )
-                                    
-                                    # 更新Y轴标题
-                                    fig.update_yaxes(title_text="价格", row=1, col=1)
-                                    fig.update_yaxes(title_text="成交量", row=2, col=1)
-                                    fig.update_yaxes(title_text="MACD", row=3, col=1)
-                                    fig.update_yaxes(title_text="RSI", row=4, col=1)
-                                    
-                                    # 显示图表
-                                    st.plotly_chart(fig, use_container_width=True)
-                                    
-                                    # 显示技术指标分析结果
-                                    st.markdown("### 📊 技术指标分析")
-                                    tech_cols = st.columns(2)
-                                    
-                                    with tech_cols[0]:
-                                        st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                        st.markdown("**MACD分析**")
-                                        
-                                        # 获取最新的MACD值
-                                        last_macd = history_data_with_indicators['MACD'].iloc[-1]
-                                        last_signal = history_data_with_indicators['MACD_Signal'].iloc[-1]
-                                        last_hist = history_data_with_indicators['MACD_Histogram'].iloc[-1]
-                                        
-                                        # 前一个交易日的值
-                                        prev_hist = history_data_with_indicators['MACD_Histogram'].iloc[-2]
-                                        
-                                        # 判断MACD金叉/死叉信号
-                                        macd_signal = "中性"
-                                        if last_macd > last_signal and history_data_with_indicators['MACD'].iloc[-2] <= history_data_with_indicators['MACD_Signal'].iloc[-2]:
-                                            macd_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
-                                        elif last_macd < last_signal and history_data_with_indicators['MACD'].iloc[-2] >= history_data_with_indicators['MACD_Signal'].iloc[-2]:
-                                            macd_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
-                                        
-                                        # 判断柱状图趋势
-                                        hist_trend = "持平"
-                                        if last_hist > prev_hist:
-                                            hist_trend = "<span style='color:red;'>上升趋势增强</span>"
-                                        elif last_hist < prev_hist:
-                                            hist_trend = "<span style='color:green;'>下降趋势增强</span>"
-                                        
-                                        st.markdown(f"""
-                                        **最新值:**
-                                        - MACD值: {last_macd:.4f}
-                                        - 信号线: {last_signal:.4f}
-                                        - 柱状图: {last_hist:.4f}
-                                        
-                                        **信号:**
-                                        - MACD信号: {macd_signal}
-                                        - 柱状图趋势: {hist_trend}
-                                        """, unsafe_allow_html=True)
-                                        
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    with tech_cols[1]:
-                                        st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                        st.markdown("**RSI分析**")
-                                        
-                                        # 获取最新的RSI值
-                                        last_rsi = history_data_with_indicators['RSI'].iloc[-1]
-                                        
-                                        # 判断RSI超买/超卖状态
-                                        rsi_signal = "中性区间"
-                                        rsi_color = "black"
-                                        if last_rsi >= 70:
-                                            rsi_signal = "超买区域(可能回调)"
-                                            rsi_color = "red"
-                                        elif last_rsi <= 30:
-                                            rsi_signal = "超卖区域(可能反弹)"
-                                            rsi_color = "green"
-                                        
-                                        st.markdown(f"""
-                                        **最新值:**
-                                        - RSI(14): <span style='color:{rsi_color};font-weight:bold;'>{last_rsi:.2f}</span>
-                                        
-                                        **信号:**
-                                        - RSI状态: <span style='color:{rsi_color};font-weight:bold;'>{rsi_signal}</span>
-                                        
-                                        **参考标准:**
-                                        - RSI > 70: 超买区域，可能存在回调风险
-                                        - RSI < 30: 超卖区域，可能存在反弹机会
-                                        - 50左右: 多空平衡
-                                        """, unsafe_allow_html=True)
-                                        
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # KDJ指标分析
-                                    st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                    st.markdown("**KDJ指标分析**")
-                                    
-                                    # 获取最新的KDJ值
-                                    last_k = history_data_with_indicators['K'].iloc[-1]
-                                    last_d = history_data_with_indicators['D'].iloc[-1]
-                                    last_j = history_data_with_indicators['J'].iloc[-1]
-                                    
-                                    # 判断KDJ金叉/死叉信号
-                                    kdj_signal = "中性"
-                                    if last_k > last_d and history_data_with_indicators['K'].iloc[-2] <= history_data_with_indicators['D'].iloc[-2]:
-                                        kdj_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
-                                    elif last_k < last_d and history_data_with_indicators['K'].iloc[-2] >= history_data_with_indicators['D'].iloc[-2]:
-                                        kdj_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
-                                    
-                                    # 判断超买/超卖状态
-                                    kdj_status = "中性区间"
-                                    if last_j > 100:
-                                        kdj_status = "<span style='color:red;font-weight:bold;'>严重超买</span>"
-                                    elif last_j > 80:
-                                        kdj_status = "<span style='color:orange;font-weight:bold;'>超买</span>"
-                                    elif last_j < 0:
-                                        kdj_status = "<span style='color:green;font-weight:bold;'>严重超卖</span>"
-                                    elif last_j < 20:
-                                        kdj_status = "<span style='color:lightgreen;font-weight:bold;'>超卖</span>"
-                                    
-                                    kdj_cols = st.columns(3)
-                                    
-                                    with kdj_cols[0]:
-                                        st.metric("K值", f"{last_k:.2f}")
-                                    
-                                    with kdj_cols[1]:
-                                        st.metric("D值", f"{last_d:.2f}")
-                                    
-                                    with kdj_cols[2]:
-                                        st.metric("J值", f"{last_j:.2f}")
-                                    
-                                    st.markdown(f"""
-                                    **信号:**
-                                    - KDJ信号: {kdj_signal}
-                                    - KDJ状态: {kdj_status}
-                                    """, unsafe_allow_html=True)
-                                    
-                                    st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # 计算并显示支撑位和压力位
-                                    # support_resistance = calculate_support_resistance(history_data)
-                                    
-                                    # 创建支撑位和压力位的数据框
-                                    sr_cols = st.columns(2)
-                                    with sr_cols[0]:
-                                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                        st.markdown("**🔽 支撑位**")
-                                        if support_resistance["支撑位"]:
-                                            support_df = pd.DataFrame({
-                                                "支撑位": [f"支撑位 {i+1}" for i in range(len(support_resistance["支撑位"]))],
-                                                "价格": support_resistance["支撑位"]
-                                            })
-                                            st.table(support_df.set_index('支撑位'))
-                                        else:
-                                            st.info("未找到明显的支撑位")
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    with sr_cols[1]:
-                                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                        st.markdown("**🔼 压力位**")
-                                        if support_resistance["压力位"]:
-                                            resistance_df = pd.DataFrame({
-                                                "压力位": [f"压力位 {i+1}" for i in range(len(support_resistance["压力位"]))],
-                                                "价格": support_resistance["压力位"]
-                                            })
-                                            st.table(resistance_df.set_index('压力位'))
-                                        else:
-                                            st.info("未找到明显的压力位")
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # 计算并显示筹码分布
-                                    st.markdown("### 📊 筹码分布")
-                                    chip_data = calculate_chip_distribution(history_data)
-                                    
-                                    if not chip_data.empty:
-                                        # 创建筹码分布图
-                                        fig = go.Figure()
-                                        
-                                        # 添加筹码密度分布
-                                        fig.add_trace(
-                                            go.Bar(
-                                                x=chip_data['价格'],
-                                                y=chip_data['筹码密度_归一化'],
-                                                name="筹码密度",
-                                                marker_color='rgba(58, 71, 80, 0.6)'
-                                            )
-                                        )
-                                        
-                                        # 添加当前价格线
-                                        current_price = history_data['收盘'].iloc[-1]
-                                        fig.add_vline(
-                                            x=current_price,
-                                            line_width=2,
-                                            line_dash="dash",
-                                            line_color="red",
-                                            annotation_text="当前价格",
-                                            annotation_position="top right"
-                                        )
-                                        
-                                        # 添加支撑位和压力位的垂直线
-                                        for support in support_resistance["支撑位"]:
-                                            fig.add_vline(
-                                                x=support,
-                                                line_width=1,
-                                                line_dash="dot",
-                                                line_color="green",
-                                                annotation_text=f"支撑位 {support}",
-                                                annotation_position="bottom left"
-                                            )
-                                        
-                                        for resistance in support_resistance["压力位"]:
-                                            fig.add_vline(
-                                                x=resistance,
-                                                line_width=1,
-                                                line_dash="dot",
-                                                line_color="red",
-                                                annotation_text=f"压力位 {resistance}",
-                                                annotation_position="top right"
-                                            )
-                                        
-                                        # 更新图表布局
-                                        fig.update_layout(
-                                            title=f"{stock_data['basic']['name']} ({stock_code}) 筹码分布",
-                                            xaxis_title="价格",
-                                            yaxis_title="筹码密度 (%)",
-                                            height=400,
-                                            bargap=0,
-                                            bargroupgap=0
-                                        )
-                                        
-                                        # 显示图表
-                                        st.plotly_chart(fig, use_container_width=True)
-                                        
-                                        # 筹码集中区域分析
-                                        st.markdown("#### 筹码集中区域分析")
-                                        
-                                        # 找出筹码密度最大的几个区域
-                                        top_chip_areas = chip_data.sort_values('筹码密度_归一化', ascending=False).head(3)
-                                        
-                                        # 计算获利盘/套牢盘比例
-                                        profit_ratio = chip_data[chip_data['价格'] <= current_price]['筹码密度_归一化'].sum()
-                                        loss_ratio = chip_data[chip_data['价格'] > current_price]['筹码密度_归一化'].sum()
-                                        
-                                        # 创建三列布局显示筹码分析
-                                        chip_cols = st.columns(3)
-                                        
-                                        with chip_cols[0]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            st.metric("获利盘比例", f"{profit_ratio:.2f}%")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        with chip_cols[1]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            st.metric("套牢盘比例", f"{loss_ratio:.2f}%")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        with chip_cols[2]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            if len(top_chip_areas) > 0:
-                                                highest_density_price = top_chip_areas.iloc[0]['价格']
-                                                st.metric("筹码最集中价位", f"{highest_density_price:.2f}")
-                                            else:
-                                                st.metric("筹码最集中价位", "未知")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        # 筹码分布表格
-                                        st.markdown("#### 筹码密度最高的价格区间")
-                                        if not top_chip_areas.empty:
-                                            top_areas_df = pd.DataFrame({
-                                                "排名": [f"Top {i+1}" for i in range(len(top_chip_areas))],
-                                                "价格": [f"{row['价格']:.2f}" for _, row in top_chip_areas.iterrows()],
-                                                "筹码密度(%)": [f"{row['筹码密度_归一化']:.2f}%" for _, row in top_chip_areas.iterrows()]
-                                            })
-                                            st.table(top_areas_df.set_index('排名'))
-                                    else:
-                                        st.warning("无法计算筹码分布，请检查历史数据是否完整")
-                                else:
-                                    st.warning("未能获取到历史数据，无法展示K线图和技术分析")
+                            # 获取最新的KDJ值
+                            last_k = history_data_with_indicators['K'].iloc[-1]
+                            last_d = history_data_with_indicators['D'].iloc[-1]
+                            last_j = history_data_with_indicators['J'].iloc[-1]
+                            
+                            # 判断KDJ金叉/死叉信号
+                            kdj_signal = "中性"
+                            if last_k > last_d and history_data_with_indicators['K'].iloc[-2] <= history_data_with_indicators['D'].iloc[-2]:
+                                kdj_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
+                            elif last_k < last_d and history_data_with_indicators['K'].iloc[-2] >= history_data_with_indicators['D'].iloc[-2]:
+                                kdj_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
+                            
+                            # 判断超买/超卖状态
+                            kdj_status = "中性区间"
+                            if last_j > 100:
+                                kdj_status = "<span style='color:red;font-weight:bold;'>严重超买</span>"
+                            elif last_j > 80:
+                                kdj_status = "<span style='color:orange;font-weight:bold;'>超买</span>"
+                            elif last_j < 0:
+                                kdj_status = "<span style='color:green;font-weight:bold;'>严重超卖</span>"
+                            elif last_j < 20:
+                                kdj_status = "<span style='color:lightgreen;font-weight:bold;'>超卖</span>"
                             
-                            # 财务指标可视化
-                            st.markdown("### 📊 关键财务指标")
+                            kdj_cols = st.columns(3)
                             
-                            # 创建财务指标数据
-                            financial_data = {
-                                "指标": [
-                                    "每股收益(EPS)", 
-                                    "净资产收益率(ROE)", 
-                                    "毛利率", 
-                                    "净利率", 
-                                    "资产负债率",
-                                    "每股净资产",
-                                    "营业收入增长率",
-                                    "净利润增长率",
-                                    "流动比率",
-                                    "速动比率"
-                                ],
-                                "数值": [
-                                    format_value(stock_data['financial_indicator'].get('eps', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('roe', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('gross_profit_margin', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('net_profit_margin', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('debt_to_assets', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('bps', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('revenue_growth', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('profit_growth', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('current_ratio', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('quick_ratio', '未知'))
-                                ]
-                            }
+                            with kdj_cols[0]:
+                                st.metric("K值", f"{last_k:.2f}")
                             
-                            # 检查是否为金融企业（存在金融特有指标）
-                            if stock_data['financial_indicator'].get('capital_adequacy', '未知') != '未知' or \
-                               stock_data['financial_indicator'].get('net_interest_margin', '未知') != '未知':
-                                financial_data["指标"].extend(["资本充足率", "净息差"])
-                                financial_data["数值"].extend([
-                                    format_value(stock_data['financial_indicator'].get('capital_adequacy', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('net_interest_margin', '未知'))
-                                ])
+                            with kdj_cols[1]:
+                                st.metric("D值", f"{last_d:.2f}")
+                            
+                            with kdj_cols[2]:
+                                st.metric("J值", f"{last_j:.2f}")
+                            
+                            st.markdown(f"""
+                            **信号:**
+                            - KDJ信号: {kdj_signal}
+                            - KDJ状态: {kdj_status}
+                            """, unsafe_allow_html=True)
                             
-                            # 使用表格直接显示财务指标
-                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                            financial_df = pd.DataFrame(financial_data)
-                            st.table(financial_df.set_index('指标'))
                             st.markdown('</div>', unsafe_allow_html=True)
                             
-                            # 分析结果
-                            with st.spinner("🧠 正在分析股票投资价值..."):
-                                analysis_result = analyze_stock(news_text, stock_data)
-                                st.markdown('<h3 class="sub-header">💡 投资分析结果</h3>', unsafe_allow_html=True)
-                                st.markdown(f'<div class="analysis-result">{analysis_result.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+                            # 计算并显示支撑位和压力位
+                            # support_resistance = calculate_support_resistance(history_data)
+                            
+                            # 创建支撑位和压力位的数据框
+                            sr_cols = st.columns(2)
+                            with sr_cols[0]:
+                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                                st.markdown("**🔽 支撑位**")
+                                if support_resistance["支撑位"]:
+                                    support_df = pd.DataFrame({
+                                        "支撑位": [f"支撑位 {i+1}" for i in range(len(support_resistance["支撑位"]))],
+                                        "价格": support_resistance["支撑位"]
+                                    })
+                                    st.table(support_df.set_index('支撑位'))
+                                else:
+                                    st.info("未找到明显的支撑位")
+                                st.markdown('</div>', unsafe_allow_html=True)
+                            
+                            with sr_cols[1]:
+                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                                st.markdown("**🔼 压力位**")
+                                if support_resistance["压力位"]:
+                                    resistance_df = pd.DataFrame({
+                                        "压力位": [f"压力位 {i+1}" for i in range(len(support_resistance["压力位"]))],
+                                        "价格": support_resistance["压力位"]
+                                    })
+                                    st.table(resistance_df.set_index('压力位'))
+                                else:
+                                    st.info("未找到明显的压力位")
+                                st.markdown('</div>', unsafe_allow_html=True)
+                            
+                            # 计算并显示筹码分布
+                            st.markdown("### 📊 筹码分布")
+                            chip_data = cached_chip_distribution(stock_code, history_period, trading_day)
+                            
+                            if not chip_data.empty:
+                                # 创建筹码分布图
+                                current_price = history_data['收盘'].iloc[-1]
+                                fig = build_chip_figure(
+                                    chip_data,
+                                    current_price,
+                                    support_resistance,
+                                    title=f"{stock_data['basic']['name']} ({stock_code}) 筹码分布"
+                                )
+                                
+                                # 显示图表
+                                st.plotly_chart(fig, use_container_width=True)
                                 
-                                # 提取投资建议关键词
-                                if "建议买入" in analysis_result:
-                                    st.markdown('<div class="buy-recommendation">✅ 建议买入</div>', unsafe_allow_html=True)
-                                elif "不建议买入" in analysis_result:
-                                    st.markdown('<div class="sell-recommendation">❌ 不建议买入</div>', unsafe_allow_html=True)
-                                elif "建议观望" in analysis_result:
-                                    st.markdown('<div class="hold-recommendation">⚠️ 建议观望</div>', unsafe_allow_html=True)
+                                # 筹码集中区域分析
+                                st.markdown("#### 筹码集中区域分析")
                                 
-                                # 发送到钉钉机器人
-                                title = f"股票分析报告 - {stock_data['basic']['name']}({stock_code})"
-                                # 先处理换行符
-                                formatted_analysis = analysis_result.replace('\n', '\n\n')
-                                content = f'''### {title}
+                                # 计算获利盘/套牢盘比例，找出筹码密度最大的几个区域
+                                profit_ratio, loss_ratio, top_areas_df = summarize_chip_distribution(chip_data, current_price)
                                 
+                                # 创建三列布局显示筹码分析
+                                chip_cols = st.columns(3)
+                                
+                                with chip_cols[0]:
+                                    st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                                    st.metric("获利盘比例", f"{profit_ratio:.2f}%")
+                                    st.markdown('</div>', unsafe_allow_html=True)
+                                
+                                with chip_cols[1]:
+                                    st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                                    st.metric("套牢盘比例", f"{loss_ratio:.2f}%")
+                                    st.markdown('</div>', unsafe_allow_html=True)
+                                
+                                with chip_cols[2]:
+                                    st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                                    if not top_areas_df.empty:
+                                        st.metric("筹码最集中价位", top_areas_df['价格'].iloc[0])
+                                    else:
+                                        st.metric("筹码最集中价位", "未知")
+                                    st.markdown('</div>', unsafe_allow_html=True)
+                                
+                                # 筹码分布表格
+                                st.markdown("#### 筹码密度最高的价格区间")
+                                if not top_areas_df.empty:
+                                    st.table(top_areas_df.set_index('排名'))
+                            else:
+                                st.warning("无法计算筹码分布，请检查历史数据是否完整")
+                        else:
+                            st.warning("未能获取到历史数据，无法展示K线图和技术分析")
+                    
+                    # 财务指标可视化
+                    st.markdown("### 📊 关键财务指标")
+                    
+                    # 创建财务指标数据
+                    financial_data = {
+                        "指标": [
+                            "每股收益(EPS)", 
+                            "净资产收益率(ROE)", 
+                            "毛利率", 
+                            "净利率", 
+                            "资产负债率",
+                            "每股净资产",
+                            "营业收入增长率",
+                            "净利润增长率",
+                            "流动比率",
+                            "速动比率"
+                        ],
+                        "数值": [
+                            format_value(stock_data['financial_indicator'].get('eps', '未知')),
+                            format_value(stock_data['financial_indicator'].get('roe', '未知')),
+                            format_value(stock_data['financial_indicator'].get('gross_profit_margin', '未知')),
+                            format_value(stock_data['financial_indicator'].get('net_profit_margin', '未知')),
+                            format_value(stock_data['financial_indicator'].get('debt_to_assets', '未知')),
+                            format_value(stock_data['financial_indicator'].get('bps', '未知')),
+                            format_value(stock_data['financial_indicator'].get('revenue_growth', '未知')),
+                            format_value(stock_data['financial_indicator'].get('profit_growth', '未知')),
+                            format_value(stock_data['financial_indicator'].get('current_ratio', '未知')),
+                            format_value(stock_data['financial_indicator'].get('quick_ratio', '未知'))
+                        ]
+                    }
+                    
+                    # 检查是否为金融企业（存在金融特有指标）
+                    if stock_data['financial_indicator'].get('capital_adequacy', '未知') != '未知' or \
+                       stock_data['financial_indicator'].get('net_interest_margin', '未知') != '未知':
+                        financial_data["指标"].extend(["资本充足率", "净息差"])
+                        financial_data["数值"].extend([
+                            format_value(stock_data['financial_indicator'].get('capital_adequacy', '未知')),
+                            format_value(stock_data['financial_indicator'].get('net_interest_margin', '未知'))
+                        ])
+                    
+                    # 使用表格直接显示财务指标
+                    st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
+                    financial_df = pd.DataFrame(financial_data)
+                    st.table(financial_df.set_index('指标'))
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    
+                    # 分析结果：第一次分析时流式显示推理过程和分析正文，之后直接读取缓存
+                    report_key = f"{hashlib.md5(news_text.encode('utf-8')).hexdigest()}:{stock_code}:{trading_day}"
+                    cached_analysis = get_analysis_store().get(report_key)
+                    st.markdown('<h3 class="sub-header">💡 投资分析结果</h3>', unsafe_allow_html=True)
+                    reasoning_area = st.container()
+                    result_placeholder = st.empty()
+                    if cached_analysis is None:
+                        reasoning_text, analysis_result = stream_stock_analysis(
+                            news_text, stock_code, trading_day, report_key, reasoning_area, result_placeholder
+                        )
+                    else:
+                        reasoning_text, analysis_result = cached_analysis
+                        if reasoning_text:
+                            with reasoning_area.expander("🧠 推理过程"):
+                                st.markdown(reasoning_text)
+                    # 生成完成后替换为带样式的结果
+                    result_placeholder.markdown(f'<div class="analysis-result">{analysis_result.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
+                    
+                    # 提取投资建议关键词
+                    if "建议买入" in analysis_result:
+                        st.markdown('<div class="buy-recommendation">✅ 建议买入</div>', unsafe_allow_html=True)
+                    elif "不建议买入" in analysis_result:
+                        st.markdown('<div class="sell-recommendation">❌ 不建议买入</div>', unsafe_allow_html=True)
+                    elif "建议观望" in analysis_result:
+                        st.markdown('<div class="hold-recommendation">⚠️ 建议观望</div>', unsafe_allow_html=True)
+                    
+                    # 发送到钉钉机器人（控件交互会重新运行整个渲染流程，同一份报告只发送一次）
+                    sent_reports = st.session_state.setdefault("dingtalk_sent_reports", set())
+                    title = f"股票分析报告 - {stock_data['basic']['name']}({stock_code})"
+                    # 先处理换行符
+                    formatted_analysis = analysis_result.replace('\n', '\n\n')
+                    content = f'''### {title}
+                    
 #### 新闻内容
 {news_text[:200]}...
 
@@ -1110,11 +938,104 @@ if option == "分析新闻数据":
 #### 投资分析结果
 {formatted_analysis}
 '''
-                                # 发送消息
-                                if dingtalk_bot.send_markdown(title, content):
-                                    st.success("✅ 分析报告已发送到钉钉群")
-                                else:
-                                    st.error("❌ 发送到钉钉群失败，请检查配置")
+                    # 发送消息
+                    if report_key not in sent_reports and get_dingtalk_bot().send_markdown(title, content):
+                        sent_reports.add(report_key)
+                    if report_key in sent_reports:
+                        st.success("✅ 分析报告已发送到钉钉群")
+                    else:
+                        st.error("❌ 发送到钉钉群失败，请检查配置")
+
+
+# 根据选择显示不同的内容
+if option == "分析新闻数据":
+    st.markdown('<h2 class="sub-header">📰 分析已爬取的新闻数据</h2>', unsafe_allow_html=True)
+    
+    # 加载新闻数据（从新闻数据库中按页查询并缓存，不再加载全部新闻）
+    try:
+        db_file, table_name = get_news_db_config()
+        db_mtime = get_db_mtime(db_file)
+        if db_mtime is None:
+            st.warning("⚠️ 新闻数据库不存在，请先运行数据处理流水线")
+            st.stop()
+        
+        # 搜索条件
+        search_cols = st.columns([3, 2, 2])
+        with search_cols[0]:
+            keyword = st.text_input("🔎 搜索新闻", placeholder="输入关键词，多个关键词用空格分隔").strip()
+        with search_cols[1]:
+            date_range = st.date_input("发布日期范围", value=())
+        with search_cols[2]:
+            source_options = ["全部来源"] + fetch_news_sources(db_file, table_name, db_mtime)
+            source = st.selectbox("新闻来源", source_options)
+        
+        start_date = date_range[0] if len(date_range) > 0 else None
+        end_date = date_range[1] if len(date_range) > 1 else start_date
+        source_filter = None if source == "全部来源" else source
+        page_size = 20
+        
+        if keyword:
+            # 关键词搜索按相关度排序，使用页码分页
+            page = st.number_input("页码", min_value=1, value=1, step=1)
+            search_result = fetch_news_page(
+                db_file, table_name, db_mtime,
+                keyword, start_date, end_date, source_filter, page, page_size
+            )
+            total_news = search_result["total"]
+            page_items = search_result["items"]
+            total_pages = max((total_news + page_size - 1) // page_size, 1)
+            st.markdown(f"### 共找到 {total_news} 条新闻（第 {page}/{total_pages} 页）")
+        else:
+            # 浏览最新新闻时使用键集分页，翻页代价与页码无关
+            # 筛选条件变化时回到第一页
+            filter_key = (str(start_date), str(end_date), source_filter)
+            if st.session_state.get("news_filter_key") != filter_key:
+                st.session_state["news_filter_key"] = filter_key
+                st.session_state["news_cursors"] = [None]
+            cursors = st.session_state["news_cursors"]
+            
+            list_result = fetch_news_list(
+                db_file, table_name, db_mtime,
+                start_date, end_date, source_filter, cursors[-1], page_size
+            )
+            total_news = count_news(db_file, table_name, db_mtime, start_date, end_date, source_filter)
+            page_items = list_result["items"]
+            total_pages = max((total_news + page_size - 1) // page_size, 1)
+            st.markdown(f"### 共 {total_news} 条新闻（第 {len(cursors)}/{total_pages} 页）")
+            
+            nav_cols = st.columns([1, 1, 6])
+            with nav_cols[0]:
+                if st.button("⬅️ 上一页", disabled=len(cursors) <= 1):
+                    cursors.pop()
+                    st.rerun()
+            with nav_cols[1]:
+                if st.button("下一页 ➡️", disabled=list_result["next_cursor"] is None):
+                    cursors.append(list_result["next_cursor"])
+                    st.rerun()
+        
+        if not page_items:
+            st.info("没有符合条件的新闻")
+            st.stop()
+        
+        # 创建新闻选择器（只包含当前页的新闻）
+        news_titles = [
+            f"[{item.get('publish_time') or '未知时间'}] {item.get('title') or '新闻 ' + str(item['id'])}"
+            for item in page_items
+        ]
+        selected_news_index = st.selectbox("选择要分析的新闻", range(len(news_titles)), format_func=lambda x: news_titles[x])
+        
+        # 显示选中的新闻内容
+        selected_news = fetch_news_detail(db_file, table_name, db_mtime, page_items[selected_news_index]['id']) or {}
+        st.markdown("### 新闻内容")
+        st.markdown(f'<div class="news-container">{selected_news.get("content", "无内容")}</div>', unsafe_allow_html=True)
+        
+        # 分析按钮（记录要分析的新闻，之后控件交互引起的重新运行会继续显示该新闻的分析结果）
+        news_text = selected_news.get('content', '')
+        if st.button("🔍 分析该新闻"):
+            st.session_state["analysis_news_text"] = news_text
+        
+        if news_text and st.session_state.get("analysis_news_text") == news_text:
+            render_news_analysis(news_text)
     except Exception as e:
         st.error(f"加载新闻数据出错: {e}")
         import traceback
@@ -1131,739 +1052,10 @@ else:  # 手动输入新闻
         if not news_text:
             st.warning("⚠️ 请输入新闻内容")
         else:
-            with st.spinner("🔄 正在分析新闻并提取相关股票..."):
-                result = analyze_news(news_text)
-                
-                if not result["analyze"]:
-                    st.warning(f"⚠️ 新闻重要性等级为{result['importance_level']}（{result['importance_category']}），不进行分析")
-                elif result["stock_code"] == "无相关上市公司":
-                    st.warning("⚠️ 该新闻没有相关的已上市公司")
-                    # 显示行业信息
-                    if result["industry_info"]:
-                        st.info(f"📊 所属行业: {result['industry_info']['main_category']} - {result['industry_info']['sub_category']} (相关度: {result['industry_info']['relevance_score']})")
-                else:
-                    # 显示分析结果
-                    importance_level = result["importance_level"]
-                    importance_category = result["importance_category"]
-                    industry_info = result["industry_info"]
-                    stock_code = result["stock_code"]
-                    
-                    st.success(f"✅ 找到相关股票代码: {stock_code}")
-                    st.info(f"📊 新闻重要性: {importance_level}级 ({importance_category})")
-                    st.info(f"📊 所属行业: {industry_info['main_category']} - {industry_info['sub_category']} (相关度: {industry_info['relevance_score']})")
-                    
-                    with st.spinner(f"🔄 正在获取股票 {stock_code} 的数据..."):
-                        stock_data = get_stock_data(stock_code)
-                        
-                        if not stock_data or not stock_data.get('basic', {}).get('name', ''):
-                            st.error(f"❌ 未能获取到股票 {stock_code} 的有效数据")
-                        else:
-                            # 显示股票基本信息
-                            st.markdown(f'<h3 class="sub-header">🏢 股票信息: {stock_data["basic"]["name"]} ({stock_code})</h3>', unsafe_allow_html=True)
-                            
-                            # 创建两列布局
-                            col1, col2 = st.columns(2)
-                            
-                            # 基本信息表格
-                            with col1:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**📋 基本信息**")
-                                basic_df = pd.DataFrame({
-                                    "项目": ["股票代码", "股票名称", "所属行业", "上市日期"],
-                                    "数值": [
-                                        stock_data['basic']['ts_code'],
-                                        stock_data['basic']['name'],
-                                        stock_data['basic']['industry'],
-                                        stock_data['basic']['list_date']
-                                    ]
-                                })
-                                st.table(basic_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            # 实时市场数据区域
-                            st.markdown("### 📈 实时市场数据")
-                            col2, col3, col4 = st.columns(3)
-                            
-                            # 价格信息合并到实时市场数据
-                            with col2:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**💰 价格信息**")
-                                # 处理百分号问题
-                                pct_chg = stock_data['price']['pct_chg']
-                                if isinstance(pct_chg, (int, float)):
-                                    pct_chg_str = f"{pct_chg}%"
-                                else:
-                                    pct_chg_str = pct_chg
-                                
-                                price_df = pd.DataFrame({
-                                    "项目": ["最新价", "涨跌额", "涨跌幅", "今日开盘", "最高价", "最低价"],
-                                    "数值": [
-                                        format_value(stock_data['price']['close']),
-                                        format_value(stock_data['price']['change']),
-                                        pct_chg_str,
-                                        format_value(stock_data['price']['open']),
-                                        format_value(stock_data['price']['high']),
-                                        format_value(stock_data['price']['low'])
-                                    ]
-                                })
-                                st.table(price_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            with col3:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**🔍 市场表现**")
-                                market_df = pd.DataFrame({
-                                    "项目": ["成交量", "成交额", "市盈率(TTM)", "市净率", "市值/资产净值", "流通值"],
-                                    "数值": [
-                                        format_value(stock_data['price'].get('成交量', '未知')),
-                                        format_value(stock_data['price'].get('成交额', '未知')),
-                                        format_value(stock_data['price']['pe']),
-                                        format_value(stock_data['price']['pb']),
-                                        format_value(stock_data['price']['total_mv']),
-                                        format_value(stock_data['price']['circ_mv'])
-                                    ]
-                                })
-                                st.table(market_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            with col4:
-                                st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                st.markdown("**📅 52周表现**")
-                                performance_df = pd.DataFrame({
-                                    "项目": ["52周最高", "52周最低", "今年以来涨幅", "振幅", "昨收", "周转率"],
-                                    "数值": [
-                                        format_value(stock_data['price'].get('52周最高', '未知')),
-                                        format_value(stock_data['price'].get('52周最低', '未知')),
-                                        format_value(stock_data['price'].get('今年以来涨幅', '未知')),
-                                        format_value(stock_data['price'].get('振幅', '未知')),
-                                        format_value(stock_data['price'].get('昨收', '未知')),
-                                        format_value(stock_data['price'].get('周转率', '未知'))
-                                    ]
-                                })
-                                st.table(performance_df.set_index('项目'))
-                                st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            # 获取历史数据并计算技术指标
-                            with st.spinner("获取历史行情数据..."):
-                                history_period = st.selectbox("选择历史数据时间跨度", ["90", "180", "365", "730", "1095"], index=2)
-                                history_data = get_stock_history_data(stock_code, period=history_period)
-                                
-                                if not history_data.empty:
-                                    # 规范化列名
-                                    column_map = {
-                                        'date': '日期', '日期': '日期',
-                                        'open': '开盘', '开盘': '开盘',
-                                        'high': '最高', '最高': '最高',
-                                        'low': '最低', '最低': '最低',
-                                        'close': '收盘', '收盘': '收盘',
-                                        'volume': '成交量', '成交量': '成交量'
-                                    }
-                                    
-                                    # 重命名列，确保标准化
-                                    for old_col, new_col in column_map.items():
-                                        if old_col in history_data.columns:
-                                            history_data = history_data.rename(columns={old_col: new_col})
-                                    
-                                    # 确保日期列为datetime类型
-                                    if '日期' in history_data.columns:
-                                        history_data['日期'] = pd.to_datetime(history_data['日期'])
-                                    
-                                    # 计算技术指标
-                                    history_data_with_indicators = calculate_technical_indicators(history_data)
-                                    
-                                    # 获取支撑位和压力位
-                                    support_resistance = calculate_support_resistance(history_data)
-                                    
-                                    # 创建一个带有多个子图的图表
-                                    fig = make_subplots(
-                                        rows=4, 
-                                        cols=1, 
-                                        shared_xaxes=True, 
-                                        vertical_spacing=0.05, 
-                                        row_heights=[0.5, 0.15, 0.15, 0.15],
-                                        subplot_titles=("K线图 (带支撑位和压力位)", "成交量", "MACD", "RSI")
-                                    )
-                                    
-                                    # 添加K线图
-                                    fig.add_trace(
-                                        go.Candlestick(
-                                            x=history_data['日期'],
-                                            open=history_data['开盘'],
-                                            high=history_data['最高'],
-                                            low=history_data['最低'],
-                                            close=history_data['收盘'],
-                                            name="K线"
-                                        ),
-                                        row=1, col=1
-                                    )
-                                    
-                                    # 添加支撑位水平线
-                                    for i, support in enumerate(support_resistance["支撑位"]):
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=support,
-                                            y1=support,
-                                            line=dict(
-                                                color="green",
-                                                width=2,
-                                                dash="dash",
-                                            ),
-                                            row=1, col=1
-                                        )
-                                        # 添加支撑位标签
-                                        fig.add_annotation(
-                                            x=history_data['日期'].iloc[-1],
-                                            y=support,
-                                            text=f"S{i+1}: {support}",
-                                            showarrow=False,
-                                            yshift=10,
-                                            xshift=50,
-                                            bgcolor="green",
-                                            font=dict(color="white"),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加压力位水平线
-                                    for i, resistance in enumerate(support_resistance["压力位"]):
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=resistance,
-                                            y1=resistance,
-                                            line=dict(
-                                                color="red",
-                                                width=2,
-                                                dash="dash",
-                                            ),
-                                            row=1, col=1
-                                        )
-                                        # 添加压力位标签
-                                        fig.add_annotation(
-                                            x=history_data['日期'].iloc[-1],
-                                            y=resistance,
-                                            text=f"R{i+1}: {resistance}",
-                                            showarrow=False,
-                                            yshift=-10,
-                                            xshift=50,
-                                            bgcolor="red",
-                                            font=dict(color="white"),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加移动平均线
-                                    ma_periods = [5, 10, 20, 60]
-                                    ma_colors = ['blue', 'orange', 'purple', 'brown']
-                                    for i, period in enumerate(ma_periods):
-                                        ma_name = f"MA{period}"
-                                        history_data[ma_name] = history_data['收盘'].rolling(window=period).mean()
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data[ma_name],
-                                                mode='lines',
-                                                line=dict(
-                                                    color=ma_colors[i],
-                                                    width=1
-                                                ),
-                                                name=ma_name
-                                            ),
-                                            row=1, col=1
-                                        )
-                                    
-                                    # 添加成交量柱状图
-                                    colors = ['red' if row['收盘'] >= row['开盘'] else 'green' for _, row in history_data.iterrows()]
-                                    fig.add_trace(
-                                        go.Bar(
-                                            x=history_data['日期'],
-                                            y=history_data['成交量'],
-                                            marker_color=colors,
-                                            name="成交量"
-                                        ),
-                                        row=2, col=1
-                                    )
-                                    
-                                    # 添加MACD图表
-                                    if 'MACD' in history_data_with_indicators.columns:
-                                        # MACD线
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD'],
-                                                mode='lines',
-                                                line=dict(color='blue'),
-                                                name="MACD"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # 信号线
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD_Signal'],
-                                                mode='lines',
-                                                line=dict(color='orange'),
-                                                name="MACD信号线"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # MACD柱状图
-                                        histogram_colors = [
-                                            'red' if val >= 0 else 'green' 
-                                            for val in history_data_with_indicators['MACD_Histogram']
-                                        ]
-                                        fig.add_trace(
-                                            go.Bar(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['MACD_Histogram'],
-                                                marker_color=histogram_colors,
-                                                name="MACD柱状图"
-                                            ),
-                                            row=3, col=1
-                                        )
-                                        # 添加零线
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=0,
-                                            y1=0,
-                                            line=dict(color="gray", width=1),
-                                            row=3, col=1
-                                        )
-                                    
-                                    # 添加RSI图表
-                                    if 'RSI' in history_data_with_indicators.columns:
-                                        fig.add_trace(
-                                            go.Scatter(
-                                                x=history_data['日期'],
-                                                y=history_data_with_indicators['RSI'],
-                                                mode='lines',
-                                                line=dict(color='purple'),
-                                                name="RSI(14)"
-                                            ),
-                                            row=4, col=1
-                                        )
-                                        # 添加超买线（70）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=70,
-                                            y1=70,
-                                            line=dict(color="red", width=1, dash="dash"),
-                                            row=4, col=1
-                                        )
-                                        # 添加超卖线（30）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=30,
-                                            y1=30,
-                                            line=dict(color="green", width=1, dash="dash"),
-                                            row=4, col=1
-                                        )
-                                        # 添加中间线（50）
-                                        fig.add_shape(
-                                            type="line",
-                                            x0=history_data['日期'].iloc[0],
-                                            x1=history_data['日期'].iloc[-1],
-                                            y0=50,
-                                            y1=50,
-                                            line=dict(color="gray", width=1, dash="dot"),
-                                            row=4, col=1
-                                        )
-                                    
-                                    # 更新图表布局
-                                    fig.update_layout(
-                                        title=f"{stock_data['basic']['name']} ({stock_code}) 技术分析图",
-                                        xaxis_title="日期",
-                                        height=800,  # 增加图表高度以适应多个子图
-                                        xaxis_rangeslider_visible=False,
-                                        legend=dict(
-                                            orientation="h",
-                                            yanchor="bottom",
-                                            y=1.02,
-                                            xanchor="right",
-                                            x=1
-                                        ),
-                                        hovermode="x unified"
-                                    )
-                                    
-                                    # 更新Y轴标题
-                                    fig.update_yaxes(title_text="价格", row=1, col=1)
-                                    fig.update_yaxes(title_text="成交量", row=2, col=1)
-                                    fig.update_yaxes(title_text="MACD", row=3, col=1)
-                                    fig.update_yaxes(title_text="RSI", row=4, col=1)
-                                    
-                                    # 显示图表
-                                    st.plotly_chart(fig, use_container_width=True)
-                                    
-                                    # 显示技术指标分析结果
-                                    st.markdown("### 📊 技术指标分析")
-                                    tech_cols = st.columns(2)
-                                    
-                                    with tech_cols[0]:
-                                        st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                        st.markdown("**MACD分析**")
-                                        
-                                        # 获取最新的MACD值
-                                        last_macd = history_data_with_indicators['MACD'].iloc[-1]
-                                        last_signal = history_data_with_indicators['MACD_Signal'].iloc[-1]
-                                        last_hist = history_data_with_indicators['MACD_Histogram'].iloc[-1]
-                                        
-                                        # 前一个交易日的值
-                                        prev_hist = history_data_with_indicators['MACD_Histogram'].iloc[-2]
-                                        
-                                        # 判断MACD金叉/死叉信号
-                                        macd_signal = "中性"
-                                        if last_macd > last_signal and history_data_with_indicators['MACD'].iloc[-2] <= history_data_with_indicators['MACD_Signal'].iloc[-2]:
-                                            macd_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
-                                        elif last_macd < last_signal and history_data_with_indicators['MACD'].iloc[-2] >= history_data_with_indicators['MACD_Signal'].iloc[-2]:
-                                            macd_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
-                                        
-                                        # 判断柱状图趋势
-                                        hist_trend = "持平"
-                                        if last_hist > prev_hist:
-                                            hist_trend = "<span style='color:red;'>上升趋势增强</span>"
-                                        elif last_hist < prev_hist:
-                                            hist_trend = "<span style='color:green;'>下降趋势增强</span>"
-                                        
-                                        st.markdown(f"""
-                                        **最新值:**
-                                        - MACD值: {last_macd:.4f}
-                                        - 信号线: {last_signal:.4f}
-                                        - 柱状图: {last_hist:.4f}
-                                        
-                                        **信号:**
-                                        - MACD信号: {macd_signal}
-                                        - 柱状图趋势: {hist_trend}
-                                        """, unsafe_allow_html=True)
-                                        
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    with tech_cols[1]:
-                                        st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                        st.markdown("**RSI分析**")
-                                        
-                                        # 获取最新的RSI值
-                                        last_rsi = history_data_with_indicators['RSI'].iloc[-1]
-                                        
-                                        # 判断RSI超买/超卖状态
-                                        rsi_signal = "中性区间"
-                                        rsi_color = "black"
-                                        if last_rsi >= 70:
-                                            rsi_signal = "超买区域(可能回调)"
-                                            rsi_color = "red"
-                                        elif last_rsi <= 30:
-                                            rsi_signal = "超卖区域(可能反弹)"
-                                            rsi_color = "green"
-                                        
-                                        st.markdown(f"""
-                                        **最新值:**
-                                        - RSI(14): <span style='color:{rsi_color};font-weight:bold;'>{last_rsi:.2f}</span>
-                                        
-                                        **信号:**
-                                        - RSI状态: <span style='color:{rsi_color};font-weight:bold;'>{rsi_signal}</span>
-                                        
-                                        **参考标准:**
-                                        - RSI > 70: 超买区域，可能存在回调风险
-                                        - RSI < 30: 超卖区域，可能存在反弹机会
-                                        - 50左右: 多空平衡
-                                        """, unsafe_allow_html=True)
-                                        
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # KDJ指标分析
-                                    st.markdown('<div class="tech-analysis-card">', unsafe_allow_html=True)
-                                    st.markdown("**KDJ指标分析**")
-                                    
-                                    # 获取最新的KDJ值
-                                    last_k = history_data_with_indicators['K'].iloc[-1]
-                                    last_d = history_data_with_indicators['D'].iloc[-1]
-                                    last_j = history_data_with_indicators['J'].iloc[-1]
-                                    
-                                    # 判断KDJ金叉/死叉信号
-                                    kdj_signal = "中性"
-                                    if last_k > last_d and history_data_with_indicators['K'].iloc[-2] <= history_data_with_indicators['D'].iloc[-2]:
-                                        kdj_signal = "<span style='color:red;font-weight:bold;'>金叉(买入信号)</span>"
-                                    elif last_k < last_d and history_data_with_indicators['K'].iloc[-2] >= history_data_with_indicators['D'].iloc[-2]:
-                                        kdj_signal = "<span style='color:green;font-weight:bold;'>死叉(卖出信号)</span>"
-                                    
-                                    # 判断超买/超卖状态
-                                    kdj_status = "中性区间"
-                                    if last_j > 100:
-                                        kdj_status = "<span style='color:red;font-weight:bold;'>严重超买</span>"
-                                    elif last_j > 80:
-                                        kdj_status = "<span style='color:orange;font-weight:bold;'>超买</span>"
-                                    elif last_j < 0:
-                                        kdj_status = "<span style='color:green;font-weight:bold;'>严重超卖</span>"
-                                    elif last_j < 20:
-                                        kdj_status = "<span style='color:lightgreen;font-weight:bold;'>超卖</span>"
-                                    
-                                    kdj_cols = st.columns(3)
-                                    
-                                    with kdj_cols[0]:
-                                        st.metric("K值", f"{last_k:.2f}")
-                                    
-                                    with kdj_cols[1]:
-                                        st.metric("D值", f"{last_d:.2f}")
-                                    
-                                    with kdj_cols[2]:
-                                        st.metric("J值", f"{last_j:.2f}")
-                                    
-                                    st.markdown(f"""
-                                    **信号:**
-                                    - KDJ信号: {kdj_signal}
-                                    - KDJ状态: {kdj_status}
-                                    """, unsafe_allow_html=True)
-                                    
-                                    st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # 计算并显示支撑位和压力位
-                                    # support_resistance = calculate_support_resistance(history_data)
-                                    
-                                    # 创建支撑位和压力位的数据框
-                                    sr_cols = st.columns(2)
-                                    with sr_cols[0]:
-                                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                        st.markdown("**🔽 支撑位**")
-                                        if support_resistance["支撑位"]:
-                                            support_df = pd.DataFrame({
-                                                "支撑位": [f"支撑位 {i+1}" for i in range(len(support_resistance["支撑位"]))],
-                                                "价格": support_resistance["支撑位"]
-                                            })
-                                            st.table(support_df.set_index('支撑位'))
-                                        else:
-                                            st.info("未找到明显的支撑位")
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    with sr_cols[1]:
-                                        st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                        st.markdown("**🔼 压力位**")
-                                        if support_resistance["压力位"]:
-                                            resistance_df = pd.DataFrame({
-                                                "压力位": [f"压力位 {i+1}" for i in range(len(support_resistance["压力位"]))],
-                                                "价格": support_resistance["压力位"]
-                                            })
-                                            st.table(resistance_df.set_index('压力位'))
-                                        else:
-                                            st.info("未找到明显的压力位")
-                                        st.markdown('</div>', unsafe_allow_html=True)
-                                    
-                                    # 计算并显示筹码分布
-                                    st.markdown("### 📊 筹码分布")
-                                    chip_data = calculate_chip_distribution(history_data)
-                                    
-                                    if not chip_data.empty:
-                                        # 创建筹码分布图
-                                        fig = go.Figure()
-                                        
-                                        # 添加筹码密度分布
-                                        fig.add_trace(
-                                            go.Bar(
-                                                x=chip_data['价格'],
-                                                y=chip_data['筹码密度_归一化'],
-                                                name="筹码密度",
-                                                marker_color='rgba(58, 71, 80, 0.6)'
-                                            )
-                                        )
-                                        
-                                        # 添加当前价格线
-                                        current_price = history_data['收盘'].iloc[-1]
-                                        fig.add_vline(
-                                            x=current_price,
-                                            line_width=2,
-                                            line_dash="dash",
-                                            line_color="red",
-                                            annotation_text="当前价格",
-                                            annotation_position="top right"
-                                        )
-                                        
-                                        # 添加支撑位和压力位的垂直线
-                                        for support in support_resistance["支撑位"]:
-                                            fig.add_vline(
-                                                x=support,
-                                                line_width=1,
-                                                line_dash="dot",
-                                                line_color="green",
-                                                annotation_text=f"支撑位 {support}",
-                                                annotation_position="bottom left"
-                                            )
-                                        
-                                        for resistance in support_resistance["压力位"]:
-                                            fig.add_vline(
-                                                x=resistance,
-                                                line_width=1,
-                                                line_dash="dot",
-                                                line_color="red",
-                                                annotation_text=f"压力位 {resistance}",
-                                                annotation_position="top right"
-                                            )
-                                        
-                                        # 更新图表布局
-                                        fig.update_layout(
-                                            title=f"{stock_data['basic']['name']} ({stock_code}) 筹码分布",
-                                            xaxis_title="价格",
-                                            yaxis_title="筹码密度 (%)",
-                                            height=400,
-                                            bargap=0,
-                                            bargroupgap=0
-                                        )
-                                        
-                                        # 显示图表
-                                        st.plotly_chart(fig, use_container_width=True)
-                                        
-                                        # 筹码集中区域分析
-                                        st.markdown("#### 筹码集中区域分析")
-                                        
-                                        # 找出筹码密度最大的几个区域
-                                        top_chip_areas = chip_data.sort_values('筹码密度_归一化', ascending=False).head(3)
-                                        
-                                        # 计算获利盘/套牢盘比例
-                                        profit_ratio = chip_data[chip_data['价格'] <= current_price]['筹码密度_归一化'].sum()
-                                        loss_ratio = chip_data[chip_data['价格'] > current_price]['筹码密度_归一化'].sum()
-                                        
-                                        # 创建三列布局显示筹码分析
-                                        chip_cols = st.columns(3)
-                                        
-                                        with chip_cols[0]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            st.metric("获利盘比例", f"{profit_ratio:.2f}%")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        with chip_cols[1]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            st.metric("套牢盘比例", f"{loss_ratio:.2f}%")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        with chip_cols[2]:
-                                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                                            if len(top_chip_areas) > 0:
-                                                highest_density_price = top_chip_areas.iloc[0]['价格']
-                                                st.metric("筹码最集中价位", f"{highest_density_price:.2f}")
-                                            else:
-                                                st.metric("筹码最集中价位", "未知")
-                                            st.markdown('</div>', unsafe_allow_html=True)
-                                        
-                                        # 筹码分布表格
-                                        st.markdown("#### 筹码密度最高的价格区间")
-                                        if not top_chip_areas.empty:
-                                            top_areas_df = pd.DataFrame({
-                                                "排名": [f"Top {i+1}" for i in range(len(top_chip_areas))],
-                                                "价格": [f"{row['价格']:.2f}" for _, row in top_chip_areas.iterrows()],
-                                                "筹码密度(%)": [f"{row['筹码密度_归一化']:.2f}%" for _, row in top_chip_areas.iterrows()]
-                                            })
-                                            st.table(top_areas_df.set_index('排名'))
-                                    else:
-                                        st.warning("无法计算筹码分布，请检查历史数据是否完整")
-                                else:
-                                    st.warning("未能获取到历史数据，无法展示K线图和技术分析")
-                            
-                            # 财务指标可视化
-                            st.markdown("### 📊 关键财务指标")
-                            
-                            # 创建财务指标数据
-                            financial_data = {
-                                "指标": [
-                                    "每股收益(EPS)", 
-                                    "净资产收益率(ROE)", 
-                                    "毛利率", 
-                                    "净利率", 
-                                    "资产负债率",
-                                    "每股净资产",
-                                    "营业收入增长率",
-                                    "净利润增长率",
-                                    "流动比率",
-                                    "速动比率"
-                                ],
-                                "数值": [
-                                    format_value(stock_data['financial_indicator'].get('eps', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('roe', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('gross_profit_margin', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('net_profit_margin', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('debt_to_assets', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('bps', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('revenue_growth', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('profit_growth', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('current_ratio', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('quick_ratio', '未知'))
-                                ]
-                            }
-                            
-                            # 检查是否为金融企业（存在金融特有指标）
-                            if stock_data['financial_indicator'].get('capital_adequacy', '未知') != '未知' or \
-                               stock_data['financial_indicator'].get('net_interest_margin', '未知') != '未知':
-                                financial_data["指标"].extend(["资本充足率", "净息差"])
-                                financial_data["数值"].extend([
-                                    format_value(stock_data['financial_indicator'].get('capital_adequacy', '未知')),
-                                    format_value(stock_data['financial_indicator'].get('net_interest_margin', '未知'))
-                                ])
-                            
-                            # 使用表格直接显示财务指标
-                            st.markdown('<div class="stock-info-card">', unsafe_allow_html=True)
-                            financial_df = pd.DataFrame(financial_data)
-                            st.table(financial_df.set_index('指标'))
-                            st.markdown('</div>', unsafe_allow_html=True)
-                            
-                            # 分析结果
-                            with st.spinner("🧠 正在分析股票投资价值..."):
-                                analysis_result = analyze_stock(news_text, stock_data)
-                                st.markdown('<h3 class="sub-header">💡 投资分析结果</h3>', unsafe_allow_html=True)
-                                st.markdown(f'<div class="analysis-result">{analysis_result.replace(chr(10), "<br>")}</div>', unsafe_allow_html=True)
-                                
-                                # 提取投资建议关键词
-                                if "建议买入" in analysis_result:
-                                    st.markdown('<div class="buy-recommendation">✅ 建议买入</div>', unsafe_allow_html=True)
-                                elif "不建议买入" in analysis_result:
-                                    st.markdown('<div class="sell-recommendation">❌ 不建议买入</div>', unsafe_allow_html=True)
-                                elif "建议观望" in analysis_result:
-                                    st.markdown('<div class="hold-recommendation">⚠️ 建议观望</div>', unsafe_allow_html=True)
-                                
-                                # 发送到钉钉机器人
-                                title = f"股票分析报告 - {stock_data['basic']['name']}({stock_code})"
-                                # 先处理换行符
-                                formatted_analysis = analysis_result.replace('\n', '\n\n')
-                                content = f'''### {title}
-                                
-#### 新闻内容
-{news_text[:200]}...
-
-#### 基本信息
-- 股票代码：{stock_code}
-- 股票名称：{stock_data['basic']['name']}
-- 所属行业：{stock_data['basic'].get('industry', '未知')}
-- 上市日期：{stock_data['basic'].get('list_date', '未知')}
-
-#### 价格信息
-- 最新价格：{stock_data['price'].get('close', '未知')}
-- 涨跌额：{stock_data['price'].get('change', '未知')}
-- 涨跌幅：{stock_data['price'].get('pct_chg', '未知')}%
-- 今日开盘：{stock_data['price'].get('open', '未知')}
-- 最高价：{stock_data['price'].get('high', '未知')}
-- 最低价：{stock_data['price'].get('low', '未知')}
-- 市盈率(TTM)：{stock_data['price'].get('pe', '未知')}
-- 市净率：{stock_data['price'].get('pb', '未知')}
-
-#### 市场表现
-- 成交量：{stock_data['price'].get('成交量', '未知')}
-- 成交额：{stock_data['price'].get('成交额', '未知')}
-- 市值：{stock_data['price'].get('total_mv', '未知')}
-- 52周最高：{stock_data['price'].get('52周最高', '未知')}
-- 52周最低：{stock_data['price'].get('52周最低', '未知')}
-- 今年以来涨幅：{stock_data['price'].get('今年以来涨幅', '未知')}
-
-#### 投资分析结果
-{formatted_analysis}
-'''
-                                # 发送消息
-                                if dingtalk_bot.send_markdown(title, content):
-                                    st.success("✅ 分析报告已发送到钉钉群")
-                                else:
-                                    st.error("❌ 发送到钉钉群失败，请检查配置")
+            st.session_state["analysis_news_text"] = news_text
+    
+    if news_text and st.session_state.get("analysis_news_text") == news_text:
+        render_news_analysis(news_text)
 
 # 添加页脚
 st.markdown("---")
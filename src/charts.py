@@ -0,0 +1,326 @@
+import numpy as np
+import pandas as pd
+
+# 图表中最多绘制的K线数量，超过时按时间分桶合并（多年的日线数据合并为周线级别）
+MAX_CHART_POINTS = 500
+
+# 移动平均线周期及颜色
+MA_PERIODS = [5, 10, 20, 60]
+MA_COLORS = ['blue', 'orange', 'purple', 'brown']
+
+# 技术指标列，分桶时取每个桶最后一个交易日的值
+INDICATOR_COLUMNS = ['MACD', 'MACD_Signal', 'MACD_Histogram', 'RSI']
+
+def downsample_ohlc(chart_data, max_points=MAX_CHART_POINTS):
+    """
+    将K线数据按连续的时间桶合并，控制图表绘制的数据点数量
+
+    参数:
+        chart_data: 包含日期、开盘、最高、最低、收盘、成交量列的DataFrame
+        max_points: 合并后的最大数据点数
+    返回:
+        合并后的DataFrame，数据量不超过max_points时原样返回
+    """
+    if max_points <= 0 or len(chart_data) <= max_points:
+        return chart_data
+
+    bucket_size = int(np.ceil(len(chart_data) / max_points))
+    buckets = np.arange(len(chart_data)) // bucket_size
+
+    # 开盘取桶内第一个值，收盘取最后一个值，最高/最低取极值，成交量求和，其余指标取最后一个值
+    agg = {column: 'last' for column in chart_data.columns}
+    agg.update({'日期': 'last', '开盘': 'first', '最高': 'max', '最低': 'min', '收盘': 'last'})
+    if '成交量' in chart_data.columns:
+        agg['成交量'] = 'sum'
+
+    return chart_data.groupby(buckets).agg(agg).reset_index(drop=True)
+
+def _prepare_chart_data(history_data, indicators, max_points):
+    """合并行情、均线和技术指标数据，并进行降采样"""
+    chart_data = history_data[['日期', '开盘', '最高', '最低', '收盘', '成交量']].copy()
+
+    # 均线在完整数据上计算，降采样不影响均线数值
+    for period in MA_PERIODS:
+        chart_data[f"MA{period}"] = chart_data['收盘'].rolling(window=period).mean()
+
+    for column in INDICATOR_COLUMNS:
+        if column in indicators.columns:
+            chart_data[column] = indicators[column].values
+
+    return downsample_ohlc(chart_data, max_points)
+
+def _add_price_levels(fig, x0, x1, levels, label_prefix, color, yshift):
+    """在K线图上添加支撑位/压力位水平线及标签"""
+    for i, level in enumerate(levels):
+        fig.add_shape(
+            type="line",
+            x0=x0,
+            x1=x1,
+            y0=level,
+            y1=level,
+            line=dict(color=color, width=2, dash="dash"),
+            row=1, col=1
+        )
+        fig.add_annotation(
+            x=x1,
+            y=level,
+            text=f"{label_prefix}{i+1}: {level}",
+            showarrow=False,
+            yshift=yshift,
+            xshift=50,
+            bgcolor=color,
+            font=dict(color="white"),
+            row=1, col=1
+        )
+
+def _add_reference_line(fig, x0, x1, y, row, color, dash=None):
+    """在指定子图上添加水平参考线"""
+    fig.add_shape(
+        type="line",
+        x0=x0,
+        x1=x1,
+        y0=y,
+        y1=y,
+        line=dict(color=color, width=1, dash=dash),
+        row=row, col=1
+    )
+
+def build_technical_figure(history_data, indicators, support_resistance, title, max_points=MAX_CHART_POINTS):
+    """
+    构建K线、成交量、MACD和RSI四个子图组成的技术分析图
+
+    参数:
+        history_data: 规范化列名后的历史行情数据
+        indicators: calculate_technical_indicators 返回的带技术指标的数据
+        support_resistance: calculate_support_resistance 返回的支撑位/压力位字典
+        title: 图表标题
+        max_points: 最多绘制的K线数量，超过时降采样
+    返回:
+        plotly Figure对象
+    """
+    # plotly只在绘图时导入，不影响应用启动
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    chart_data = _prepare_chart_data(history_data, indicators, max_points)
+    dates = chart_data['日期']
+    x0, x1 = dates.iloc[0], dates.iloc[-1]
+
+    fig = make_subplots(
+        rows=4,
+        cols=1,
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+        row_heights=[0.5, 0.15, 0.15, 0.15],
+        subplot_titles=("K线图 (带支撑位和压力位)", "成交量", "MACD", "RSI")
+    )
+
+    # K线图
+    fig.add_trace(
+        go.Candlestick(
+            x=dates,
+            open=chart_data['开盘'],
+            high=chart_data['最高'],
+            low=chart_data['最低'],
+            close=chart_data['收盘'],
+            name="K线"
+        ),
+        row=1, col=1
+    )
+
+    # 支撑位和压力位
+    _add_price_levels(fig, x0, x1, support_resistance.get("支撑位", []), "S", "green", 10)
+    _add_price_levels(fig, x0, x1, support_resistance.get("压力位", []), "R", "red", -10)
+
+    # 移动平均线（折线使用WebGL渲染）
+    for period, color in zip(MA_PERIODS, MA_COLORS):
+        ma_name = f"MA{period}"
+        fig.add_trace(
+            go.Scattergl(
+                x=dates,
+                y=chart_data[ma_name],
+                mode='lines',
+                line=dict(color=color, width=1),
+                name=ma_name
+            ),
+            row=1, col=1
+        )
+
+    # 成交量柱状图，收盘不低于开盘为红色，否则为绿色
+    volume_colors = np.where(chart_data['收盘'].values >= chart_data['开盘'].values, 'red', 'green')
+    fig.add_trace(
+        go.Bar(
+            x=dates,
+            y=chart_data['成交量'],
+            marker_color=volume_colors,
+            name="成交量"
+        ),
+        row=2, col=1
+    )
+
+    # MACD图表
+    if 'MACD' in chart_data.columns:
+        fig.add_trace(
+            go.Scattergl(
+                x=dates,
+                y=chart_data['MACD'],
+                mode='lines',
+                line=dict(color='blue'),
+                name="MACD"
+            ),
+            row=3, col=1
+        )
+        fig.add_trace(
+            go.Scattergl(
+                x=dates,
+                y=chart_data['MACD_Signal'],
+                mode='lines',
+                line=dict(color='orange'),
+                name="MACD信号线"
+            ),
+            row=3, col=1
+        )
+        histogram_colors = np.where(chart_data['MACD_Histogram'].values >= 0, 'red', 'green')
+        fig.add_trace(
+            go.Bar(
+                x=dates,
+                y=chart_data['MACD_Histogram'],
+                marker_color=histogram_colors,
+                name="MACD柱状图"
+            ),
+            row=3, col=1
+        )
+        # 零线
+        _add_reference_line(fig, x0, x1, 0, row=3, color="gray")
+
+    # RSI图表
+    if 'RSI' in chart_data.columns:
+        fig.add_trace(
+            go.Scattergl(
+                x=dates,
+                y=chart_data['RSI'],
+                mode='lines',
+                line=dict(color='purple'),
+                name="RSI(14)"
+            ),
+            row=4, col=1
+        )
+        # 超买线（70）、超卖线（30）和中间线（50）
+        _add_reference_line(fig, x0, x1, 70, row=4, color="red", dash="dash")
+        _add_reference_line(fig, x0, x1, 30, row=4, color="green", dash="dash")
+        _add_reference_line(fig, x0, x1, 50, row=4, color="gray", dash="dot")
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="日期",
+        height=800,
+        xaxis_rangeslider_visible=False,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        hovermode="x unified"
+    )
+
+    fig.update_yaxes(title_text="价格", row=1, col=1)
+    fig.update_yaxes(title_text="成交量", row=2, col=1)
+    fig.update_yaxes(title_text="MACD", row=3, col=1)
+    fig.update_yaxes(title_text="RSI", row=4, col=1)
+
+    return fig
+
+def build_chip_figure(chip_data, current_price, support_resistance, title):
+    """
+    构建筹码分布图
+
+    参数:
+        chip_data: calculate_chip_distribution 返回的筹码分布数据
+        current_price: 当前价格
+        support_resistance: 支撑位/压力位字典
+        title: 图表标题
+    返回:
+        plotly Figure对象
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+
+    # 筹码密度分布
+    fig.add_trace(
+        go.Bar(
+            x=chip_data['价格'],
+            y=chip_data['筹码密度_归一化'],
+            name="筹码密度",
+            marker_color='rgba(58, 71, 80, 0.6)'
+        )
+    )
+
+    # 当前价格线
+    fig.add_vline(
+        x=current_price,
+        line_width=2,
+        line_dash="dash",
+        line_color="red",
+        annotation_text="当前价格",
+        annotation_position="top right"
+    )
+
+    # 支撑位和压力位的垂直线
+    for support in support_resistance.get("支撑位", []):
+        fig.add_vline(
+            x=support,
+            line_width=1,
+            line_dash="dot",
+            line_color="green",
+            annotation_text=f"支撑位 {support}",
+            annotation_position="bottom left"
+        )
+
+    for resistance in support_resistance.get("压力位", []):
+        fig.add_vline(
+            x=resistance,
+            line_width=1,
+            line_dash="dot",
+            line_color="red",
+            annotation_text=f"压力位 {resistance}",
+            annotation_position="top right"
+        )
+
+    fig.update_layout(
+        title=title,
+        xaxis_title="价格",
+        yaxis_title="筹码密度 (%)",
+        height=400,
+        bargap=0,
+        bargroupgap=0
+    )
+
+    return fig
+
+def summarize_chip_distribution(chip_data, current_price, top_n=3):
+    """
+    汇总筹码分布：获利盘/套牢盘比例及筹码最集中的价格区间
+
+    参数:
+        chip_data: 筹码分布数据
+        current_price: 当前价格
+        top_n: 返回筹码密度最高的区间数量
+    返回:
+        (获利盘比例, 套牢盘比例, 筹码密度最高的区间DataFrame) 元组
+    """
+    density = chip_data['筹码密度_归一化'].values
+    in_profit = chip_data['价格'].values <= current_price
+    profit_ratio = density[in_profit].sum()
+    loss_ratio = density[~in_profit].sum()
+
+    top_chip_areas = chip_data.nlargest(top_n, '筹码密度_归一化')
+    top_areas_df = pd.DataFrame({
+        "排名": [f"Top {i+1}" for i in range(len(top_chip_areas))],
+        "价格": top_chip_areas['价格'].map('{:.2f}'.format).values,
+        "筹码密度(%)": top_chip_areas['筹码密度_归一化'].map('{:.2f}%'.format).values
+    })
+
+    return profit_ratio, loss_ratio, top_areas_df
@@ -1,4 +1,3 @@
-import requests
 import json
 import logging
 import time
@@ -8,6 +7,8 @@ import base64
 import urllib.parse
 from typing import Dict, List, Optional
 
+from http_clients import get_session
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -26,6 +27,8 @@ class DingTalkBot:
         """
         self.webhook_url = webhook_url
         self.secret = secret
+        # 复用连接，避免每条消息都重新建立TCP和TLS连接
+        self.session = get_session()
     
     def _get_signed_url(self) -> str:
         """
@@ -69,7 +72,7 @@ class DingTalkBot:
                 }
             
             signed_url = self._get_signed_url()
-            response = requests.post(
+            response = self.session.post(
                 signed_url,
                 headers={"Content-Type": "application/json"},
                 data=json.dumps(data)
@@ -120,7 +123,7 @@ class DingTalkBot:
                 }
             
             signed_url = self._get_signed_url()
-            response = requests.post(
+            response = self.session.post(
                 signed_url,
                 headers={"Content-Type": "application/json"},
                 data=json.dumps(data)
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from config.config import ARK_API_KEY, ARK_BASE_URL
+
+def load_http_config():
+    """
+    读取项目配置中的HTTP连接设置（config.json 的 http 部分）
+
+    返回:
+    合并了默认值的配置字典
+    """
+    http_config = {
+        "pool_connections": 10,
+        "pool_maxsize": 20,
+        "connect_timeout": 5,
+        "read_timeout": 30,
+        "max_retries": 2,
+        "backoff_factor": 0.5,
+        "ark_timeout": 1800,
+        "ark_max_retries": 2,
+        "pool_library_requests": True
+    }
+    try:
+        with open(os.path.join(PROJECT_ROOT, 'config.json'), 'r', encoding='utf-8') as f:
+            http_config.update(json.load(f).get("http", {}))
+    except Exception as e:
+        print(f"加载HTTP连接配置出错，使用默认配置: {e}")
+    return http_config
+
+class PooledSession(requests.Session):
+    def __init__(self, timeout):
+        """
+        复用连接的Session，未指定超时的请求使用默认超时（requests.Session本身没有默认超时）
+
+        参数:
+        timeout: 默认超时，(连接超时, 读取超时) 元组
+        """
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.default_timeout
+        return super().request(method, url, **kwargs)
+
+def create_session(http_config=None, keep_cookies=True, retries=True):
+    """
+    创建带连接池和重试的Session
+
+    参数:
+    http_config: HTTP连接配置，默认读取config.json
+    keep_cookies: 是否保存响应中的Cookie；供第三方库共用的Session不保存，
+                  使每次请求和原来使用独立连接时一样不带之前的Cookie
+    retries: 是否在连接层自动重试；为False时失败立即返回给调用方
+
+    返回:
+    PooledSession 对象
+    """
+    http_config = http_config or load_http_config()
+    session = PooledSession((http_config["connect_timeout"], http_config["read_timeout"]))
+    # 连接失败时重试；429/5xx只对GET等幂等请求重试（POST不在默认的 allowed_methods 中）
+    retry = Retry(
+        total=http_config["max_retries"] if retries else 0,
+        backoff_factor=http_config["backoff_factor"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_config["pool_connections"],
+        pool_maxsize=http_config["pool_maxsize"],
+        max_retries=retry
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not keep_cookies:
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+_sessions = {}
+_ark_client = None
+_requests_pool_installed = False
+_lock = threading.Lock()
+
+def get_session(name="default"):
+    """
+    获取进程内共享的Session，同名Session只创建一次，连接在多次请求之间复用
+
+    参数:
+    name: Session名称，"library" 为供第三方库（akshare等）共用的Session：不保存Cookie，
+          也不在连接层重试——行情请求的失败和延迟要直接交给熔断器和对冲请求处理，
+          静默的重试和退避会推迟它们的反应
+
+    返回:
+    PooledSession 对象
+    """
+    with _lock:
+        if name not in _sessions:
+            _sessions[name] = create_session(keep_cookies=(name != "library"), retries=(name != "library"))
+        return _sessions[name]
+
+def get_ark_client():
+    """获取进程内共享的Ark客户端（新闻分析和股票分析共用一个连接池），第一次调用时创建"""
+    global _ark_client
+    with _lock:
+        if _ark_client is None:
+            from volcenginesdkarkruntime import Ark
+            http_config = load_http_config()
+            _ark_client = Ark(
+                base_url=ARK_BASE_URL,
+                api_key=ARK_API_KEY,
+                timeout=http_config["ark_timeout"],
+                max_retries=http_config["ark_max_retries"],
+            )
+        return _ark_client
+
+def _pooled_request(method, url, **kwargs):
+    return get_session("library").request(method=method, url=url, **kwargs)
+
+def install_requests_pool():
+    """
+    让 requests.get/requests.post 等模块级函数使用共享的连接池
+
+    akshare内部直接调用 requests.get，每次请求都会新建连接（TCP+TLS握手）；
+    替换 requests.api.request 后，这些请求在进程内复用连接。
+    由配置项 http.pool_library_requests 控制，重复调用无副作用
+
+    返回:
+    是否已启用
+    """
+    global _requests_pool_installed
+    if not load_http_config()["pool_library_requests"]:
+        return False
+    with _lock:
+        if not _requests_pool_installed:
+            requests.api.request = _pooled_request
+            _requests_pool_installed = True
+    return True
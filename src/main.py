@@ -8,21 +8,48 @@ from datetime import datetime
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # 导入自定义模块
-from news_analyzer import analyze_news
+from news_analyzer import analyze_news, triage_news_batch
+from prompt_builder import load_prompt_config
 from stock_data import get_stock_data
 from stock_analyzer import analyze_stock
-from visualization import visualize_stock_data, generate_index_page
+from visualization import generate_index_page, apply_report_retention
+from report_renderer import ReportRenderQueue, ReportRenderError
+from news_priority import NewsPriorityScorer
+from metrics import timer, inc, registry, log_run_summary
 from dingtalk_bot import DingTalkBot
 from config.config import DINGTALK_WEBHOOK, DINGTALK_SECRET
 
-def process_news_data(news_data, output_dir='../output'):
-    """处理新闻数据并生成分析报告"""
-    # 创建结果列表
-    results = []
+def process_news_data(news_data, output_dir='../output', on_news_analyzed=None, open_browser=True, render_queue=None):
+    """
+    处理新闻数据并生成分析报告
+    
+    参数:
+    news_data: 新闻记录列表
+    output_dir: 报告输出目录
+    on_news_analyzed: 每条新闻完成分析后的回调，参数为 (news, analysis)，analysis 为 analyze_news 的返回值
+    open_browser: 生成索引页后是否自动在浏览器中打开
+    render_queue: 复用的报告渲染队列（如工作进程中长期存在的队列），由调用方负责关闭；
+                  不提供时本次调用创建并在结束时关闭
+
+    返回:
+    渲染成功的报告列表；有报告渲染失败时，在生成索引页之后抛出 ReportRenderError
+    （工作进程据此将任务记为失败并重试）
+    """
+    # 报告在渲染进程池中生成，分析循环不等待图表渲染
+    owns_render_queue = render_queue is None
+    if owns_render_queue:
+        render_queue = ReportRenderQueue(output_dir)
     
     # 初始化钉钉机器人
     dingtalk_bot = DingTalkBot(DINGTALK_WEBHOOK, DINGTALK_SECRET)
     
+    # 新闻较多时先批量完成重要性分级和行业分类，减少大模型请求次数
+    triage = [None] * len(news_data)
+    if len(news_data) >= load_prompt_config()["batch_triage"]["min_items"]:
+        print(f"共 {len(news_data)} 条新闻，批量进行重要性分级和行业分类...")
+        with timer("analysis_stage_seconds", stage="batch_triage"):
+            triage = triage_news_batch(news_data)
+    
     for i, news in enumerate(news_data):
         print(f"\n处理第 {i+1} 条新闻...")
         news_text = news['content']
@@ -30,12 +57,25 @@ def process_news_data(news_data, output_dir='../output'):
         
         # 分析新闻并提取相关股票代码
         print("开始分析新闻并提取股票代码...")
-        stock_codes = analyze_news(news_text)
+        with timer("analysis_stage_seconds", stage="analyze_news"):
+            analysis = analyze_news(news_text, triage[i])
+        inc("news_analyzed_total")
+        if on_news_analyzed is not None:
+            on_news_analyzed(news, analysis)
+        
+        # 重要性不足的新闻不进行个股分析
+        if not analysis["analyze"]:
+            print(f"新闻重要性等级为{analysis['importance_level']}（{analysis['importance_category']}），跳过分析")
+            inc("news_skipped_total", reason="importance")
+            continue
+        
+        stock_codes = analysis["stock_code"] or ""
         print(f"相关股票代码：{stock_codes}")
         
         # 处理无相关上市公司的情况
         if stock_codes == "无相关上市公司":
             print("该新闻没有相关的已上市公司，跳过分析")
+            inc("news_skipped_total", reason="no_stock")
             continue
         
         for stock_code in stock_codes.split(','):
@@ -45,7 +85,8 @@ def process_news_data(news_data, output_dir='../output'):
             
             print(f"\n开始获取股票 {stock_code} 的数据...")
             # 获取股票数据
-            stock_data = get_stock_data(stock_code)
+            with timer("analysis_stage_seconds", stage="stock_data"):
+                stock_data = get_stock_data(stock_code)
             
             if not stock_data or not stock_data.get('basic', {}).get('name', ''):
                 print(f"未能获取到股票 {stock_code} 的有效数据，跳过分析")
@@ -53,17 +94,18 @@ def process_news_data(news_data, output_dir='../output'):
             
             print(f"开始分析股票 {stock_code}...")
             # 综合分析
-            analysis_result = analyze_stock(news_text, stock_data)
+            with timer("analysis_stage_seconds", stage="analyze_stock"):
+                analysis_result = analyze_stock(news_text, stock_data)
+            inc("stock_reports_total")
             print(f"股票代码：{stock_code}\n分析结果：{analysis_result}")
             
-            # 生成可视化报告
-            report_file = visualize_stock_data(stock_data, news_text, analysis_result, output_dir)
-            results.append({
-                'news_index': i,
-                'stock_code': stock_code,
-                'stock_name': stock_data['basic']['name'],
-                'report_file': report_file
-            })
+            # 提交可视化报告渲染任务
+            render_queue.submit(
+                stock_data, news_text, analysis_result,
+                news_index=i,
+                stock_code=stock_code,
+                stock_name=stock_data['basic']['name']
+            )
             
             # 发送到钉钉机器人
             # 构建Markdown消息
@@ -91,18 +133,33 @@ def process_news_data(news_data, output_dir='../output'):
 {formatted_analysis}
 """
             # 发送消息
-            dingtalk_bot.send_markdown(title, content)
+            with timer("analysis_stage_seconds", stage="dingtalk"):
+                dingtalk_bot.send_markdown(title, content)
     
-    # 生成索引页面
+    # 等待所有报告渲染完成后再生成索引页面
+    with timer("analysis_stage_seconds", stage="render_wait"):
+        results = render_queue.wait()
+    if owns_render_queue:
+        render_queue.shutdown()
+    
+    # 生成索引页面（报告清理不在这里进行，由监视器定期执行，见 apply_report_retention）
     if results:
-        index_file = generate_index_page(results, output_dir)
+        with timer("analysis_stage_seconds", stage="index_page"):
+            index_file = generate_index_page(results, output_dir)
         
         # 尝试自动打开索引页面
-        try:
-            webbrowser.open(f"file://{os.path.abspath(index_file)}")
-            print("已自动打开报告索引页")
-        except:
-            print(f"请手动打开报告索引页: {index_file}")
+        if open_browser:
+            try:
+                webbrowser.open(f"file://{os.path.abspath(index_file)}")
+                print("已自动打开报告索引页")
+            except:
+                print(f"请手动打开报告索引页: {index_file}")
+        else:
+            print(f"报告索引页: {index_file}")
+    
+    if render_queue.failures:
+        failed = ", ".join(f"{metadata.get('stock_code', '')}: {error}" for metadata, error in render_queue.failures)
+        raise ReportRenderError(f"{len(render_queue.failures)} 份报告渲染失败（{failed}）")
     
     return results
 
@@ -123,8 +180,22 @@ def main():
         
         print(f"成功读取新闻数据，共 {len(news_data)} 条")
         
+        # 按优先级排序，最重要、最新鲜的新闻先分析，过期新闻不再分析
+        scorer = NewsPriorityScorer(os.path.join(current_dir, '..', 'config.json'))
+        news_data, stale_count = scorer.prioritize(news_data)
+        if stale_count:
+            print(f"跳过 {stale_count} 条超过 {scorer.max_age_hours} 小时的过期新闻")
+        
         # 处理新闻数据
-        process_news_data(news_data, output_dir)
+        registry.start_run()
+        try:
+            process_news_data(news_data, output_dir)
+        except ReportRenderError as e:
+            # 单独运行时其他报告已经生成，只提示失败的报告
+            print(e)
+        # 单独运行时在结束后清理一次旧报告
+        apply_report_retention(output_dir, blocking=True)
+        log_run_summary("新闻分析")
         
     except Exception as e:
         print(f"程序执行出错: {e}")
@@ -0,0 +1,447 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from metrics import observe, inc
+
+class DataUnavailableError(Exception):
+    """所有行情数据源都无法提供数据（失败、熔断或没有快照）"""
+
+class CircuitOpenError(DataUnavailableError):
+    """数据源的接口处于熔断状态，调用被直接跳过"""
+
+def load_market_data_config():
+    """
+    读取项目配置中的行情数据源设置（config.json 的 market_data 部分）
+
+    返回:
+    合并了默认值的配置字典
+    """
+    market_config = {
+        "providers": ["akshare"],
+        "replay_dir": "data/market_replay",
+        "record": False,
+        "failure_threshold": 3,
+        "reset_seconds": 60,
+        "slow_call_seconds": 15,
+        "hedge_percentile": 0.9,
+        "hedge_min_samples": 20,
+        "hedge_min_seconds": 0.5,
+        "hedge_default_seconds": 3
+    }
+    try:
+        with open(os.path.join(PROJECT_ROOT, 'config.json'), 'r', encoding='utf-8') as f:
+            market_config.update(json.load(f).get("market_data", {}))
+    except Exception as e:
+        print(f"加载行情数据源配置出错，使用默认配置: {e}")
+    if not os.path.isabs(market_config["replay_dir"]):
+        market_config["replay_dir"] = os.path.join(PROJECT_ROOT, market_config["replay_dir"])
+    return market_config
+
+def snapshot_key(endpoint, kwargs):
+    """根据接口名和参数生成快照文件名"""
+    payload = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(f"{endpoint}:{payload}".encode('utf-8')).hexdigest()[:16]
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, reset_seconds=60):
+        """
+        熔断器：连续失败达到阈值后打开，打开期间直接拒绝调用；
+        reset_seconds 后进入半开状态，放行一次试探调用，成功则关闭，失败则重新打开
+
+        参数:
+        failure_threshold: 连续失败次数阈值
+        reset_seconds: 熔断持续时间（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许本次调用"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= self.reset_seconds and not self.probing:
+                # 半开状态，只放行一个试探调用
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release_probe(self):
+        """结束试探调用但不改变熔断状态（调用结果既不算成功也不算失败时使用）"""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self):
+        """
+        记录一次失败
+
+        返回:
+        熔断器是否因本次失败而打开
+        """
+        with self._lock:
+            self.failures += 1
+            was_probing = self.probing
+            self.probing = False
+            if was_probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+                return True
+            return False
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self.opened_at is not None
+
+class MarketDataProvider(ABC):
+    """行情数据源接口：按 akshare 的函数名和参数提供数据"""
+
+    name = "base"
+
+    @abstractmethod
+    def call(self, endpoint, **kwargs):
+        """
+        获取数据
+
+        参数:
+        endpoint: akshare函数名，如 stock_zh_a_hist
+        kwargs: 接口参数
+
+        返回:
+        接口返回值（通常为DataFrame），无法提供时抛出异常
+        """
+
+class AkshareProvider(MarketDataProvider):
+    name = "akshare"
+
+    def __init__(self, module=None, record_dir=None):
+        """
+        akshare数据源
+
+        参数:
+        module: akshare模块，默认在第一次调用时导入
+        record_dir: 快照目录，指定时把每次成功调用的返回值保存为快照，供 ReplayProvider 回放
+        """
+        self.module = module
+        self.record_dir = record_dir
+
+    def call(self, endpoint, **kwargs):
+        if self.module is None:
+            from http_clients import install_requests_pool
+            # akshare内部使用 requests.get，让其复用共享的连接池
+            install_requests_pool()
+            import akshare
+            self.module = akshare
+        result = getattr(self.module, endpoint)(**kwargs)
+        if self.record_dir:
+            self._record(endpoint, kwargs, result)
+        return result
+
+    def _record(self, endpoint, kwargs, result):
+        try:
+            endpoint_dir = os.path.join(self.record_dir, endpoint)
+            os.makedirs(endpoint_dir, exist_ok=True)
+            path = os.path.join(endpoint_dir, f"{snapshot_key(endpoint, kwargs)}.pkl")
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump({"endpoint": endpoint, "kwargs": kwargs, "saved_at": time.time(), "data": result}, f)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"保存行情快照 {endpoint} 出错: {e}")
+
+class ReplayProvider(MarketDataProvider):
+    name = "replay"
+
+    def __init__(self, replay_dir, max_age_seconds=None):
+        """
+        本地快照回放数据源，读取 AkshareProvider 录制的快照
+
+        参数:
+        replay_dir: 快照目录
+        max_age_seconds: 快照的最长有效期，None表示不限制
+        """
+        self.replay_dir = replay_dir
+        self.max_age_seconds = max_age_seconds
+
+    def call(self, endpoint, **kwargs):
+        path = os.path.join(self.replay_dir, endpoint, f"{snapshot_key(endpoint, kwargs)}.pkl")
+        if not os.path.exists(path):
+            raise DataUnavailableError(f"没有 {endpoint} 的快照")
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        if self.max_age_seconds is not None and time.time() - snapshot["saved_at"] > self.max_age_seconds:
+            raise DataUnavailableError(f"{endpoint} 的快照已过期")
+        return snapshot["data"]
+
+class CompositeProvider(MarketDataProvider):
+    name = "composite"
+
+    def __init__(self, providers, failure_threshold=3, reset_seconds=60, slow_call_seconds=None,
+                 hedge_percentile=0.9, hedge_min_samples=20, hedge_min_seconds=0.5, hedge_default_seconds=3):
+        """
+        组合数据源：按顺序尝试各数据源，每个数据源的每个接口有独立的熔断器，
+        熔断中的接口直接跳过，不再每次串行重试；记录每个数据源每个接口的延迟
+
+        参数:
+        providers: 数据源列表，按优先级排列
+        failure_threshold: 熔断的连续失败次数阈值
+        reset_seconds: 熔断持续时间（秒）
+        slow_call_seconds: 超过该耗时的成功调用也计为一次失败，使持续变慢的接口被熔断；None表示不启用
+        hedge_percentile: 对冲请求的等待时间取首选数据源该接口最近成功调用延迟的分位数
+        hedge_min_samples: 样本数少于该值时使用 hedge_default_seconds
+        hedge_min_seconds: 对冲等待时间的下限
+        hedge_default_seconds: 样本不足时的对冲等待时间
+        """
+        self.providers = list(providers)
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.breakers = {}
+        self.latency = {}
+        self.samples = {}
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_seconds = hedge_min_seconds
+        self.hedge_default_seconds = hedge_default_seconds
+        self._lock = threading.Lock()
+
+    def _breaker(self, provider, endpoint):
+        key = (provider.name, endpoint)
+        with self._lock:
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            return self.breakers[key]
+
+    def _record_latency(self, provider, endpoint, elapsed, ok):
+        key = (provider.name, endpoint)
+        with self._lock:
+            stats = self.latency.setdefault(key, {"calls": 0, "failures": 0, "ewma": elapsed, "max": 0.0})
+            stats["calls"] += 1
+            stats["failures"] += 0 if ok else 1
+            stats["ewma"] = 0.8 * stats["ewma"] + 0.2 * elapsed
+            stats["max"] = max(stats["max"], elapsed)
+            if ok:
+                self.samples.setdefault(key, deque(maxlen=200)).append(elapsed)
+        observe("market_data_request_seconds", elapsed, provider=provider.name, endpoint=endpoint)
+        inc("market_data_requests_total", provider=provider.name, endpoint=endpoint, result="ok" if ok else "error")
+
+    def hedge_delay(self, endpoint):
+        """
+        对冲请求的等待时间：首选数据源该接口最近成功调用延迟的分位数（秒）
+
+        参数:
+        endpoint: akshare函数名
+
+        返回:
+        等待秒数，首选数据源的该接口熔断中时返回0（立即发起备用请求）
+        """
+        if not self.providers:
+            return 0
+        primary = self.providers[0]
+        if self._breaker(primary, endpoint).is_open:
+            return 0
+        with self._lock:
+            samples = sorted(self.samples.get((primary.name, endpoint), ()))
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_seconds
+        index = min(int(self.hedge_percentile * len(samples)), len(samples) - 1)
+        return max(samples[index], self.hedge_min_seconds)
+
+    def is_available(self, endpoint):
+        """是否至少有一个数据源的该接口没有熔断"""
+        return any(not self._breaker(provider, endpoint).is_open for provider in self.providers)
+
+    def call(self, endpoint, **kwargs):
+        errors = []
+        for provider in self.providers:
+            breaker = self._breaker(provider, endpoint)
+            if not breaker.allow():
+                inc("market_data_requests_total", provider=provider.name, endpoint=endpoint, result="skipped")
+                errors.append(f"{provider.name}: 熔断中")
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = provider.call(endpoint, **kwargs)
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                self._record_latency(provider, endpoint, elapsed, ok=False)
+                # 没有快照不代表数据源异常，既不计入失败也不算成功，只结束可能进行中的试探调用
+                if isinstance(e, DataUnavailableError):
+                    breaker.release_probe()
+                elif breaker.record_failure():
+                    print(f"行情接口 {provider.name}.{endpoint} 连续失败，熔断 {self.reset_seconds} 秒")
+                errors.append(f"{provider.name}: {e}")
+                continue
+
+            elapsed = time.perf_counter() - start
+            self._record_latency(provider, endpoint, elapsed, ok=True)
+            if self.slow_call_seconds is not None and elapsed > self.slow_call_seconds:
+                if breaker.record_failure():
+                    print(f"行情接口 {provider.name}.{endpoint} 持续响应缓慢（{elapsed:.1f}秒），熔断 {self.reset_seconds} 秒")
+            else:
+                breaker.record_success()
+            return result
+
+        if errors and all(error.endswith("熔断中") for error in errors):
+            raise CircuitOpenError(f"{endpoint} 所有数据源均在熔断中")
+        raise DataUnavailableError(f"{endpoint} 获取失败: {'; '.join(errors)}")
+
+    def stats(self):
+        """
+        各数据源各接口的调用统计
+
+        返回:
+        字典，键为 "数据源.接口"，值包含 calls、failures、ewma（平滑后的平均延迟）、max、breaker_open
+        """
+        with self._lock:
+            items = list(self.latency.items())
+        return {
+            f"{name}.{endpoint}": dict(stats, breaker_open=self.breakers[(name, endpoint)].is_open)
+            for (name, endpoint), stats in items
+        }
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def create_market_data_provider(market_config=None):
+    """根据配置创建组合数据源"""
+    market_config = market_config or load_market_data_config()
+    providers = []
+    for name in market_config["providers"]:
+        if name == "akshare":
+            providers.append(AkshareProvider(record_dir=market_config["replay_dir"] if market_config["record"] else None))
+        elif name == "replay":
+            providers.append(ReplayProvider(market_config["replay_dir"]))
+        else:
+            print(f"未知的行情数据源: {name}，已忽略")
+    return CompositeProvider(
+        providers,
+        failure_threshold=market_config["failure_threshold"],
+        reset_seconds=market_config["reset_seconds"],
+        slow_call_seconds=market_config["slow_call_seconds"],
+        hedge_percentile=market_config["hedge_percentile"],
+        hedge_min_samples=market_config["hedge_min_samples"],
+        hedge_min_seconds=market_config["hedge_min_seconds"],
+        hedge_default_seconds=market_config["hedge_default_seconds"]
+    )
+
+def get_market_data_provider():
+    """获取进程内共享的行情数据源（熔断状态和延迟统计在进程内共享）"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_market_data_provider()
+        return _provider
+
+def set_market_data_provider(provider):
+    """替换进程内共享的行情数据源（如基准测试中使用离线数据）"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+# 对冲请求使用的线程池；被放弃的慢请求在后台继续执行完毕，结果丢弃
+HEDGE_WORKERS = 8
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="market-hedge")
+# 对冲放弃的慢请求无法取消，会一直占用线程；只在有空闲线程时提交，任务不会在线程池中排队等待
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+def _submit_hedge(func):
+    """
+    有空闲线程时在对冲线程池中执行 func
+
+    返回:
+    Future对象，没有空闲线程时返回None
+    """
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+
+    def run():
+        try:
+            return func()
+        finally:
+            _hedge_slots.release()
+
+    try:
+        return _hedge_executor.submit(run)
+    except Exception:
+        _hedge_slots.release()
+        raise
+
+def _run_inline(func):
+    """在当前线程中执行 func，结果包装为已完成的Future"""
+    future = Future()
+    try:
+        future.set_result(func())
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def hedged_call(attempts, hedge_after):
+    """
+    对冲请求：先发起第一个获取方式，超过 hedge_after 秒未返回（或已失败）时并行发起下一个，
+    采用最先成功返回的结果，用于限制慢接口造成的尾部延迟
+
+    对冲线程池没有空闲线程时（之前被放弃的慢请求仍未返回），获取方式改为在调用线程中直接执行，
+    不会排在卡住的请求之后
+
+    参数:
+    attempts: [(名称, 无参函数)] 列表，按优先级排列，函数失败时抛出异常
+    hedge_after: 发起下一个获取方式前的等待秒数
+
+    返回:
+    (名称, 结果) 元组，全部失败时抛出 DataUnavailableError
+    """
+    pending = {}
+    errors = []
+    remaining = list(attempts)
+
+    def launch_next():
+        name, func = remaining.pop(0)
+        future = _submit_hedge(func)
+        if future is None:
+            # 线程池已被之前未返回的慢请求占满（如接口持续变慢），在当前线程中直接执行，不排队等待
+            inc("market_data_hedge_saturated_total", attempt=name)
+            future = _run_inline(func)
+        pending[future] = name
+
+    launch_next()
+    while pending:
+        # 还有备用方式时只等待 hedge_after 秒，否则等待已发起的请求结束
+        timeout = hedge_after if remaining else None
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            inc("market_data_hedged_total", attempt=remaining[0][0])
+            launch_next()
+            continue
+        for future in done:
+            name = pending.pop(future)
+            try:
+                return name, future.result()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+        if remaining:
+            # 已发起的请求失败，立即发起下一个，不再等待
+            launch_next()
+    raise DataUnavailableError(f"所有获取方式均失败: {'; '.join(errors)}")
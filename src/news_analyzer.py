@@ -1,67 +1,64 @@
 import os
+import re
 import sys
-from volcenginesdkarkruntime import Ark
-import akshare as ak
+import json
 
 # 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# 从config导入常量
-from config.config import ARK_API_KEY
+from config.config import TASK_MODELS, ESCALATION_MODELS
+from metrics import timer, inc
+from http_clients import get_ark_client
+from prompt_builder import build_messages, compact_article, article_budget, record_usage, load_prompt_config, pack_batches
 
-# 配置 DeepSeek
-client = Ark(
-    api_key=ARK_API_KEY,
-    timeout=1800,
-)
+# 配置 DeepSeek：使用进程内共享的Ark客户端，第一次调用大模型时创建
+client = None
 
-def filter_news_by_importance(news_text):
+def get_client():
+    """获取Ark客户端（与其他分析模块共用连接池）"""
+    global client
+    if client is None:
+        client = get_ark_client()
+    return client
+
+def request_task_completion(task, messages, parse, is_valid):
     """
-    对新闻进行重要性分级筛选，只有达到一定等级的新闻才会被分析
-    
-    重要性等级：
-    1级 - 国家政策（最高级别）：政府重大政策、监管措施、规划等
-    2级 - 行业重大事件：行业政策调整、重大技术突破、行业格局变化等
-    3级 - 公司重大事件：业绩预告、重大合同、重组并购、管理层变动等
-    4级 - 普通公司新闻：一般性发展、日常运营、小额合同等
-    5级 - 市场传闻（最低级别）：未经证实的消息、小道消息等
-    
-    返回值：
-    - (int, str): 包含重要性等级(1-5)和分类描述的元组
-    - 只有等级1-3的新闻会被推荐进一步分析
+    使用任务配置的模型（TASK_MODELS）调用大模型并解析输出，
+    输出未通过校验时改用升级模型（ESCALATION_MODELS）重试一次
+
+    参数:
+    task: 任务名称，如 importance、industry
+    messages: 对话消息
+    parse: 解析函数，参数为模型输出的文本
+    is_valid: 校验函数，参数为 parse 的结果
+
+    返回:
+    (接口返回对象, 解析结果) 元组，升级后仍未通过校验时返回升级模型的结果
     """
-    prompt = f"""
-    请对以下新闻按照重要性和影响力进行分级，分类请严格按照以下标准：
-    
-    1级 - 国家政策（最高级别）：中央政府、国务院、财政部、央行等发布的重大政策、监管措施、规划、法规等，可能对整个市场或多个行业产生重大影响的政策变动
-    
-    2级 - 行业重大事件：行业政策调整、重大技术突破、行业格局变化、区域性政策对特定行业的影响等，可能对一个行业或板块产生实质性影响的事件
-    
-    3级 - 公司重大事件：上市公司业绩预告（尤其是大幅增长或下滑）、重大合同签订、重组并购、管理层重大变动、产品重大创新等，可能对个股价格产生明显影响的公司消息
-    
-    4级 - 普通公司新闻：一般性公司发展动态、日常运营信息、小额合同、常规产品更新等，对股价影响较小的日常信息
-    
-    5级 - 市场传闻（最低级别）：未经官方证实的消息、小道消息、模糊信息等，可靠性较低的市场传言
-    
-    请先对新闻内容进行深入理解，然后给出一个明确的分级（1-5之间的整数），并提供一句话解释。
-    你的回答必须以以下格式返回（且只返回这两行）：
-    分级：[1-5之间的数字]
-    分类：[对应上述分类的文字描述，如"国家政策"、"行业重大事件"等]
-    
-    新闻内容：
-    {news_text}
+    models = [TASK_MODELS[task]]
+    if ESCALATION_MODELS.get(task) and ESCALATION_MODELS[task] != models[0]:
+        models.append(ESCALATION_MODELS[task])
+
+    for attempt, model in enumerate(models):
+        with timer("llm_request_seconds", task=task, model=model):
+            response = get_client().chat.completions.create(
+                model=model,
+                messages=messages
+            )
+        record_usage(task, messages, response)
+        result = parse(response.choices[0].message.content.strip())
+        if is_valid(result) or attempt == len(models) - 1:
+            return response, result
+        inc("llm_escalations_total", task=task, model=model)
+        print(f"[{task}] 模型 {model} 的输出未通过校验，改用 {models[attempt + 1]}")
+
+def parse_importance(result):
+    """
+    解析重要性分级的输出
+
+    返回:
+    (级别, 分类) 元组，解析失败时为 (5, "解析错误") 或 (5, "格式错误")
     """
-    
-    response = client.chat.completions.create(
-        model="deepseek-r1-distill-qwen-32b-250120",
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
-    
-    result = response.choices[0].message.content.strip()
-    
-    # 解析返回结果
     lines = result.split('\n')
     if len(lines) >= 2:
         try:
@@ -80,6 +77,92 @@ def filter_news_by_importance(news_text):
         print("AI返回的格式不符合预期")
         return (5, "格式错误")  # 默认为最低级别
 
+def is_valid_importance(importance):
+    level, category = importance
+    return 1 <= level <= 5 and category not in ("解析错误", "格式错误")
+
+def parse_stock_code(result):
+    """解析股票代码的输出：提取其中的6位代码，找不到时原样返回"""
+    if "无相关上市公司" in result:
+        return "无相关上市公司"
+    match = re.search(r"(?<!\d)\d{6}(?!\d)", result)
+    return match.group(0) if match else result
+
+def is_valid_stock_code(stock_code):
+    return stock_code == "无相关上市公司" or bool(re.fullmatch(r"\d{6}", stock_code))
+
+# 各任务固定的说明部分（不含新闻内容），每次调用完全相同，便于服务端复用前缀缓存
+IMPORTANCE_INSTRUCTIONS = """
+请对以下新闻按照重要性和影响力进行分级，分类请严格按照以下标准：
+
+1级 - 国家政策（最高级别）：中央政府、国务院、财政部、央行等发布的重大政策、监管措施、规划、法规等，可能对整个市场或多个行业产生重大影响的政策变动
+
+2级 - 行业重大事件：行业政策调整、重大技术突破、行业格局变化、区域性政策对特定行业的影响等，可能对一个行业或板块产生实质性影响的事件
+
+3级 - 公司重大事件：上市公司业绩预告（尤其是大幅增长或下滑）、重大合同签订、重组并购、管理层重大变动、产品重大创新等，可能对个股价格产生明显影响的公司消息
+
+4级 - 普通公司新闻：一般性公司发展动态、日常运营信息、小额合同、常规产品更新等，对股价影响较小的日常信息
+
+5级 - 市场传闻（最低级别）：未经官方证实的消息、小道消息、模糊信息等，可靠性较低的市场传言
+
+请先对新闻内容进行深入理解，然后给出一个明确的分级（1-5之间的整数），并提供一句话解释。
+你的回答必须以以下格式返回（且只返回这两行）：
+分级：[1-5之间的数字]
+分类：[对应上述分类的文字描述，如"国家政策"、"行业重大事件"等]
+"""
+
+STOCK_CODE_INSTRUCTIONS = """
+分析以下新闻内容，提取或推荐与该新闻最相关的A股上市公司股票代码。新闻的行业分类在新闻内容之前给出。
+
+分析步骤：
+1. 首先检查新闻中是否明确提到了A股上市公司名称，如有，优先返回该公司的股票代码
+2. 如果新闻没有直接提到上市公司名称，请根据新闻内容和行业分类，推荐该行业中最相关的龙头或代表性A股上市公司
+3. 推荐时优先考虑与新闻内容主题高度相关的公司，尤其是在该细分领域有竞争优势的企业
+4. 切记不要返回未上市公司（如华为、字节跳动等）的名称
+
+重要说明：
+- 即使新闻中没有直接提到上市公司名称，也必须找出与新闻主题最相关的A股上市公司
+- 优先选择行业龙头、市场份额领先或技术领先的公司
+- 如果是行业政策新闻，请选择最受该政策影响（正面或负面）的公司
+- 如果是国家政策新闻，请选择最受该政策影响的行业龙头公司
+
+你的回答必须只包含一个6位数字的股票代码（如"600519"或"000001"），不要有任何其他文字说明。
+如果经过充分分析确实找不到任何相关上市公司，请回复"无相关上市公司"。
+"""
+
+STOCK_CODE_FALLBACK_INSTRUCTIONS = """
+请根据以下新闻的行业分类，推荐一家在这个行业中最具代表性的A股上市公司。
+
+即使新闻内容没有明确提到任何公司，你也必须从该行业中选择一家A股上市的龙头企业或最具代表性的公司。
+你应该考虑：市值规模、营收规模、市场占有率、技术领先程度等因素来选择最合适的公司。
+
+请直接返回股票代码（6位数字），不要有任何其他文字。
+你的回答将直接用于投资决策，请确保选择的公司确实是A股上市公司。
+"""
+
+def filter_news_by_importance(news_text):
+    """
+    对新闻进行重要性分级筛选，只有达到一定等级的新闻才会被分析
+    
+    重要性等级：
+    1级 - 国家政策（最高级别）：政府重大政策、监管措施、规划等
+    2级 - 行业重大事件：行业政策调整、重大技术突破、行业格局变化等
+    3级 - 公司重大事件：业绩预告、重大合同、重组并购、管理层变动等
+    4级 - 普通公司新闻：一般性发展、日常运营、小额合同等
+    5级 - 市场传闻（最低级别）：未经证实的消息、小道消息等
+    
+    返回值：
+    - (int, str): 包含重要性等级(1-5)和分类描述的元组
+    - 只有等级1-3的新闻会被推荐进一步分析
+    """
+    messages = build_messages(
+        IMPORTANCE_INSTRUCTIONS,
+        f"新闻内容：\n{compact_article(news_text, article_budget('importance'))}"
+    )
+    
+    _, importance = request_task_completion("importance", messages, parse_importance, is_valid_importance)
+    return importance
+
 def should_analyze_news(news_text):
     """
     判断新闻是否应该被进一步分析
@@ -95,15 +178,23 @@ def should_analyze_news(news_text):
     
     return (should_analyze, importance)
 
-def analyze_news(news_text):
+def analyze_news(news_text, triage=None):
     """
     分析新闻内容，提取相关的股票代码
     确保只返回已上市的A股股票代码
     首先会对新闻进行重要性筛选，只分析重要级别较高的新闻
     即使新闻没有直接提到公司名称，也会根据行业关联性推荐相关股票
+
+    参数:
+    news_text: 新闻内容
+    triage: triage_news_batch 返回的该条新闻的分级结果，提供时不再单独调用重要性分级和行业分类
     """
     # 首先对新闻进行重要性筛选
-    should_analyze, importance = should_analyze_news(news_text)
+    if triage is not None:
+        importance = triage["importance"]
+        should_analyze = importance[0] <= 3
+    else:
+        should_analyze, importance = should_analyze_news(news_text)
     importance_level, importance_category = importance
     
     # 如果新闻重要性不足（4级或5级），则不进行分析
@@ -120,73 +211,31 @@ def analyze_news(news_text):
     print(f"新闻重要性等级为{importance_level}（{importance_category}），进行分析")
     
     # 对重要新闻进行行业分类
-    industry_info = categorize_news_by_industry(news_text)
+    industry_info = (triage or {}).get("industry_info") or categorize_news_by_industry(news_text)
     print(f"所属行业: {industry_info['main_category']} - {industry_info['sub_category']} (相关度: {industry_info['relevance_score']})")
     
-    prompt = f"""
-    分析以下新闻内容，提取或推荐与该新闻最相关的A股上市公司股票代码。
-    新闻归类于"{industry_info['main_category']}"行业大类中的"{industry_info['sub_category']}"细分领域。
-    
-    分析步骤：
-    1. 首先检查新闻中是否明确提到了A股上市公司名称，如有，优先返回该公司的股票代码
-    2. 如果新闻没有直接提到上市公司名称，请根据新闻内容和行业分类，推荐该行业中最相关的龙头或代表性A股上市公司
-    3. 推荐时优先考虑与新闻内容主题高度相关的公司，尤其是在该细分领域有竞争优势的企业
-    4. 切记不要返回未上市公司（如华为、字节跳动等）的名称
-    
-    重要说明：
-    - 即使新闻中没有直接提到上市公司名称，也必须找出与新闻主题最相关的A股上市公司
-    - 优先选择行业龙头、市场份额领先或技术领先的公司
-    - 如果是行业政策新闻，请选择最受该政策影响（正面或负面）的公司
-    - 如果是国家政策新闻，请选择最受该政策影响的行业龙头公司
-    
-    你的回答必须只包含一个6位数字的股票代码（如"600519"或"000001"），不要有任何其他文字说明。
-    如果经过充分分析确实找不到任何相关上市公司，请回复"无相关上市公司"。
-    
-    新闻内容：
-    {news_text}
-    """
-    
-    response = client.chat.completions.create(
-        model="deepseek-r1-distill-qwen-32b-250120",
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+    messages = build_messages(
+        STOCK_CODE_INSTRUCTIONS,
+        f"新闻归类于\"{industry_info['main_category']}\"行业大类中的\"{industry_info['sub_category']}\"细分领域。\n\n"
+        f"新闻内容：\n{compact_article(news_text, article_budget('stock_code'))}"
     )
-    if hasattr(response.choices[0].message, 'reasoning_content'):
-        print(response.choices[0].message.reasoning_content)
     
-    # 获取AI返回的股票代码
-    stock_code = response.choices[0].message.content.strip()
+    response, stock_code = request_task_completion("stock_code", messages, parse_stock_code, is_valid_stock_code)
+    if getattr(response.choices[0].message, 'reasoning_content', None):
+        print(response.choices[0].message.reasoning_content)
     
     # 验证返回的是否为有效的股票代码
     if stock_code == "无相关上市公司":
         # 如果第一次尝试未找到相关股票，再次尝试，但更明确要求返回行业龙头
         print("第一次未找到相关上市公司，尝试获取行业龙头企业...")
         
-        fallback_prompt = f"""
-        请根据以下新闻的行业分类，推荐一家在这个行业中最具代表性的A股上市公司。
-        
-        新闻行业归类：
-        - 行业大类：{industry_info['main_category']}
-        - 细分领域：{industry_info['sub_category']}
-        
-        即使新闻内容没有明确提到任何公司，你也必须从该行业中选择一家A股上市的龙头企业或最具代表性的公司。
-        你应该考虑：市值规模、营收规模、市场占有率、技术领先程度等因素来选择最合适的公司。
-        
-        请直接返回股票代码（6位数字），不要有任何其他文字。
-        你的回答将直接用于投资决策，请确保选择的公司确实是A股上市公司。
-        
-        新闻简述：{news_text[:100]}...
-        """
-        
-        fallback_response = client.chat.completions.create(
-            model="deepseek-r1-distill-qwen-32b-250120",
-            messages=[
-                {"role": "user", "content": fallback_prompt}
-            ]
+        fallback_messages = build_messages(
+            STOCK_CODE_FALLBACK_INSTRUCTIONS,
+            f"新闻行业归类：\n- 行业大类：{industry_info['main_category']}\n- 细分领域：{industry_info['sub_category']}\n\n"
+            f"新闻简述：{compact_article(news_text, article_budget('stock_code_fallback'))}"
         )
         
-        stock_code = fallback_response.choices[0].message.content.strip()
+        _, stock_code = request_task_completion("stock_code_fallback", fallback_messages, parse_stock_code, is_valid_stock_code)
         print(f"找到行业相关股票: {stock_code}")
     
     # 验证返回的是否为有效的股票代码
@@ -201,8 +250,9 @@ def analyze_news(news_text):
     
     # 尝试验证股票代码是否为已上市股票
     try:
+        from stock_data import get_stock_list
         # 获取所有A股股票列表
-        stock_list = ak.stock_info_a_code_name()
+        stock_list = get_stock_list()
         # 检查返回的股票代码是否在列表中
         if stock_code in stock_list['code'].values:
             company_name = stock_list.loc[stock_list['code'] == stock_code, 'name'].values[0]
@@ -245,85 +295,216 @@ def categorize_news_by_industry(news_text):
     # 获取所有行业大类
     main_categories = get_all_categories()
     
-    prompt = f"""
-    请分析以下新闻，确定其所属的行业领域类别。请从以下分类体系中，选择最匹配的行业大类和细分领域：
-
-    行业大类列表：
-    {', '.join(main_categories)}
+    # 行业列表是固定的，放在说明部分中，不影响前缀缓存
+    instructions = f"""
+请分析以下新闻，确定其所属的行业领域类别。请从以下分类体系中，选择最匹配的行业大类和细分领域：
 
-    请根据新闻内容，给出如下格式的回答（只返回以下4行内容）：
-    主要行业类别：[选择最匹配的行业大类]
-    细分领域：[选择最匹配的细分领域]
-    相关度评分：[1-10的整数，表示新闻与该行业的相关度]
-    分类解释：[一句话解释为什么将新闻分类到该行业]
+行业大类列表：
+{', '.join(main_categories)}
 
-    新闻内容：
-    {news_text}
-    """
-    
-    response = client.chat.completions.create(
-        model="deepseek-r1-distill-qwen-32b-250120",
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+请根据新闻内容，给出如下格式的回答（只返回以下4行内容）：
+主要行业类别：[选择最匹配的行业大类]
+细分领域：[选择最匹配的细分领域]
+相关度评分：[1-10的整数，表示新闻与该行业的相关度]
+分类解释：[一句话解释为什么将新闻分类到该行业]
+"""
+    messages = build_messages(
+        instructions,
+        f"新闻内容：\n{compact_article(news_text, article_budget('industry'))}"
     )
     
-    result = response.choices[0].message.content.strip()
-    
-    # 解析返回结果
-    lines = result.split('\n')
-    if len(lines) >= 4:
-        try:
-            main_category_line = lines[0]
-            sub_category_line = lines[1]
-            relevance_line = lines[2]
-            explanation_line = lines[3]
+    def parse_industry(result):
+        """解析行业分类的输出"""
+        lines = result.split('\n')
+        if len(lines) >= 4:
+            try:
+                main_category_line = lines[0]
+                sub_category_line = lines[1]
+                relevance_line = lines[2]
+                explanation_line = lines[3]
             
-            # 提取各项信息
-            main_category = main_category_line.split('：')[1].strip()
-            sub_category = sub_category_line.split('：')[1].strip()
-            relevance_score = int(relevance_line.split('：')[1].strip())
-            explanation = explanation_line.split('：')[1].strip()
+                # 提取各项信息
+                main_category = main_category_line.split('：')[1].strip()
+                sub_category = sub_category_line.split('：')[1].strip()
+                relevance_score = int(relevance_line.split('：')[1].strip())
+                explanation = explanation_line.split('：')[1].strip()
             
-            # 验证分类是否有效
-            if main_category not in main_categories:
-                print(f"警告：返回的行业大类 '{main_category}' 不在有效列表中")
-                return {
-                    "main_category": "未知",
-                    "sub_category": "未知",
-                    "relevance_score": 0,
-                    "explanation": "无效的行业大类"
-                }
+                # 验证分类是否有效
+                if main_category not in main_categories:
+                    print(f"警告：返回的行业大类 '{main_category}' 不在有效列表中")
+                    return {
+                        "main_category": "未知",
+                        "sub_category": "未知",
+                        "relevance_score": 0,
+                        "explanation": "无效的行业大类"
+                    }
+            
+                sub_categories = get_subcategories(main_category)
+                if sub_category not in sub_categories:
+                    print(f"警告：返回的细分领域 '{sub_category}' 不在有效列表中")
+                    return {
+                        "main_category": main_category,
+                        "sub_category": "未知",
+                        "relevance_score": relevance_score,
+                        "explanation": "无效的细分领域"
+                    }
             
-            sub_categories = get_subcategories(main_category)
-            if sub_category not in sub_categories:
-                print(f"警告：返回的细分领域 '{sub_category}' 不在有效列表中")
                 return {
                     "main_category": main_category,
-                    "sub_category": "未知",
+                    "sub_category": sub_category,
                     "relevance_score": relevance_score,
-                    "explanation": "无效的细分领域"
+                    "explanation": explanation
                 }
-            
-            return {
-                "main_category": main_category,
-                "sub_category": sub_category,
-                "relevance_score": relevance_score,
-                "explanation": explanation
-            }
-        except (IndexError, ValueError) as e:
-            print(f"解析行业分类时出错: {e}")
+            except (IndexError, ValueError) as e:
+                print(f"解析行业分类时出错: {e}")
+                return {
+                    "main_category": "未知",
+                    "sub_category": "未知",
+                    "relevance_score": 0,
+                    "explanation": "解析错误"
+                }
+        else:
+            print("AI返回的格式不符合预期")
             return {
                 "main_category": "未知",
                 "sub_category": "未知",
                 "relevance_score": 0,
-                "explanation": "解析错误"
-            }
-    else:
-        print("AI返回的格式不符合预期")
-        return {
-            "main_category": "未知",
-            "sub_category": "未知",
-            "relevance_score": 0,
-            "explanation": "格式错误"
-        } 
\ No newline at end of file
+                "explanation": "格式错误"
+            } 
+
+    def is_valid_industry(industry_info):
+        return industry_info["explanation"] not in ("无效的行业大类", "无效的细分领域", "解析错误", "格式错误")
+
+    _, industry_info = request_task_completion("industry", messages, parse_industry, is_valid_industry)
+    return industry_info
+
+# 批量分级的说明部分：重要性标准与单条分级相同，行业大类列表在调用时填入（列表固定，不影响前缀缓存）
+BATCH_TRIAGE_INSTRUCTIONS = """
+下面给出多条新闻（每条以【编号N】开头，只包含标题和导语），请逐条完成重要性分级和行业分类。
+
+重要性分级标准：
+1级 - 国家政策：中央政府、国务院、财政部、央行等发布的重大政策、监管措施、规划、法规等
+2级 - 行业重大事件：行业政策调整、重大技术突破、行业格局变化、区域性政策对特定行业的影响等
+3级 - 公司重大事件：业绩预告、重大合同签订、重组并购、管理层重大变动、产品重大创新等
+4级 - 普通公司新闻：一般性公司发展动态、日常运营信息、小额合同、常规产品更新等
+5级 - 市场传闻：未经官方证实的消息、小道消息、模糊信息等
+
+行业大类列表：
+{categories}
+
+请只返回一个JSON数组，每条新闻对应一个对象，不要有任何其他文字：
+[{{"id": 编号, "level": 1-5之间的整数, "category": "分级对应的分类，如国家政策", "main_category": "行业大类", "sub_category": "细分领域", "relevance": 1-10之间的整数}}]
+"""
+
+def parse_batch_triage(result, count):
+    """
+    解析批量分级的输出，跳过格式错误、编号或分级超出范围的条目
+
+    参数:
+    result: 模型输出的文本
+    count: 本批新闻条数
+
+    返回:
+    {编号: 条目字典} 字典，编号从1开始
+    """
+    match = re.search(r"\[.*\]", result, re.S)
+    if not match:
+        print("批量分级的输出中没有JSON数组")
+        return {}
+    try:
+        items = json.loads(match.group(0))
+    except ValueError as e:
+        print(f"解析批量分级结果时出错: {e}")
+        return {}
+
+    parsed = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            index = int(item["id"])
+            level = int(item["level"])
+            category = str(item["category"]).strip()
+        except (KeyError, TypeError, ValueError):
+            continue
+        if 1 <= index <= count and 1 <= level <= 5 and category:
+            parsed[index] = item
+    return parsed
+
+def batch_industry_info(item):
+    """
+    从批量分级的条目中取出行业分类，行业大类或细分领域无效时返回None
+
+    返回:
+    与 categorize_news_by_industry 相同格式的字典或None
+    """
+    from industry_database import get_all_categories, get_subcategories
+
+    main_category = str(item.get("main_category", "")).strip()
+    sub_category = str(item.get("sub_category", "")).strip()
+    if main_category not in get_all_categories() or sub_category not in get_subcategories(main_category):
+        return None
+    try:
+        relevance_score = int(item.get("relevance", 0))
+    except (TypeError, ValueError):
+        relevance_score = 0
+    return {
+        "main_category": main_category,
+        "sub_category": sub_category,
+        "relevance_score": relevance_score,
+        "explanation": "批量分级"
+    }
+
+def triage_news_batch(news_list):
+    """
+    批量对新闻进行重要性分级和行业分类：将多条新闻（标题+导语）按token预算分批，
+    每批只调用一次大模型；某条新闻的结果缺失或无效时，该条改为逐条分级
+
+    参数:
+    news_list: 新闻记录列表，每条包含 title 和 content
+
+    返回:
+    与 news_list 一一对应的列表，每项为 {"importance": (级别, 分类), "industry_info": 行业分类字典}，
+    重要性不足（4级或5级）的新闻 industry_info 可能为None
+    """
+    from industry_database import get_all_categories
+
+    settings = load_prompt_config()["batch_triage"]
+    instructions = BATCH_TRIAGE_INSTRUCTIONS.format(categories=', '.join(get_all_categories()))
+    summaries = []
+    for news in news_list:
+        title = (news.get('title') or '').strip()
+        lead = compact_article(news.get('content', ''), settings["item_tokens"])
+        summaries.append(f"{title}\n{lead}" if title else lead)
+
+    triage = [None] * len(news_list)
+    for batch in pack_batches(summaries, settings["token_budget"], settings["max_items"]):
+        data = "\n\n".join(f"【编号{n}】{summaries[i]}" for n, i in enumerate(batch, start=1))
+        messages = build_messages(instructions, data)
+        try:
+            _, parsed = request_task_completion(
+                "batch_triage", messages,
+                lambda result, count=len(batch): parse_batch_triage(result, count),
+                lambda parsed, count=len(batch): len(parsed) == count
+            )
+        except Exception as e:
+            # 一批请求失败不影响其他批次，本批新闻改为逐条分级
+            print(f"批量分级请求失败，本批 {len(batch)} 条新闻改为逐条分级: {e}")
+            parsed = {}
+
+        for n, i in enumerate(batch, start=1):
+            item = parsed.get(n)
+            if item is None:
+                continue
+            importance = (int(item["level"]), str(item["category"]).strip())
+            triage[i] = {"importance": importance, "industry_info": batch_industry_info(item)}
+        print(f"批量分级完成：本批 {len(batch)} 条，解析成功 {len(parsed)} 条")
+
+    for i, news in enumerate(news_list):
+        if triage[i] is None:
+            inc("llm_batch_triage_items_total", result="fallback")
+            triage[i] = {"importance": filter_news_by_importance(news.get('content', '')), "industry_info": None}
+        else:
+            inc("llm_batch_triage_items_total", result="batched")
+        # 只有需要继续分析的新闻才需要行业分类
+        if triage[i]["industry_info"] is None and triage[i]["importance"][0] <= 3:
+            triage[i]["industry_info"] = categorize_news_by_industry(news.get('content', ''))
+    return triage
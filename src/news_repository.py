@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import streamlit as st
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from news_search import NewsSearcher
+
+# Streamlit每次交互都会重新执行脚本，以下查询函数通过st.cache_data缓存结果。
+# 所有函数都接收数据库文件的修改时间db_mtime作为缓存键的一部分：
+# 数据库被流水线更新后修改时间变化，缓存自动失效；否则每次交互只需读取缓存中的一页数据。
+
+def get_news_db_config():
+    """
+    读取项目配置中的新闻数据库路径和表名
+
+    返回:
+    (db_file, table_name) 元组，数据库路径为绝对路径
+    """
+    db_file = "news_database.db"
+    table_name = "news_articles"
+    try:
+        with open(os.path.join(PROJECT_ROOT, 'config.json'), 'r', encoding='utf-8') as f:
+            integration_config = json.load(f).get("integration", {})
+        db_file = integration_config.get("target_db_file", db_file)
+        table_name = integration_config.get("table_name", table_name)
+    except Exception as e:
+        print(f"加载配置文件出错，使用默认数据库配置: {e}")
+
+    # 数据库路径相对于项目根目录
+    if not os.path.isabs(db_file):
+        db_file = os.path.join(PROJECT_ROOT, db_file)
+    return db_file, table_name
+
+def get_db_mtime(db_file):
+    """
+    获取数据库的最后修改时间（包括WAL文件），用作缓存键
+
+    返回:
+    修改时间戳，数据库不存在时返回None
+    """
+    if not os.path.exists(db_file):
+        return None
+    mtime = os.path.getmtime(db_file)
+    wal_file = f"{db_file}-wal"
+    if os.path.exists(wal_file):
+        mtime = max(mtime, os.path.getmtime(wal_file))
+    return mtime
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def fetch_news_page(db_file, table_name, db_mtime, keyword, start_date, end_date, source, page, page_size):
+    """按关键词搜索新闻并返回指定页（db_mtime仅用作缓存键）"""
+    return NewsSearcher(db_file, table_name).search(
+        keyword=keyword,
+        start_date=start_date,
+        end_date=end_date,
+        source=source,
+        page=page,
+        page_size=page_size
+    )
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def fetch_news_list(db_file, table_name, db_mtime, start_date, end_date, source, cursor, page_size):
+    """按发布时间倒序列出从cursor开始的一页新闻（db_mtime仅用作缓存键）"""
+    return NewsSearcher(db_file, table_name).list_news(
+        start_date=start_date,
+        end_date=end_date,
+        source=source,
+        cursor=cursor,
+        page_size=page_size
+    )
+
+@st.cache_data(max_entries=50, show_spinner=False)
+def count_news(db_file, table_name, db_mtime, start_date, end_date, source):
+    """统计符合条件的新闻数量（db_mtime仅用作缓存键）"""
+    return NewsSearcher(db_file, table_name).count_news(
+        start_date=start_date,
+        end_date=end_date,
+        source=source
+    )
+
+@st.cache_data(max_entries=5, show_spinner=False)
+def fetch_news_sources(db_file, table_name, db_mtime):
+    """获取所有新闻来源（db_mtime仅用作缓存键）"""
+    return NewsSearcher(db_file, table_name).list_sources()
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def fetch_news_detail(db_file, table_name, db_mtime, news_id):
+    """获取单条新闻的完整内容（db_mtime仅用作缓存键）"""
+    return NewsSearcher(db_file, table_name).get_news(news_id)
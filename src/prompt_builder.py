@@ -0,0 +1,235 @@
+import os
+import re
+import sys
+import json
+import math
+from functools import lru_cache
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from metrics import inc
+
+# 视为缺失、不写入提示词的字段值
+UNKNOWN_VALUES = {"", "未知", "None", "nan", "NaN", "-", "--"}
+
+# 摘要时优先保留的句子特征：数字、百分比、金额以及政策/业绩相关词语
+KEY_SENTENCE_PATTERN = re.compile(r"\d+(?:\.\d+)?|%|亿|万|政策|发布|决定|公告|业绩|利润|营收|合同|增长|下降|同比|突破|并购|重组")
+
+@lru_cache(maxsize=1)
+def load_prompt_config():
+    """
+    读取项目配置中的提示词设置（config.json 的 prompt 部分），进程内只读取一次
+
+    返回:
+    字典，article_token_budget 为各任务中新闻正文的token预算，batch_triage 为批量分级的设置
+    """
+    prompt_config = {
+        "article_token_budget": {
+            "importance": 600,
+            "industry": 600,
+            "stock_code": 1000,
+            "stock_code_fallback": 150,
+            "investment_advice": 1500
+        },
+        "batch_triage": {
+            "min_items": 10,
+            "max_items": 20,
+            "token_budget": 3000,
+            "item_tokens": 120
+        }
+    }
+    try:
+        with open(os.path.join(PROJECT_ROOT, 'config.json'), 'r', encoding='utf-8') as f:
+            configured = json.load(f).get("prompt", {})
+        prompt_config["article_token_budget"].update(configured.get("article_token_budget", {}))
+        prompt_config["batch_triage"].update(configured.get("batch_triage", {}))
+    except Exception as e:
+        print(f"加载提示词配置出错，使用默认配置: {e}")
+    return prompt_config
+
+def article_budget(task):
+    """获取任务的新闻正文token预算"""
+    return load_prompt_config()["article_token_budget"].get(task, 1000)
+
+def estimate_tokens(text):
+    """
+    估算文本的token数（中文字符按1个token计，其他字符按4个字符1个token计，偏保守）
+
+    参数:
+    text: 文本
+
+    返回:
+    估算的token数
+    """
+    cjk = len(re.findall(r"[一-鿿　-〿＀-￯]", text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def split_sentences(text):
+    """按中文句末标点和换行拆分句子，保留句末标点"""
+    return [sentence.strip() for sentence in re.findall(r"[^。！？!?；;\n]+[。！？!?；;]?", text) if sentence.strip()]
+
+def compact_article(text, max_tokens):
+    """
+    将新闻正文压缩到token预算内
+
+    先合并空白并去掉重复的句子；仍超出预算时保留导语（第一句），
+    其余句子按是否包含数字、政策/业绩等关键信息打分，按原文顺序保留得分高的句子，
+    被省略的位置用"……"标出
+
+    参数:
+    text: 新闻正文
+    max_tokens: token预算
+
+    返回:
+    压缩后的正文
+    """
+    text = re.sub(r"[ \t\r\f\v]+", " ", str(text or "")).strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = []
+    seen = set()
+    for sentence in split_sentences(text):
+        if sentence not in seen:
+            seen.add(sentence)
+            sentences.append(sentence)
+    deduplicated = "".join(sentences)
+    if estimate_tokens(deduplicated) <= max_tokens or not sentences:
+        return deduplicated
+
+    # 导语一定保留，超长时直接截断
+    lead = sentences[0]
+    if estimate_tokens(lead) >= max_tokens:
+        return lead[:max_tokens] + "……"
+
+    # 其余句子按关键信息数量排序，分数相同时靠前的句子优先
+    ranked = sorted(
+        range(1, len(sentences)),
+        key=lambda i: (-len(KEY_SENTENCE_PATTERN.findall(sentences[i])), i)
+    )
+    used = estimate_tokens(lead)
+    kept = {0}
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if used + cost <= max_tokens:
+            kept.add(i)
+            used += cost
+
+    parts = []
+    for i, sentence in enumerate(sentences):
+        if i in kept:
+            parts.append(sentence)
+        elif parts and parts[-1] != "……":
+            parts.append("……")
+    return "".join(parts)
+
+def pack_batches(items, token_budget, max_items):
+    """
+    按token预算将条目依次装入批次，每批的估算token数不超过预算、条数不超过上限
+    （单个条目超出预算时单独成批）
+
+    参数:
+    items: 文本列表
+    token_budget: 每批的token预算
+    max_items: 每批的最大条数
+
+    返回:
+    批次列表，每个批次为条目在 items 中的下标列表
+    """
+    batches = []
+    current = []
+    used = 0
+    for i, item in enumerate(items):
+        cost = estimate_tokens(item) + 1
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current = []
+            used = 0
+        current.append(i)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def is_known(value):
+    """字段值是否有意义（不是空值、"未知"或NaN）"""
+    if value is None:
+        return False
+    if isinstance(value, float) and math.isnan(value):
+        return False
+    return str(value).strip() not in UNKNOWN_VALUES
+
+def format_section(title, fields):
+    """
+    格式化一组字段，省略未知的字段；全部未知时返回空字符串
+
+    参数:
+    title: 分组标题
+    fields: [(名称, 值)] 或 [(名称, 值, 单位)] 列表
+
+    返回:
+    "标题：\\n名称：值单位\\n..." 形式的文本
+    """
+    lines = []
+    for field in fields:
+        label, value = field[0], field[1]
+        unit = field[2] if len(field) > 2 else ""
+        if is_known(value):
+            lines.append(f"{label}：{value}{unit}")
+    if not lines:
+        return ""
+    return f"{title}：\n" + "\n".join(lines)
+
+def build_messages(instructions, data):
+    """
+    组装对话消息：固定的任务说明在前、本次调用的数据在后
+
+    说明部分在每次调用中完全相同，服务端可以复用前缀缓存；
+    推理模型不建议使用system消息，因此两部分放在同一条user消息中
+
+    参数:
+    instructions: 固定的任务说明（不包含任何本次调用的数据）
+    data: 本次调用的数据（新闻正文、股票数据等）
+
+    返回:
+    messages列表
+    """
+    return [{"role": "user", "content": f"{instructions.strip()}\n\n{data.strip()}"}]
+
+def record_usage(task, messages, response):
+    """
+    记录一次大模型调用的token用量（按任务累计到指标中）
+
+    优先使用接口返回的 usage，没有时按提示词和回复估算
+
+    参数:
+    task: 任务名称，如 importance、investment_advice
+    messages: 发送的消息列表
+    response: 接口返回的对象
+
+    返回:
+    字典，包含 prompt_tokens、completion_tokens、cached_tokens
+    """
+    usage = getattr(response, "usage", None)
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        prompt_tokens = usage.prompt_tokens
+        completion_tokens = usage.completion_tokens or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    else:
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        try:
+            completion_tokens = estimate_tokens(response.choices[0].message.content or "")
+        except (AttributeError, IndexError):
+            completion_tokens = 0
+        cached_tokens = 0
+
+    inc("llm_requests_total", task=task)
+    inc("llm_tokens_total", prompt_tokens, task=task, kind="prompt")
+    inc("llm_tokens_total", completion_tokens, task=task, kind="completion")
+    if cached_tokens:
+        inc("llm_tokens_total", cached_tokens, task=task, kind="cached")
+    print(f"[{task}] token用量: 提示词 {prompt_tokens}（缓存命中 {cached_tokens}），回复 {completion_tokens}")
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "cached_tokens": cached_tokens}
@@ -0,0 +1,102 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from visualization import visualize_stock_data
+from report_store import ensure_report_manifest
+
+class ReportRenderError(Exception):
+    """有报告渲染失败（报告没有生成）"""
+
+def render_report(stock_data, news_text, analysis_result, output_dir):
+    """
+    在渲染进程中生成一份完整的报告（HTML和财务指标图表）
+
+    返回:
+    HTML报告文件路径
+    """
+    return visualize_stock_data(stock_data, news_text, analysis_result, output_dir)
+
+class ReportRenderQueue:
+    def __init__(self, output_dir='../output', max_workers=None):
+        """
+        初始化报告渲染队列
+
+        报告在进程池中渲染，主流程提交任务后立即返回，继续进行新闻分析和数据获取；
+        多份报告可以在不同进程中并行渲染
+
+        参数:
+        output_dir: 报告输出目录
+        max_workers: 渲染进程数，默认为CPU核数与4中的较小值
+        """
+        self.output_dir = output_dir
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 4)
+        self.executor = None
+        self.pending = []
+        # 最近一次 wait() 中渲染失败的任务：[(附加信息, 异常)]
+        self.failures = []
+
+    def submit(self, stock_data, news_text, analysis_result, **metadata):
+        """
+        提交一份报告的渲染任务
+
+        参数:
+        stock_data: 股票数据
+        news_text: 新闻内容
+        analysis_result: 投资分析结果
+        metadata: 随任务保存的附加信息（如news_index、stock_code），在wait()的结果中原样返回
+        """
+        if self.executor is None:
+            # 在主进程中准备好报告清单，避免多个渲染进程同时初始化
+            os.makedirs(self.output_dir, exist_ok=True)
+            ensure_report_manifest(self.output_dir)
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            future = self.executor.submit(render_report, stock_data, news_text, analysis_result, self.output_dir)
+        except BrokenProcessPool:
+            # 渲染进程异常退出后进程池不可再用（长期复用的队列会遇到），重新创建
+            print("报告渲染进程池已损坏，重新创建")
+            self.executor.shutdown(wait=False)
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self.executor.submit(render_report, stock_data, news_text, analysis_result, self.output_dir)
+        self.pending.append((future, metadata))
+        return future
+
+    def wait(self):
+        """
+        等待所有已提交的报告渲染完成
+
+        返回:
+        渲染成功的报告列表，每项为提交时的附加信息加上 report_file；
+        渲染失败的任务记录在 failures 中
+        """
+        results = []
+        self.failures = []
+        for future, metadata in self.pending:
+            try:
+                report_file = future.result()
+            except Exception as e:
+                print(f"渲染报告出错({metadata.get('stock_code', '')}): {e}")
+                self.failures.append((metadata, e))
+                continue
+            results.append(dict(metadata, report_file=report_file))
+
+        self.pending = []
+        return results
+
+    def shutdown(self):
+        """关闭渲染进程池"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
@@ -0,0 +1,527 @@
+import os
+import re
+import json
+import gzip
+import uuid
+import time
+import shutil
+import hashlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:
+    # Windows没有fcntl，使用msvcrt的文件锁
+    fcntl = None
+    import msvcrt
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 报告清单文件（JSON Lines，每生成一份报告追加一行），索引页从清单生成，不再扫描output目录
+MANIFEST_FILENAME = "reports_manifest.jsonl"
+
+# 报告按 reports/YYYYMMDD/股票代码/ 分片存放，图表按内容哈希存放在 charts/ 中
+REPORTS_DIRNAME = "reports"
+CHARTS_DIRNAME = "charts"
+
+# 每天的报告记录同时追加到 reports/YYYYMMDD/ 下的按日清单，更新某一天的索引页时只读取当天的清单
+DAY_MANIFEST_FILENAME = "manifest.jsonl"
+
+# 索引首页使用的按日汇总（每天的报告数量和最新报告时间），随日期索引页增量更新
+INDEX_SUMMARY_FILENAME = "index_summary.json"
+
+# 报告目录的进程间锁：追加清单、重写清单（清理）和更新索引时持有
+LOCK_FILENAME = ".reports.lock"
+
+def load_report_storage_config():
+    """
+    读取项目配置中的报告存储设置（config.json 的 report_storage 部分）
+
+    返回:
+    字典，包含 compress_after_days、max_age_days、max_total_mb，未配置的项为None（不启用）
+    """
+    storage_config = {
+        "compress_after_days": None,
+        "max_age_days": None,
+        "max_total_mb": None
+    }
+    try:
+        with open(os.path.join(PROJECT_ROOT, 'config.json'), 'r', encoding='utf-8') as f:
+            storage_config.update(json.load(f).get("report_storage", {}))
+    except Exception as e:
+        print(f"加载报告存储配置出错，不启用压缩和清理: {e}")
+    return storage_config
+
+def _to_url(path):
+    """将相对路径转换为HTML中使用的URL路径"""
+    return path.replace(os.sep, '/')
+
+def _lock_file(f, blocking):
+    """对已打开的锁文件加排他锁，非阻塞模式下锁被占用时返回False"""
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+    f.seek(0)
+    while True:
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+            time.sleep(0.05)
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def report_lock(output_dir, blocking=True):
+    """
+    报告目录的进程间排他锁（工作进程、渲染进程和监视器之间共用）
+
+    追加清单、清理时重写清单以及更新索引页都在锁内进行，避免重写清单时丢失其他进程追加的记录；
+    锁不可重入，持有锁时只能调用不加锁的内部函数
+
+    参数:
+    output_dir: 报告输出目录
+    blocking: 为False时锁被占用立即返回
+
+    返回:
+    上下文管理器，as 得到是否获得了锁
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, LOCK_FILENAME), 'a+b') as f:
+        acquired = _lock_file(f, blocking)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _unlock_file(f)
+
+def record_date_key(record):
+    """报告记录所属的日期（YYYY-MM-DD），没有生成时间的旧记录归入“未知日期”"""
+    return record.get('created_at', '')[:10] or "未知日期"
+
+def report_date_key(report_file):
+    """
+    根据报告文件路径获取其所属日期（reports/YYYYMMDD/... 或旧版本文件名中的日期）
+
+    返回:
+    YYYY-MM-DD，无法识别时为None
+    """
+    match = (re.search(r'(?:^|[\\/])' + REPORTS_DIRNAME + r'[\\/](\d{8})[\\/]', report_file)
+             or re.search(r'_(\d{8})_\d{6}(?:_[0-9a-f]+)?\.html', os.path.basename(report_file)))
+    if not match:
+        return None
+    date_part = match.group(1)
+    return f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]}"
+
+def _day_manifest_file(output_dir, date_key):
+    """某一天的按日清单路径"""
+    day_dir = re.sub(r'\D', '', date_key) or "unknown"
+    return os.path.join(output_dir, REPORTS_DIRNAME, day_dir, DAY_MANIFEST_FILENAME)
+
+def _append_lines(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def _append_records(output_dir, records):
+    """向总清单和各自的按日清单追加记录（不加锁，调用方需持有 report_lock）"""
+    _append_lines(ensure_report_manifest(output_dir), records)
+    by_date = {}
+    for record in records:
+        by_date.setdefault(record_date_key(record), []).append(record)
+    for date_key, date_records in by_date.items():
+        _append_lines(_day_manifest_file(output_dir, date_key), date_records)
+
+def append_report_manifest(output_dir, record):
+    """
+    向报告清单追加一条记录
+
+    参数:
+    output_dir: 报告输出目录
+    record: 报告记录，包含 stock_code、stock_name、report_file（相对output_dir的路径）和 created_at；
+            同一report_file的后续记录会覆盖之前的记录（用于标记压缩或删除）
+    """
+    with report_lock(output_dir):
+        _append_records(output_dir, [record])
+
+def _read_manifest_file(manifest_file):
+    """读取清单文件，同一报告文件只保留最后一条记录，不包含已删除的报告，按生成时间倒序排列"""
+    records = {}
+    if not os.path.exists(manifest_file):
+        return []
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 跳过写入中断产生的不完整行
+                continue
+            if record.get('report_file'):
+                records[record['report_file']] = record
+
+    live_records = [record for record in records.values() if not record.get('deleted')]
+    return sorted(live_records, key=lambda x: x.get('created_at', ''), reverse=True)
+
+def load_report_manifest(output_dir):
+    """
+    读取报告清单
+
+    返回:
+    报告记录列表，同一报告文件只保留最后一条记录，不包含已删除的报告，按生成时间倒序排列
+    """
+    return _read_manifest_file(ensure_report_manifest(output_dir))
+
+def load_day_manifest(output_dir, date_key):
+    """
+    读取某一天的报告清单（只读取当天的按日清单，与总清单的报告数量无关）
+
+    返回:
+    当天的报告记录列表，格式与 load_report_manifest 相同
+    """
+    return _read_manifest_file(_day_manifest_file(output_dir, date_key))
+
+def _write_manifest(manifest_file, records):
+    """重写整个清单（先写入临时文件再替换，避免中断时留下不完整的清单）"""
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_file, manifest_file)
+
+def _write_day_manifest(output_dir, date_key, records):
+    """重写某一天的按日清单，没有报告时删除"""
+    manifest_file = _day_manifest_file(output_dir, date_key)
+    if records:
+        _write_manifest(manifest_file, sorted(records, key=lambda x: x.get('created_at', '')))
+    elif os.path.exists(manifest_file):
+        os.remove(manifest_file)
+
+def rebuild_day_manifests(output_dir):
+    """
+    根据总清单重新生成全部按日清单（升级前生成的报告没有按日清单，首次生成索引时调用一次；
+    调用方需持有 report_lock）
+
+    返回:
+    所有有报告的日期集合
+    """
+    records_by_date = {}
+    for record in load_report_manifest(output_dir):
+        records_by_date.setdefault(record_date_key(record), []).append(record)
+    for date_key, records in records_by_date.items():
+        _write_day_manifest(output_dir, date_key, records)
+    return set(records_by_date)
+
+def load_index_summary(output_dir):
+    """
+    读取索引首页的按日汇总
+
+    返回:
+    {日期: {"count": 报告数量, "latest": 最新报告时间}}，尚未生成时为None
+    """
+    summary_file = os.path.join(output_dir, INDEX_SUMMARY_FILENAME)
+    if not os.path.exists(summary_file):
+        return None
+    try:
+        with open(summary_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取索引汇总出错，将重新生成: {e}")
+        return None
+
+def save_index_summary(output_dir, summary):
+    """保存索引首页的按日汇总（先写入临时文件再替换）"""
+    summary_file = os.path.join(output_dir, INDEX_SUMMARY_FILENAME)
+    tmp_file = f"{summary_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False)
+    os.replace(tmp_file, summary_file)
+
+def ensure_report_manifest(output_dir):
+    """
+    确保报告清单存在，不存在时扫描output目录中已有的报告生成一次
+
+    返回:
+    清单文件路径
+    """
+    manifest_file = os.path.join(output_dir, MANIFEST_FILENAME)
+    if os.path.exists(manifest_file):
+        return manifest_file
+
+    os.makedirs(output_dir, exist_ok=True)
+    records = []
+    for filename in sorted(os.listdir(output_dir)):
+        # 旧版本报告直接存放在output目录中，文件名格式: stock_code_YYYYMMDD_HHMMSS.html
+        match = re.match(r'^(.+?)_(\d{8})_(\d{6})\.html$', filename)
+        if not match:
+            continue
+        stock_code, date_part, time_part = match.groups()
+        created_at = (f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} "
+                      f"{time_part[:2]}:{time_part[2:4]}:{time_part[4:]}")
+
+        # 从报告标题中提取股票名称
+        stock_name = f"{stock_code}股票"
+        try:
+            with open(os.path.join(output_dir, filename), 'r', encoding='utf-8') as f:
+                name_match = re.search(r'<h2>([^(]+)', f.read())
+                if name_match:
+                    stock_name = name_match.group(1).strip()
+        except Exception:
+            pass
+
+        record = {
+            'stock_code': stock_code,
+            'stock_name': stock_name,
+            'report_file': filename,
+            'created_at': created_at
+        }
+        chart_file = f"financial_indicators_{date_part}_{time_part}.png"
+        if os.path.exists(os.path.join(output_dir, chart_file)):
+            record['chart_file'] = chart_file
+        records.append(record)
+
+    _write_manifest(manifest_file, records)
+
+    print(f"已根据output目录中的 {len(records)} 个现有报告生成报告清单: {manifest_file}")
+    return manifest_file
+
+class ReportStore:
+    def __init__(self, output_dir='../output', compress_after_days=None, max_age_days=None, max_total_mb=None):
+        """
+        初始化报告存储
+
+        报告按日期和股票代码分片存放（reports/YYYYMMDD/股票代码/），文件名包含时间戳和随机后缀，
+        同一秒生成的多份报告不会互相覆盖；内容相同的图表按哈希只保存一份（charts/）
+
+        参数:
+        output_dir: 报告输出目录
+        compress_after_days: 超过该天数的HTML报告压缩为.html.gz（作为归档保留，浏览器不能直接打开本地的.gz文件，
+                             压缩后的报告不再出现在索引页中），为None时不压缩
+        max_age_days: 超过该天数的报告被删除，为None时不按时间清理
+        max_total_mb: 报告和图表的总大小上限（MB），超出时从最旧的报告开始删除，为None时不限制
+        """
+        self.output_dir = output_dir
+        self.compress_after_days = compress_after_days
+        self.max_age_days = max_age_days
+        self.max_total_mb = max_total_mb
+
+    def new_report_path(self, stock_code, created=None):
+        """
+        为新报告分配文件路径
+
+        返回:
+        报告HTML文件的绝对路径（所在目录已创建）
+        """
+        created = created or datetime.now()
+        report_dir = os.path.join(self.output_dir, REPORTS_DIRNAME, created.strftime("%Y%m%d"), stock_code)
+        os.makedirs(report_dir, exist_ok=True)
+        filename = f"{stock_code}_{created.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.html"
+        return os.path.abspath(os.path.join(report_dir, filename))
+
+    def chart_path(self, png_data):
+        """
+        获取图表按内容哈希存放的路径（不写入文件）
+
+        返回:
+        图表文件的绝对路径
+        """
+        digest = hashlib.sha1(png_data).hexdigest()
+        return os.path.abspath(os.path.join(self.output_dir, CHARTS_DIRNAME, digest[:2], f"{digest}.png"))
+
+    def save_chart(self, png_data):
+        """
+        按内容哈希保存图表，内容相同的图表只保存一份
+
+        清理报告时会删除没有被清单引用的图表，新报告的图表应通过 commit_report 与清单记录一起保存
+
+        参数:
+        png_data: PNG图片的二进制内容
+
+        返回:
+        图表文件的绝对路径
+        """
+        chart_file = self.chart_path(png_data)
+        if not os.path.exists(chart_file):
+            os.makedirs(os.path.dirname(chart_file), exist_ok=True)
+            tmp_file = f"{chart_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(png_data)
+            os.replace(tmp_file, chart_file)
+        return chart_file
+
+    def commit_report(self, record, png_data=None):
+        """
+        保存报告的图表并追加清单记录（在同一个 report_lock 内完成，
+        清理不会在图表写入后、记录追加前把图表当作无引用的文件删除）
+
+        参数:
+        record: 报告记录，有图表时应包含 chart_file（即 chart_path 的相对路径）
+        png_data: 图表的PNG内容，没有图表时为None
+        """
+        with report_lock(self.output_dir):
+            if png_data is not None:
+                self.save_chart(png_data)
+            _append_records(self.output_dir, [record])
+
+    def relative_path(self, path):
+        """获取文件相对于输出目录的路径（用于清单记录和索引页链接）"""
+        return _to_url(os.path.relpath(path, self.output_dir))
+
+    def _record_size(self, record):
+        """获取报告文件占用的字节数"""
+        path = os.path.join(self.output_dir, self.report_link(record))
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    @staticmethod
+    def report_link(record):
+        """获取报告在索引页中的链接（压缩后的报告链接到.gz文件）"""
+        return record['report_file'] + (".gz" if record.get('compressed') else "")
+
+    def _delete_report(self, record):
+        """删除报告文件并在清单中标记"""
+        path = os.path.join(self.output_dir, self.report_link(record))
+        if os.path.exists(path):
+            os.remove(path)
+        # 旧版本报告的图表与报告一一对应，直接删除；charts/中的图表可能被其他报告共享，统一清理
+        chart_file = record.get('chart_file')
+        if chart_file and not chart_file.startswith(f"{CHARTS_DIRNAME}/"):
+            chart_path = os.path.join(self.output_dir, chart_file)
+            if os.path.exists(chart_path):
+                os.remove(chart_path)
+        _append_records(self.output_dir, [dict(record, deleted=True)])
+
+    def _compress_report(self, record):
+        """将HTML报告压缩为.html.gz并在清单中标记"""
+        path = os.path.join(self.output_dir, record['report_file'])
+        if not os.path.exists(path):
+            return False
+        with open(path, 'rb') as src, gzip.open(f"{path}.gz", 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        _append_records(self.output_dir, [dict(record, compressed=True)])
+        return True
+
+    def _remove_unreferenced_charts(self, records):
+        """删除已经没有报告引用的图表"""
+        referenced = {record['chart_file'] for record in records if record.get('chart_file')}
+        removed = 0
+        charts_root = os.path.join(self.output_dir, CHARTS_DIRNAME)
+        for dirpath, _, filenames in os.walk(charts_root):
+            for filename in filenames:
+                chart_file = self.relative_path(os.path.join(dirpath, filename))
+                if chart_file not in referenced:
+                    os.remove(os.path.join(dirpath, filename))
+                    removed += 1
+        return removed
+
+    def apply_retention(self, now=None, blocking=True):
+        """
+        按配置压缩旧报告并清理过期或超出容量的报告
+
+        需要检查全部报告的大小并重写清单，应由单个进程定期执行（如监视器每天一次），
+        不要在每次分析后调用；执行期间持有 report_lock，其他进程追加清单时等待
+
+        参数:
+        now: 当前时间，默认为 datetime.now()
+        blocking: 为False时如果其他进程正持有锁则跳过本次清理
+
+        返回:
+        受影响的日期集合（YYYY-MM-DD），这些日期的索引页需要重新生成
+        """
+        if self.compress_after_days is None and self.max_age_days is None and self.max_total_mb is None:
+            return set()
+
+        with report_lock(self.output_dir, blocking=blocking) as acquired:
+            if not acquired:
+                print("其他进程正在访问报告目录，跳过本次清理")
+                return set()
+            return self._apply_retention(now or datetime.now())
+
+    def _apply_retention(self, now):
+        """执行清理（调用方需持有 report_lock）"""
+        records = load_report_manifest(self.output_dir)
+        affected_dates = set()
+        compressed = 0
+        deleted = []
+
+        # 按时间清理
+        if self.max_age_days is not None:
+            cutoff = (now - timedelta(days=self.max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+            deleted.extend(record for record in records if record.get('created_at', '') < cutoff)
+
+        # 按容量清理，从最旧的报告开始删除
+        if self.max_total_mb is not None:
+            deleted_files = {record['report_file'] for record in deleted}
+            remaining = [record for record in records if record['report_file'] not in deleted_files]
+            total_size = sum(self._record_size(record) for record in remaining)
+            # 图表可能被多份报告共享：记录每个图表被哪些报告引用，最后一份引用它的报告被删除时才释放图表的空间
+            chart_sizes = {}
+            chart_refs = {}
+            for record in remaining:
+                chart_file = record.get('chart_file')
+                if not chart_file:
+                    continue
+                if chart_file not in chart_sizes:
+                    chart_path = os.path.join(self.output_dir, chart_file)
+                    chart_sizes[chart_file] = os.path.getsize(chart_path) if os.path.exists(chart_path) else 0
+                chart_refs.setdefault(chart_file, set()).add(record['report_file'])
+            total_size += sum(chart_sizes.values())
+
+            limit = self.max_total_mb * 1024 * 1024
+            for record in reversed(remaining):
+                if total_size <= limit:
+                    break
+                total_size -= self._record_size(record)
+                chart_file = record.get('chart_file')
+                if chart_file:
+                    chart_refs[chart_file].discard(record['report_file'])
+                    if not chart_refs[chart_file]:
+                        total_size -= chart_sizes[chart_file]
+                deleted.append(record)
+
+        for record in deleted:
+            self._delete_report(record)
+            affected_dates.add(record_date_key(record))
+
+        # 压缩旧报告
+        if self.compress_after_days is not None:
+            cutoff = (now - timedelta(days=self.compress_after_days)).strftime("%Y-%m-%d %H:%M:%S")
+            deleted_files = {record['report_file'] for record in deleted}
+            for record in records:
+                if record['report_file'] in deleted_files or record.get('compressed') or record.get('created_at', '') >= cutoff:
+                    continue
+                if self._compress_report(record):
+                    compressed += 1
+                    affected_dates.add(record_date_key(record))
+
+        if deleted:
+            live_records = load_report_manifest(self.output_dir)
+            removed_charts = self._remove_unreferenced_charts(live_records)
+            # 清理后重写清单，去掉已删除和被覆盖的记录
+            _write_manifest(
+                os.path.join(self.output_dir, MANIFEST_FILENAME),
+                sorted(live_records, key=lambda x: x.get('created_at', ''))
+            )
+            for date_key in affected_dates:
+                _write_day_manifest(self.output_dir, date_key, load_day_manifest(self.output_dir, date_key))
+            print(f"已删除 {len(deleted)} 份过期报告和 {removed_charts} 个无引用的图表")
+        if compressed:
+            print(f"已压缩 {compressed} 份旧报告")
+
+        return affected_dates
@@ -1,122 +1,200 @@
 import os
 import sys
+import time
+from types import SimpleNamespace
 
 # 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# 从config导入常量
-from config.config import ARK_API_KEY
-from volcenginesdkarkruntime import Ark
+from config.config import TASK_MODELS
+from metrics import timer, observe
+from http_clients import get_ark_client
+from prompt_builder import build_messages, compact_article, article_budget, format_section, record_usage
 
-# 配置 DeepSeek
-client = Ark(
-    api_key=ARK_API_KEY,
-    timeout=1800,
-)
+# 配置 DeepSeek：使用进程内共享的Ark客户端，第一次调用大模型时创建
+client = None
 
-def analyze_stock(news_text, stock_data):
+def get_client():
+    """获取Ark客户端（与其他分析模块共用连接池）"""
+    global client
+    if client is None:
+        client = get_ark_client()
+    return client
+
+# 投资建议的固定说明部分（不含新闻和股票数据），每次调用完全相同，便于服务端复用前缀缓存
+ADVICE_INSTRUCTIONS = """
+请基于下面给出的新闻和股票数据分析这条新闻对该股票的影响，重点是判断该新闻是否会对股票产生积极、消极或中性影响，并给出具体的投资建议。
+新闻内容是分析的核心和重点，股票基本信息、价格、财务指标和技术分析数据作为参考（未提供的数据表示暂时无法获取）。
+
+请首先深入分析这条新闻：
+- 这条新闻对公司有何具体影响？
+- 这是利好、利空还是中性消息？
+- 新闻传递的信息会如何影响公司的短期表现和长期发展？
+- 市场可能会如何反应？是否已经反应在股价上？
+- 这条新闻是否改变了公司的基本面或未来发展前景？
+
+请给出详细分析和明确的投资建议，必须按照以下结构呈现：
+
+### 一、新闻分析（占分析内容的50%左右）
+[深入分析这条新闻对公司的具体影响，这是最核心的部分]
+- 新闻传递的核心信息是什么？
+- 对公司业务、收入和利润的可能影响
+- 对行业竞争格局的影响
+- 对公司市场地位的影响
+- 新闻可能导致的市场反应
+
+### 二、基本面简要分析（占分析内容的20%左右）
+[简要分析公司当前基本面状况，仅作为辅助参考]
+- 公司当前估值是否合理
+- 财务状况是否健康
+- 盈利能力如何
+
+### 三、技术面分析（占分析内容的15%左右）
+[分析股票当前技术形态和价格走势]
+- 价格所处位置（支撑位/压力位附近？突破还是回调？）
+- 价格趋势研判（上升趋势？下降趋势？震荡区间？）
+- 短期可能的价格目标位
+- 较强的支撑位和压力位分析
+
+### 四、综合判断与投资建议（占分析内容的15%左右）
+[结合新闻、基本面和技术面，给出明确的投资建议]
+1. 整体判断：这条新闻是否足以影响投资决策
+2. 投资决策：必须明确给出以下三种结论之一
+   - "建议买入"：如果综合判断积极
+   - "不建议买入"：如果综合判断负面
+   - "建议观望"：如果影响不明确或需要进一步观察
+3. 如果建议买入：
+   - 建议配置的仓位比例（占总投资的百分比，如5%、10%等）
+   - 预期持有时间（短期、中期或长期）
+   - 建议的买入价位区间
+   - 止损位建议
+4. 投资理由（优势）和风险提示
+
+注意：重点分析新闻内容对该股票的直接影响，这是决策的核心依据。基本面和技术面数据作为辅助参考，需要综合考虑。
+"""
+
+def build_stock_data_text(stock_data):
     """
-    使用DeepSeek分析股票数据和新闻，给出投资建议
-    提供具体的买入建议和仓位控制
-    主要关注新闻对股票的影响
+    将股票数据格式化为提示词中的数据部分，省略未知的字段和全部未知的分组
     """
-    # 提取技术分析数据
+    basic = stock_data.get('basic', {})
+    price = stock_data.get('price', {})
+    financial = stock_data.get('financial_indicator', {})
+    balance = stock_data.get('balance_sheet', {})
     technical_data = stock_data.get('technical_analysis', {})
     support_levels = technical_data.get('support_resistance', {}).get('支撑位', [])
     resistance_levels = technical_data.get('support_resistance', {}).get('压力位', [])
-    
-    # 将支撑位和压力位格式化为字符串
-    support_str = "、".join([str(level) for level in support_levels]) if support_levels else "未识别到明确支撑位"
-    resistance_str = "、".join([str(level) for level in resistance_levels]) if resistance_levels else "未识别到明确压力位"
-    
-    prompt = f"""
-    请基于以下信息分析这条新闻对该股票的影响，重点是判断该新闻是否会对股票产生积极、消极或中性影响，并给出具体的投资建议：
-    
-    1. 【新闻内容】(这是分析的核心和重点)：
-    {news_text}
-    
-    请首先深入分析这条新闻：
-    - 这条新闻对公司有何具体影响？
-    - 这是利好、利空还是中性消息？
-    - 新闻传递的信息会如何影响公司的短期表现和长期发展？
-    - 市场可能会如何反应？是否已经反应在股价上？
-    - 这条新闻是否改变了公司的基本面或未来发展前景？
-    
-    2. 股票基本信息（作为参考）：
-    代码：{stock_data.get('basic', {}).get('ts_code', '未知')}
-    名称：{stock_data.get('basic', {}).get('name', '未知')}
-    行业：{stock_data.get('basic', {}).get('industry', '未知')}
-    上市日期：{stock_data.get('basic', {}).get('list_date', '未知')}
-    
-    3. 当前价格信息（作为参考）：
-    最新收盘价：{stock_data.get('price', {}).get('close', '未知')}
-    最新交易日涨跌幅：{stock_data.get('price', {}).get('pct_chg', '未知')}%
-    市盈率(PE)：{stock_data.get('price', {}).get('pe', '未知')}
-    市净率(PB)：{stock_data.get('price', {}).get('pb', '未知')}
-    
-    4. 关键财务指标（作为参考）：
-    每股收益(EPS)：{stock_data.get('financial_indicator', {}).get('eps', '未知')}
-    净资产收益率(ROE)：{stock_data.get('financial_indicator', {}).get('roe', '未知')}
-    每股净资产：{stock_data.get('financial_indicator', {}).get('bps', '未知')}
-    毛利率：{stock_data.get('financial_indicator', {}).get('gross_profit_margin', '未知')}%
-    净利率：{stock_data.get('financial_indicator', {}).get('net_profit_margin', '未知')}%
-    资产负债率：{stock_data.get('financial_indicator', {}).get('debt_to_assets', '未知')}%
-    
-    5. 资产负债情况（简要参考）：
-    总资产：{stock_data.get('balance_sheet', {}).get('total_assets', '未知')}
-    总负债：{stock_data.get('balance_sheet', {}).get('total_liab', '未知')}
-    
-    6. 技术分析数据（作为参考）：
-    主要支撑位：{support_str}
-    主要压力位：{resistance_str}
-    当前价格：{stock_data.get('price', {}).get('close', '未知')}
-    
-    请给出详细分析和明确的投资建议，必须按照以下结构呈现：
-    
-    ### 一、新闻分析（占分析内容的50%左右）
-    [深入分析这条新闻对公司的具体影响，这是最核心的部分]
-    - 新闻传递的核心信息是什么？
-    - 对公司业务、收入和利润的可能影响
-    - 对行业竞争格局的影响
-    - 对公司市场地位的影响
-    - 新闻可能导致的市场反应
-    
-    ### 二、基本面简要分析（占分析内容的20%左右）
-    [简要分析公司当前基本面状况，仅作为辅助参考]
-    - 公司当前估值是否合理
-    - 财务状况是否健康
-    - 盈利能力如何
-    
-    ### 三、技术面分析（占分析内容的15%左右）
-    [分析股票当前技术形态和价格走势]
-    - 价格所处位置（支撑位/压力位附近？突破还是回调？）
-    - 价格趋势研判（上升趋势？下降趋势？震荡区间？）
-    - 短期可能的价格目标位
-    - 较强的支撑位和压力位分析
-    
-    ### 四、综合判断与投资建议（占分析内容的15%左右）
-    [结合新闻、基本面和技术面，给出明确的投资建议]
-    1. 整体判断：这条新闻是否足以影响投资决策
-    2. 投资决策：必须明确给出以下三种结论之一
-       - "建议买入"：如果综合判断积极
-       - "不建议买入"：如果综合判断负面
-       - "建议观望"：如果影响不明确或需要进一步观察
-    3. 如果建议买入：
-       - 建议配置的仓位比例（占总投资的百分比，如5%、10%等）
-       - 预期持有时间（短期、中期或长期）
-       - 建议的买入价位区间
-       - 止损位建议
-    4. 投资理由（优势）和风险提示
-    
-    注意：重点分析新闻内容对该股票的直接影响，这是决策的核心依据。基本面和技术面数据作为辅助参考，需要综合考虑。
-    """
-    
-    response = client.chat.completions.create(
-        model="deepseek-r1-distill-qwen-32b-250120",
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
+
+    sections = [
+        format_section("股票基本信息", [
+            ("代码", basic.get('ts_code')),
+            ("名称", basic.get('name')),
+            ("行业", basic.get('industry')),
+            ("上市日期", basic.get('list_date'))
+        ]),
+        format_section("当前价格信息", [
+            ("最新收盘价", price.get('close')),
+            ("最新交易日涨跌幅", price.get('pct_chg'), "%"),
+            ("市盈率(PE)", price.get('pe')),
+            ("市净率(PB)", price.get('pb'))
+        ]),
+        format_section("关键财务指标", [
+            ("每股收益(EPS)", financial.get('eps')),
+            ("净资产收益率(ROE)", financial.get('roe')),
+            ("每股净资产", financial.get('bps')),
+            ("毛利率", financial.get('gross_profit_margin'), "%"),
+            ("净利率", financial.get('net_profit_margin'), "%"),
+            ("资产负债率", financial.get('debt_to_assets'), "%")
+        ]),
+        format_section("资产负债情况", [
+            ("总资产", balance.get('total_assets')),
+            ("总负债", balance.get('total_liab'))
+        ]),
+        format_section("技术分析数据", [
+            ("主要支撑位", "、".join(str(level) for level in support_levels)),
+            ("主要压力位", "、".join(str(level) for level in resistance_levels))
+        ])
+    ]
+    return "\n\n".join(section for section in sections if section)
+
+def build_advice_messages(news_text, stock_data):
+    """组装投资建议的对话消息"""
+    return build_messages(
+        ADVICE_INSTRUCTIONS,
+        f"【新闻内容】\n{compact_article(news_text, article_budget('investment_advice'))}\n\n{build_stock_data_text(stock_data)}"
     )
+
+def analyze_stock(news_text, stock_data):
+    """
+    使用DeepSeek分析股票数据和新闻，给出投资建议
+    提供具体的买入建议和仓位控制
+    主要关注新闻对股票的影响
+    """
+    messages = build_advice_messages(news_text, stock_data)
+    
+    model = TASK_MODELS["investment_advice"]
+    with timer("llm_request_seconds", task="investment_advice", model=model):
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=messages
+        )
+    record_usage("investment_advice", messages, response)
     if hasattr(response.choices[0].message, 'reasoning_content'):
         print(response.choices[0].message.reasoning_content)
-    return response.choices[0].message.content
\ No newline at end of file
+    return response.choices[0].message.content
+
+def analyze_stock_stream(news_text, stock_data):
+    """
+    流式生成投资建议，与 analyze_stock 使用相同的提示词
+
+    推理模型先输出推理过程再输出正文，逐段返回，调用方可以边接收边显示
+
+    参数:
+    news_text: 新闻内容
+    stock_data: get_stock_data 返回的股票数据
+
+    返回:
+    生成器，依次产生 ("reasoning", 文本片段) 或 ("content", 文本片段) 元组
+    """
+    messages = build_advice_messages(news_text, stock_data)
+    model = TASK_MODELS["investment_advice"]
+    start = time.perf_counter()
+    content_parts = []
+    usage = None
+    first_token = True
+    # 与非流式调用使用相同的标签；调用方提前停止读取时记为 cancelled，出错时记为 error
+    status = "ok"
+    try:
+        stream = get_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        for chunk in stream:
+            # 开启 include_usage 后，最后一个分片只包含用量，没有 choices
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            for kind, text in (("reasoning", getattr(delta, "reasoning_content", None)), ("content", getattr(delta, "content", None))):
+                if not text:
+                    continue
+                if first_token:
+                    observe("llm_first_token_seconds", time.perf_counter() - start, task="investment_advice", model=model)
+                    first_token = False
+                if kind == "content":
+                    content_parts.append(text)
+                yield kind, text
+    except GeneratorExit:
+        status = "cancelled"
+        raise
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe("llm_request_seconds", time.perf_counter() - start, task="investment_advice", model=model, status=status)
+
+    message = SimpleNamespace(content="".join(content_parts))
+    record_usage("investment_advice", messages, SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message)]))
@@ -1,12 +1,148 @@
-import akshare as ak
 import pandas as pd
 from datetime import datetime
 import numpy as np
+import os
+import sys
+import time
+import threading
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from metrics import timed
+from market_data import get_market_data_provider, hedged_call
+
+# 全市场数据缓存：股票代码列表（证券主数据）一天内基本不变，实时行情快照短时间内复用
+STOCK_LIST_TTL_SECONDS = 12 * 3600
+SPOT_SNAPSHOT_TTL_SECONDS = 60
+_market_cache = {}
+_market_cache_lock = threading.Lock()
+
+def fetch_market_data(endpoint, **kwargs):
+    """
+    通过行情数据源获取数据（按配置依次尝试akshare、本地快照等，熔断中的数据源直接跳过）
+
+    参数:
+    endpoint: akshare函数名，如 stock_zh_a_hist
+    kwargs: 接口参数
+    """
+    return get_market_data_provider().call(endpoint, **kwargs)
+
+def _get_market_data(key, ttl_seconds, loader):
+    """读取全市场数据缓存，过期时重新获取（同一时间只有一个线程获取）"""
+    with _market_cache_lock:
+        cached = _market_cache.get(key)
+        if cached is not None and time.time() - cached[0] < ttl_seconds:
+            return cached[1]
+        data = loader()
+        _market_cache[key] = (time.time(), data)
+        return data
+
+def get_stock_list():
+    """获取A股代码和名称列表（带缓存），包含 code、name 两列"""
+    return _get_market_data('stock_list', STOCK_LIST_TTL_SECONDS, lambda: fetch_market_data("stock_info_a_code_name"))
+
+def get_spot_snapshot(max_age_seconds=SPOT_SNAPSHOT_TTL_SECONDS):
+    """获取A股实时行情快照（带缓存）"""
+    return _get_market_data('spot_snapshot', max_age_seconds, lambda: fetch_market_data("stock_zh_a_spot_em"))
+
+def prewarm_market_caches():
+    """
+    开盘前预热全市场数据缓存（股票列表和行情快照），避免开盘后第一批新闻分析时等待全市场数据下载
+
+    返回:
+    预热成功的数据名称列表
+    """
+    warmed = []
+    for name, loader in (('stock_list', get_stock_list), ('spot_snapshot', get_spot_snapshot)):
+        try:
+            start = time.time()
+            loader()
+            warmed.append(name)
+            print(f"已预热 {name} 缓存，耗时 {time.time() - start:.1f} 秒")
+        except Exception as e:
+            print(f"预热 {name} 缓存失败: {e}")
+    return warmed
+
+def _basic_info_from_individual_info(code_without_market):
+    """方法1: 使用 stock_individual_info_em 获取股票信息（包含行业和上市日期）"""
+    info = fetch_market_data("stock_individual_info_em", symbol=code_without_market)
+    if info.empty:
+        raise ValueError("stock_individual_info_em 返回数据为空")
+    print(f"使用stock_individual_info_em成功获取到股票信息: {info.head()}")
+
+    # 正确映射字段名称
+    # 检查数据中是否有我们需要的字段
+    has_industry = False
+    has_list_date = False
+    industry_value = '未知'
+    list_date_value = '未知'
+
+    # 遍历获取到的数据寻找对应字段
+    for _, row in info.iterrows():
+        item = row['item']
+        if item == '行业':
+            has_industry = True
+            industry_value = row['value']
+        elif item == '上市时间':
+            has_list_date = True
+            # 尝试格式化上市时间
+            try:
+                # 如果上市时间是类似"20111216"的数字格式，将其转换为"2011-12-16"格式
+                list_date_str = str(row['value'])
+                if len(list_date_str) == 8 and list_date_str.isdigit():
+                    list_date_value = f"{list_date_str[:4]}-{list_date_str[4:6]}-{list_date_str[6:8]}"
+                else:
+                    list_date_value = list_date_str
+            except:
+                list_date_value = str(row['value'])
+
+    # 如果没有找到需要的字段，则保持原有结构
+    if not (has_industry and has_list_date):
+        return info
+
+    # 创建一个新的DataFrame，确保包含我们需要的所有字段
+    mapped_info = pd.DataFrame({
+        'item': ['名称', '所属行业', '上市日期'],
+        'value': [
+            info[info['item'] == '股票简称'].iloc[0]['value'] if '股票简称' in info['item'].values else 
+            (info[info['item'] == '名称'].iloc[0]['value'] if '名称' in info['item'].values else '未知'),
+            industry_value,
+            list_date_value
+        ]
+    })
+    print(f"映射后的股票信息: {mapped_info}")
+    return mapped_info
+
+def _basic_info_from_market_lists(code_without_market):
+    """方法2/3: 从全市场行情快照或股票代码列表中查找名称（没有行业和上市日期）"""
+    try:
+        spot_info = get_spot_snapshot()
+        stock_spot = spot_info[spot_info['代码'] == code_without_market]
+        if not stock_spot.empty:
+            print(f"使用stock_zh_a_spot_em成功获取到股票 {code_without_market} 的名称")
+            return pd.DataFrame({
+                'item': ['名称', '所属行业', '上市日期'],
+                'value': [stock_spot['名称'].values[0], '未知', '未知']
+            })
+    except Exception as e:
+        print(f"使用stock_zh_a_spot_em获取股票信息失败: {e}")
+
+    stock_list = get_stock_list()
+    stock_basic = stock_list[stock_list['code'] == code_without_market]
+    if stock_basic.empty:
+        raise ValueError(f"股票列表中没有 {code_without_market}")
+    print(f"使用stock_info_a_code_name成功获取到股票 {code_without_market} 的名称")
+    return pd.DataFrame({
+        'item': ['名称', '所属行业', '上市日期'],
+        'value': [stock_basic['name'].values[0], '未知', '未知']
+    })
 
 def get_stock_basic_info(stock_code):
     """
     获取股票的基本信息，包括名称、行业、上市日期等
-    使用多种方法尝试获取，提高成功率
+    优先使用 stock_individual_info_em，该接口响应慢于其历史延迟分位数时，
+    并行从全市场快照/股票列表中查找，采用先返回的结果
     """
     try:
         # 处理股票代码格式
@@ -14,100 +150,16 @@ def get_stock_basic_info(stock_code):
         if '.' in stock_code:
             code_parts = stock_code.split('.')
             code_without_market = code_parts[0]
-        
-        # 尝试方法1: 使用 stock_individual_info_em
-        try:
-            info = ak.stock_individual_info_em(symbol=code_without_market)
-            if not info.empty:
-                print(f"使用stock_individual_info_em成功获取到股票信息: {info.head()}")
-                
-                # 正确映射字段名称
-                # 检查数据中是否有我们需要的字段
-                has_industry = False
-                has_list_date = False
-                industry_value = '未知'
-                list_date_value = '未知'
-                
-                # 遍历获取到的数据寻找对应字段
-                for _, row in info.iterrows():
-                    item = row['item']
-                    if item == '行业':
-                        has_industry = True
-                        industry_value = row['value']
-                    elif item == '上市时间':
-                        has_list_date = True
-                        # 尝试格式化上市时间
-                        try:
-                            # 如果上市时间是类似"20111216"的数字格式，将其转换为"2011-12-16"格式
-                            list_date_str = str(row['value'])
-                            if len(list_date_str) == 8 and list_date_str.isdigit():
-                                list_date_value = f"{list_date_str[:4]}-{list_date_str[4:6]}-{list_date_str[6:8]}"
-                            else:
-                                list_date_value = list_date_str
-                        except:
-                            list_date_value = str(row['value'])
-                
-                # 如果没有找到需要的字段，则保持原有结构
-                if not (has_industry and has_list_date):
-                    return ensure_compatible_types(info)
-                
-                # 创建一个新的DataFrame，确保包含我们需要的所有字段
-                mapped_info = pd.DataFrame({
-                    'item': ['名称', '所属行业', '上市日期'],
-                    'value': [
-                        info[info['item'] == '股票简称'].iloc[0]['value'] if '股票简称' in info['item'].values else 
-                        (info[info['item'] == '名称'].iloc[0]['value'] if '名称' in info['item'].values else '未知'),
-                        industry_value,
-                        list_date_value
-                    ]
-                })
-                print(f"映射后的股票信息: {mapped_info}")
-                return ensure_compatible_types(mapped_info)
-        except Exception as e:
-            print(f"使用stock_individual_info_em获取股票信息失败: {e}")
-        
-        # 尝试方法2: 使用 stock_zh_a_spot_em
-        try:
-            spot_info = ak.stock_zh_a_spot_em()
-            stock_spot = spot_info[spot_info['代码'] == code_without_market]
-            if not stock_spot.empty:
-                # 转换为预期的格式
-                info = pd.DataFrame({
-                    'item': ['名称', '所属行业', '上市日期'],
-                    'value': [
-                        stock_spot['名称'].values[0],
-                        '未知',  # 行业信息需要从其他API获取
-                        '未知'   # 上市日期需要从其他API获取
-                    ]
-                })
-                print(f"使用stock_zh_a_spot_em成功获取到股票信息: {info}")
-                return ensure_compatible_types(info)
-        except Exception as e:
-            print(f"使用stock_zh_a_spot_em获取股票信息失败: {e}")
-        
-        # 尝试方法3: 使用 stock_info_a_code_name
-        try:
-            stock_list = ak.stock_info_a_code_name()
-            stock_basic = stock_list[stock_list['code'] == code_without_market]
-            if not stock_basic.empty:
-                info = pd.DataFrame({
-                    'item': ['名称', '所属行业', '上市日期'],
-                    'value': [
-                        stock_basic['name'].values[0],
-                        '未知',  # 行业信息需要从其他API获取
-                        '未知'   # 上市日期需要从其他API获取
-                    ]
-                })
-                print(f"使用stock_info_a_code_name成功获取到股票信息: {info}")
-                return ensure_compatible_types(info)
-        except Exception as e:
-            print(f"使用stock_info_a_code_name获取股票信息失败: {e}")
-        
-        # 如果所有方法都失败，返回空的DataFrame
-        print(f"所有方法都无法获取股票 {stock_code} 的基本信息")
-        return ensure_compatible_types(pd.DataFrame({'item': ['名称', '所属行业', '上市日期'], 'value': ['未知', '未知', '未知']}))
+
+        name, info = hedged_call([
+            ("stock_individual_info_em", lambda: _basic_info_from_individual_info(code_without_market)),
+            ("market_lists", lambda: _basic_info_from_market_lists(code_without_market))
+        ], hedge_after=get_market_data_provider().hedge_delay("stock_individual_info_em"))
+        if name != "stock_individual_info_em":
+            print(f"股票 {stock_code} 的基本信息来自备用数据源 {name}")
+        return ensure_compatible_types(info)
     except Exception as e:
-        print(f"获取股票基本信息时发生未知错误: {e}")
+        print(f"所有方法都无法获取股票 {stock_code} 的基本信息: {e}")
         return ensure_compatible_types(pd.DataFrame({'item': ['名称', '所属行业', '上市日期'], 'value': ['未知', '未知', '未知']}))
 
 def ensure_compatible_types(df):
@@ -125,6 +177,7 @@ def ensure_compatible_types(df):
     
     return df
 
+@timed("stock_data_seconds", step="stock_data")
 def get_stock_data(stock_code):
     """
     使用Akshare获取股票的全面数据，包括：
@@ -171,17 +224,11 @@ def get_stock_data(stock_code):
         
         # 获取最新交易日数据（价格等）
         try:
-            daily_data = ak.stock_zh_a_daily(symbol=formatted_code, adjust="qfq").iloc[-1].to_dict()
+            daily_data = fetch_market_data("stock_zh_a_daily", symbol=formatted_code, adjust="qfq").iloc[-1].to_dict()
             print(f"获取到的最新交易日数据: {daily_data}")
         except Exception as e:
             print(f"获取最新交易日数据出错: {e}")
-            # 尝试使用另一种方式获取
-            try:
-                daily_data = ak.stock_zh_a_daily(symbol=code_without_market, adjust="qfq").iloc[-1].to_dict()
-                print(f"使用纯代码获取到的最新交易日数据: {daily_data}")
-            except Exception as e2:
-                print(f"使用纯代码获取最新交易日数据也出错: {e2}")
-                daily_data = {}
+            daily_data = {}
         
         # 获取实时行情
         try:
@@ -195,7 +242,7 @@ def get_stock_data(stock_code):
                 xq_symbol = code_without_market
                 
             print(f"查询的股票代码: {code_without_market}, 雪球格式: {xq_symbol}")
-            real_time_quote = ak.stock_individual_spot_xq(symbol=xq_symbol)
+            real_time_quote = fetch_market_data("stock_individual_spot_xq", symbol=xq_symbol)
             
             if not real_time_quote.empty:
                 # 将DataFrame转换为字典格式
@@ -217,7 +264,7 @@ def get_stock_data(stock_code):
         try:
             # 获取主要财务指标 - 使用正确的API参数
             current_year = str(datetime.now().year)
-            fin_indicator = ak.stock_financial_analysis_indicator(symbol=code_without_market, start_year=str(int(current_year)-3))
+            fin_indicator = fetch_market_data("stock_financial_analysis_indicator", symbol=code_without_market, start_year=str(int(current_year)-3))
             if not fin_indicator.empty:
                 # 获取最新的一期数据
                 financial_indicator = fin_indicator.iloc[0].to_dict()
@@ -234,13 +281,13 @@ def get_stock_data(stock_code):
             # 尝试使用其他API获取财务指标
             try:
                 # 尝试使用财务报表API获取 - 先尝试获取利润表
-                fin_indicator = ak.stock_financial_report_sina(stock=formatted_code, symbol="利润表")
+                fin_indicator = fetch_market_data("stock_financial_report_sina", stock=formatted_code, symbol="利润表")
                 if not fin_indicator.empty:
                     financial_indicator = fin_indicator.iloc[0].to_dict()
                     print(f"使用利润表API获取到的财务指标数据: {list(financial_indicator.keys())[:10]}...")
                 else:
                     # 如果利润表为空，尝试获取资产负债表
-                    fin_indicator = ak.stock_financial_report_sina(stock=formatted_code, symbol="资产负债表")
+                    fin_indicator = fetch_market_data("stock_financial_report_sina", stock=formatted_code, symbol="资产负债表")
                     if not fin_indicator.empty:
                         financial_indicator = fin_indicator.iloc[0].to_dict()
                         print(f"使用资产负债表API获取到的财务指标数据: {list(financial_indicator.keys())[:10]}...")
@@ -340,7 +387,7 @@ def get_stock_data(stock_code):
         balance_sheet = {}
         try:
             # 使用正确的API获取资产负债表
-            bs_data = ak.stock_financial_report_sina(stock=formatted_code, symbol="资产负债表")
+            bs_data = fetch_market_data("stock_financial_report_sina", stock=formatted_code, symbol="资产负债表")
             if not bs_data.empty:
                 balance_sheet = bs_data.iloc[0].to_dict()
                 print(f"获取到的资产负债表数据: {list(balance_sheet.keys())[:10]}...")  # 只打印前10个键
@@ -353,7 +400,7 @@ def get_stock_data(stock_code):
         income = {}
         try:
             # 使用正确的API获取利润表
-            income_data = ak.stock_financial_report_sina(stock=formatted_code, symbol="利润表")
+            income_data = fetch_market_data("stock_financial_report_sina", stock=formatted_code, symbol="利润表")
             if not income_data.empty:
                 income = income_data.iloc[0].to_dict()
                 print(f"获取到的利润表数据: {list(income.keys())[:10]}...")  # 只打印前10个键
@@ -366,7 +413,7 @@ def get_stock_data(stock_code):
         cash_flow = {}
         try:
             # 使用正确的API获取现金流量表
-            cf_data = ak.stock_financial_report_sina(stock=formatted_code, symbol="现金流量表")
+            cf_data = fetch_market_data("stock_financial_report_sina", stock=formatted_code, symbol="现金流量表")
             if not cf_data.empty:
                 cash_flow = cf_data.iloc[0].to_dict()
                 print(f"获取到的现金流量表数据: {list(cash_flow.keys())[:10]}...")  # 只打印前10个键
@@ -430,7 +477,7 @@ def get_stock_data(stock_code):
             # 尝试进一步确认是否已上市
             try:
                 # 使用 stock_info_a_code_name 获取A股列表
-                stock_list = ak.stock_info_a_code_name()
+                stock_list = get_stock_list()
                 is_listed = code_without_market in stock_list['code'].values
                 print(f"股票 {code_without_market} 是否在A股上市: {is_listed}")
             except Exception as e:
@@ -538,6 +585,7 @@ def get_stock_data(stock_code):
         traceback.print_exc()
         return {}
 
+@timed("stock_data_seconds", step="history_data")
 def get_stock_history_data(stock_code, period='365'):
     """
     获取股票的历史行情数据，用于绘制K线图和计算技术指标
@@ -574,42 +622,26 @@ def get_stock_history_data(stock_code, period='365'):
             else:
                 formatted_code = stock_code
 
-        # 获取历史日K线数据
+        # 获取历史日K线数据：东方财富接口优先，失败时使用新浪日线接口
+        end_date = datetime.now().strftime('%Y%m%d')
+        start_date = (datetime.now() - pd.Timedelta(days=int(period))).strftime('%Y%m%d')
+        # 东方财富接口响应慢于其历史延迟分位数时并行请求新浪接口，采用先返回的结果
         try:
             print(f"开始获取股票 {formatted_code} 的历史数据...")
-            history_data = ak.stock_zh_a_hist(symbol=formatted_code, period=period, adjust="qfq")
-            print(f"成功获取到历史数据，共 {len(history_data)} 条记录")
+            name, history_data = hedged_call([
+                ("stock_zh_a_hist", lambda: fetch_market_data("stock_zh_a_hist", symbol=code_without_market, period="daily", start_date=start_date, end_date=end_date, adjust="qfq")),
+                ("stock_zh_a_daily", lambda: fetch_market_data("stock_zh_a_daily", symbol=formatted_code, start_date=start_date, end_date=end_date, adjust="qfq"))
+            ], hedge_after=get_market_data_provider().hedge_delay("stock_zh_a_hist"))
+            print(f"通过 {name} 成功获取到历史数据，共 {len(history_data)} 条记录")
             return history_data
         except Exception as e:
-            print(f"通过第一种方式获取历史数据失败: {e}")
-            try:
-                # 尝试使用另一种API
-                if formatted_code.startswith('sh'):
-                    xq_code = f"SH{code_without_market}"
-                else:
-                    xq_code = f"SZ{code_without_market}"
-                print(f"尝试使用雪球格式获取历史数据: {xq_code}")
-                history_data = ak.stock_zh_a_hist(symbol=code_without_market, period=period, adjust="qfq")
-                print(f"成功获取到历史数据，共 {len(history_data)} 条记录")
-                return history_data
-            except Exception as e2:
-                print(f"通过第二种方式获取历史数据也失败: {e2}")
-                # 再尝试另一种API
-                try:
-                    print(f"尝试使用日期范围获取历史数据")
-                    # 获取今天和一年前的日期
-                    end_date = datetime.now().strftime('%Y%m%d')
-                    start_date = (datetime.now() - pd.Timedelta(days=int(period))).strftime('%Y%m%d')
-                    history_data = ak.stock_zh_a_daily(symbol=formatted_code, start_date=start_date, end_date=end_date, adjust="qfq")
-                    print(f"成功获取到历史数据，共 {len(history_data)} 条记录")
-                    return history_data
-                except Exception as e3:
-                    print(f"所有获取历史数据的方法均失败: {e3}")
-                    return pd.DataFrame()
+            print(f"所有获取历史数据的方法均失败: {e}")
+            return pd.DataFrame()
     except Exception as e:
         print(f"获取股票历史数据时出现未知错误: {e}")
         return pd.DataFrame()
 
+@timed("stock_data_seconds", step="chip_distribution")
 def calculate_chip_distribution(history_data):
     """
     计算股票筹码分布
@@ -699,6 +731,7 @@ def calculate_chip_distribution(history_data):
         traceback.print_exc()
         return pd.DataFrame()
 
+@timed("stock_data_seconds", step="support_resistance")
 def calculate_support_resistance(history_data, window_size=20):
     """
     计算股票的支撑位和压力位
@@ -849,6 +882,7 @@ def calculate_support_resistance(history_data, window_size=20):
         traceback.print_exc()
         return {"支撑位": [], "压力位": []} 
 
+@timed("stock_data_seconds", step="technical_indicators")
 def calculate_technical_indicators(history_data):
     """
     计算股票的技术指标，包括MACD、RSI、KDJ等
@@ -1,111 +1,89 @@
 import os
-import matplotlib.pyplot as plt
+import io
+import sys
+import shutil
 from datetime import datetime
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+# 获取当前文件的绝对路径，然后获取其上一级目录（项目根目录）
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from report_store import (
+    ReportStore, load_report_storage_config, report_lock, report_date_key, load_day_manifest,
+    rebuild_day_manifests, load_index_summary, save_index_summary
+)
+
+# 报告模板目录和共享静态资源目录（静态资源会被复制到报告输出目录的static子目录中）
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# 索引页中每页显示的报告数量
+INDEX_PAGE_SIZE = 100
+
+@lru_cache(maxsize=1)
+def get_template_environment():
+    """
+    获取模板环境（每个进程只创建一次，模板编译后缓存在环境中，不会每份报告重复解析）
+    """
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(['html']),
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+
+def render_template(template_name, **context):
+    """使用指定模板渲染HTML"""
+    return get_template_environment().get_template(template_name).render(**context)
+
+def prepare_static_assets(output_dir, page_dir):
+    """
+    确保输出目录中存在最新的共享静态资源（样式表）
+    
+    参数:
+    output_dir: 报告输出目录，静态资源复制到其中的static子目录
+    page_dir: 引用静态资源的页面所在目录
+    
+    返回:
+    页面引用静态资源使用的相对路径前缀
+    """
+    target_dir = os.path.join(output_dir, 'static')
+    os.makedirs(target_dir, exist_ok=True)
+    for filename in os.listdir(STATIC_DIR):
+        source = os.path.join(STATIC_DIR, filename)
+        target = os.path.join(target_dir, filename)
+        if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source):
+            shutil.copy2(source, target)
+    return os.path.relpath(target_dir, page_dir).replace(os.sep, '/')
 
 def visualize_stock_data(stock_data, news_text, analysis_result, output_dir='../output'):
     """
     将股票数据和分析结果可视化，并保存为HTML和图片文件
     """
-    # 确保输出目录存在
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    
-    # 生成唯一的文件名
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # 报告按日期和股票代码分片存放，文件名带随机后缀，同一秒生成的报告不会冲突
+    store = ReportStore(output_dir)
+    created = datetime.now()
     stock_code = stock_data['basic']['ts_code']
     stock_name = stock_data['basic']['name']
-    base_filename = f"{output_dir}/{stock_code}_{timestamp}"
+    html_file = store.new_report_path(stock_code, created)
+    report_dir = os.path.dirname(html_file)
     
-    # 创建HTML报告 - 使用三重引号和普通字符串，然后用format方法替换变量
-    html_content = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>股票分析报告 - {stock_name}({stock_code})</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            .header {{ background-color: #f0f0f0; padding: 20px; border-radius: 5px; margin-bottom: 20px; }}
-            .section {{ margin-bottom: 30px; }}
-            table {{ border-collapse: collapse; width: 100%; }}
-            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            th {{ background-color: #f2f2f2; }}
-            .news {{ background-color: #f9f9f9; padding: 15px; border-radius: 5px; }}
-            .analysis {{ background-color: #f0f8ff; padding: 15px; border-radius: 5px; }}
-            .buy {{ color: green; font-weight: bold; }}
-            .sell {{ color: red; font-weight: bold; }}
-            .hold {{ color: orange; font-weight: bold; }}
-            img {{ max-width: 100%; height: auto; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>股票分析报告</h1>
-                <h2>{stock_name} ({stock_code})</h2>
-                <p>生成时间: {timestamp}</p>
-            </div>
-            
-            <div class="section">
-                <h3>新闻内容</h3>
-                <div class="news">
-                    <p>{news_text}</p>
-                </div>
-            </div>
-            
-            <div class="section">
-                <h3>基本信息</h3>
-                <table>
-                    <tr><th>股票代码</th><td>{ts_code}</td></tr>
-                    <tr><th>股票名称</th><td>{name}</td></tr>
-                    <tr><th>所属行业</th><td>{industry}</td></tr>
-                    <tr><th>上市日期</th><td>{list_date}</td></tr>
-                </table>
-            </div>
-            
-            <div class="section">
-                <h3>价格信息</h3>
-                <table>
-                    <tr><th>最新收盘价</th><td>{close}</td></tr>
-                    <tr><th>涨跌幅</th><td>{pct_chg}%</td></tr>
-                    <tr><th>市盈率(PE)</th><td>{pe}</td></tr>
-                    <tr><th>市净率(PB)</th><td>{pb}</td></tr>
-                    <tr><th>总市值</th><td>{total_mv}</td></tr>
-                    <tr><th>流通市值</th><td>{circ_mv}</td></tr>
-                </table>
-            </div>
-            
-            <div class="section">
-                <h3>财务指标</h3>
-                <table>
-                    <tr><th>每股收益(EPS)</th><td>{eps}</td></tr>
-                    <tr><th>净资产收益率(ROE)</th><td>{roe}</td></tr>
-                    <tr><th>每股净资产</th><td>{bps}</td></tr>
-                    <tr><th>毛利率</th><td>{grossprofit_margin}</td></tr>
-                    <tr><th>净利率</th><td>{netprofit_margin}</td></tr>
-                    <tr><th>资产负债率</th><td>{debt_to_assets}</td></tr>
-                </table>
-                <img src="financial_indicators_{img_timestamp}.png" alt="财务指标图表">
-            </div>
-            
-            <div class="section">
-                <h3>投资分析结果</h3>
-                <div class="analysis">
-                    <p>{analysis_html}</p>
-                    <p class="{recommendation_class}">
-                        {recommendation_text}
-                    </p>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
+    # 先生成财务指标图表，内容相同的图表只保存一份（图表文件与清单记录一起在 commit_report 中写入）
+    chart_file = None
+    chart_png = None
+    try:
+        chart_png = render_financial_chart(stock_data, stock_name, stock_code)
+        chart_file = store.chart_path(chart_png)
+    except Exception as e:
+        print(f"创建图表时出错: {e}")
     
-    # 准备替换变量
-    formatted_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    analysis_html = analysis_result.replace('\n', '<br>')
+    # 准备模板变量
+    formatted_timestamp = created.strftime("%Y-%m-%d %H:%M:%S")
+    # 按行拼接分析结果，每行内容会被转义
+    analysis_html = Markup('<br>').join(analysis_result.split('\n'))
     
     # 确定推荐类别和文本
     if '建议买入' in analysis_result:
@@ -118,245 +96,213 @@ def visualize_stock_data(stock_data, news_text, analysis_result, output_dir='../
         recommendation_class = "hold"
         recommendation_text = "⚠️ 建议观望"
     
-    # 使用format方法替换变量
-    html_content = html_content.format(
+    financial_indicator = stock_data['financial_indicator']
+    financial_rows = [
+        ("每股收益(EPS)", financial_indicator.get('eps', '未知')),
+        ("净资产收益率(ROE)", financial_indicator.get('roe', '未知')),
+        ("每股净资产", financial_indicator.get('bps', '未知')),
+        ("毛利率", financial_indicator.get('gross_profit_margin', '未知')),
+        ("净利率", financial_indicator.get('net_profit_margin', '未知')),
+        ("资产负债率", financial_indicator.get('debt_to_assets', '未知'))
+    ]
+    
+    # 使用预编译的模板生成HTML报告，样式引用共享的静态文件
+    html_content = render_template(
+        "report.html",
+        static_prefix=prepare_static_assets(output_dir, report_dir),
         stock_name=stock_name,
         stock_code=stock_code,
         timestamp=formatted_timestamp,
         news_text=news_text,
-        ts_code=stock_data['basic']['ts_code'],
-        name=stock_data['basic']['name'],
-        industry=stock_data['basic']['industry'],
-        list_date=stock_data['basic']['list_date'],
-        close=stock_data['price']['close'],
-        pct_chg=stock_data['price']['pct_chg'],
-        pe=stock_data['price']['pe'],
-        pb=stock_data['price']['pb'],
-        total_mv=stock_data['price']['total_mv'],
-        circ_mv=stock_data['price']['circ_mv'],
-        eps=stock_data['financial_indicator'].get('eps', '未知'),
-        roe=stock_data['financial_indicator'].get('roe', '未知'),
-        bps=stock_data['financial_indicator'].get('bps', '未知'),
-        grossprofit_margin=stock_data['financial_indicator'].get('gross_profit_margin', '未知'),
-        netprofit_margin=stock_data['financial_indicator'].get('net_profit_margin', '未知'),
-        debt_to_assets=stock_data['financial_indicator'].get('debt_to_assets', '未知'),
-        img_timestamp=timestamp,
+        basic=stock_data['basic'],
+        price=stock_data['price'],
+        financial_rows=financial_rows,
+        chart_file=os.path.relpath(chart_file, report_dir).replace(os.sep, '/') if chart_file else None,
         analysis_html=analysis_html,
         recommendation_class=recommendation_class,
         recommendation_text=recommendation_text
     )
     
     # 保存HTML报告
-    html_file = f"{base_filename}.html"
     with open(html_file, 'w', encoding='utf-8') as f:
         f.write(html_content)
     
-    # 创建财务指标图表
-    try:
-        # 准备数据
-        indicators = ["EPS", "ROE", "毛利率", "净利率", "资产负债率"]
-        values = [
-            float(str(stock_data['financial_indicator'].get('eps', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('eps', '未知') != '未知' else 0,
-            float(str(stock_data['financial_indicator'].get('roe', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('roe', '未知') != '未知' else 0,
-            float(str(stock_data['financial_indicator'].get('gross_profit_margin', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('gross_profit_margin', '未知') != '未知' else 0,
-            float(str(stock_data['financial_indicator'].get('net_profit_margin', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('net_profit_margin', '未知') != '未知' else 0,
-            float(str(stock_data['financial_indicator'].get('debt_to_assets', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('debt_to_assets', '未知') != '未知' else 0
-        ]
-        
-        # 创建图表
-        plt.figure(figsize=(10, 6))
-        bars = plt.bar(indicators, values, color=['blue', 'green', 'orange', 'red', 'purple'])
-        
-        # 添加数据标签
-        for bar in bars:
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + 0.1, f'{height:.2f}', 
-                    ha='center', va='bottom', fontsize=9)
-        
-        plt.title(f"{stock_name}({stock_code}) - 关键财务指标")
-        plt.xlabel("指标")
-        plt.ylabel("数值")
-        plt.tight_layout()
-        
-        # 保存图表
-        plt.savefig(f"{output_dir}/financial_indicators_{timestamp}.png")
-        plt.close()
-        
-        print(f"已生成分析报告: {html_file}")
-        return html_file
-    except Exception as e:
-        print(f"创建图表时出错: {e}")
-        return html_file
+    # 记录到报告清单
+    record = {
+        'stock_code': stock_code,
+        'stock_name': stock_name,
+        'report_file': store.relative_path(html_file),
+        'created_at': formatted_timestamp
+    }
+    if chart_file:
+        record['chart_file'] = store.relative_path(chart_file)
+    store.commit_report(record, chart_png)
+    
+    print(f"已生成分析报告: {html_file}")
+    return html_file
 
-def generate_index_page(results, output_dir='../output'):
+def render_financial_chart(stock_data, stock_name, stock_code):
     """
-    生成索引页面，列出所有分析报告
+    绘制关键财务指标柱状图
+    
+    返回:
+    PNG图片的二进制内容
     """
-    if not results:
-        return None
+    # 准备数据
+    indicators = ["EPS", "ROE", "毛利率", "净利率", "资产负债率"]
+    values = [
+        float(str(stock_data['financial_indicator'].get('eps', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('eps', '未知') != '未知' else 0,
+        float(str(stock_data['financial_indicator'].get('roe', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('roe', '未知') != '未知' else 0,
+        float(str(stock_data['financial_indicator'].get('gross_profit_margin', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('gross_profit_margin', '未知') != '未知' else 0,
+        float(str(stock_data['financial_indicator'].get('net_profit_margin', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('net_profit_margin', '未知') != '未知' else 0,
+        float(str(stock_data['financial_indicator'].get('debt_to_assets', '未知')).replace('%', '')) if stock_data['financial_indicator'].get('debt_to_assets', '未知') != '未知' else 0
+    ]
     
-    index_file = f"{output_dir}/index.html"
-    existing_records = []
+    # 创建图表（matplotlib只在生成图表时导入）
+    # 使用Agg后端的面向对象接口绘图，不依赖pyplot的全局状态，可以在多个进程/线程中并行渲染
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    bars = ax.bar(indicators, values, color=['blue', 'green', 'orange', 'red', 'purple'])
     
-    # 获取当前output目录中所有HTML报告文件
-    all_html_files = []
-    try:
-        for filename in os.listdir(output_dir):
-            if filename.endswith('.html') and filename != 'index.html':
-                # 分析文件名，提取股票代码和时间戳
-                parts = filename.split('_')
-                if len(parts) >= 3:
-                    stock_code = parts[0]
-                    # 提取时间戳信息
-                    date_part = parts[-2] if len(parts) >= 2 else ""
-                    time_part = parts[-1].replace('.html', '') if len(parts) >= 1 else ""
-                    
-                    if len(date_part) == 8 and len(time_part) == 6:  # 确保格式为YYYYMMDD_HHMMSS
-                        timestamp = f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} {time_part[:2]}:{time_part[2:4]}:{time_part[4:]}"
-                    else:
-                        timestamp = ""
-                    
-                    # 尝试从文件中提取股票名称
-                    stock_name = ""
-                    try:
-                        with open(os.path.join(output_dir, filename), 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            # 简单从HTML标题中提取股票名称
-                            import re
-                            name_match = re.search(r'<h2>([^(]+)', content)
-                            if name_match:
-                                stock_name = name_match.group(1).strip()
-                    except:
-                        stock_name = f"{stock_code}股票"
-                    
-                    # 如果当前处理的文件不在新结果中，则添加到existing_records
-                    if not any(os.path.basename(result['report_file']) == filename for result in results):
-                        existing_records.append({
-                            'news_index': 999,  # 给旧记录一个大索引号
-                            'stock_code': stock_code,
-                            'stock_name': stock_name,
-                            'report_filename': filename,
-                            'timestamp': timestamp
-                        })
+    # 添加数据标签
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, f'{height:.2f}', 
+                ha='center', va='bottom', fontsize=9)
+    
+    ax.set_title(f"{stock_name}({stock_code}) - 关键财务指标")
+    ax.set_xlabel("指标")
+    ax.set_ylabel("数值")
+    fig.tight_layout()
+    
+    # 输出为PNG二进制内容（不写入元数据，相同内容的图表哈希一致）
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', metadata={'Software': None})
+    return buffer.getvalue()
+
+def _date_page_filename(date_key, page):
+    """按日期拆分的索引页文件名，如 index_20250321.html、index_20250321_2.html"""
+    suffix = f"_{page}" if page > 1 else ""
+    return f"index_{date_key.replace('-', '')}{suffix}.html"
+
+def _write_date_pages(output_dir, date_key, records, updated_at, static_prefix):
+    """生成某一天的分页索引页，并删除报告减少后多出来的分页（没有报告时删除全部分页）"""
+    total_pages = (len(records) + INDEX_PAGE_SIZE - 1) // INDEX_PAGE_SIZE
+    for page in range(1, total_pages + 1):
+        page_html = render_template(
+            "index_date.html",
+            static_prefix=static_prefix,
+            date_key=date_key,
+            updated_at=updated_at,
+            total_reports=len(records),
+            page=page,
+            total_pages=total_pages,
+            prev_page_file=_date_page_filename(date_key, page - 1) if page > 1 else None,
+            next_page_file=_date_page_filename(date_key, page + 1) if page < total_pages else None,
+            first_index=(page - 1) * INDEX_PAGE_SIZE + 1,
+            records=[
+                dict(record, link=record['report_file'])
+                for record in records[(page - 1) * INDEX_PAGE_SIZE:page * INDEX_PAGE_SIZE]
+            ]
+        )
         
-        print(f"在output目录中找到 {len(existing_records)} 个现有报告文件")
-    except Exception as e:
-        print(f"读取output目录出错: {e}")
+        with open(os.path.join(output_dir, _date_page_filename(date_key, page)), 'w', encoding='utf-8') as f:
+            f.write(page_html)
     
-    # 使用普通字符串和format方法
-    index_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>股票分析报告索引</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 20px; }}
-            .container {{ max-width: 1200px; margin: 0 auto; }}
-            table {{ border-collapse: collapse; width: 100%; }}
-            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-            th {{ background-color: #f2f2f2; }}
-            tr:hover {{background-color: #f5f5f5;}}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>股票分析报告索引</h1>
-            <p>最近更新时间: {timestamp}</p>
-            <p>共 {total_reports} 条分析报告</p>
-            <table>
-                <tr>
-                    <th>序号</th>
-                    <th>股票代码</th>
-                    <th>股票名称</th>
-                    <th>报告链接</th>
-                    <th>生成时间</th>
-                </tr>
+    page = total_pages + 1
+    while os.path.exists(os.path.join(output_dir, _date_page_filename(date_key, page))):
+        os.remove(os.path.join(output_dir, _date_page_filename(date_key, page)))
+        page += 1
+
+def generate_index_page(results, output_dir='../output', refresh_dates=()):
     """
+    增量更新索引页面
     
-    # 格式化时间戳
-    formatted_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    index.html 按日期列出报告数量，每天的报告单独生成分页的日期索引页；
+    只重新生成包含新报告的日期和 refresh_dates 中的日期（如被清理或压缩过报告的日期），
+    这些日期的报告从按日清单读取，首页使用按日汇总（index_summary.json），
+    更新耗时只与本次涉及的日期有关，与报告总数无关。
+    第一次运行（还没有按日汇总）时根据总清单生成全部日期的索引页
     
-    # 合并现有记录和新记录
-    combined_records = []
+    参数:
+    results: 本次生成的报告列表，每项包含 report_file
+    output_dir: 报告输出目录
+    refresh_dates: 需要重新生成的其他日期（YYYY-MM-DD）
+    """
+    if not results and not refresh_dates:
+        return None
     
-    # 添加现有记录
-    for record in existing_records:
-        combined_records.append({
-            'news_index': record.get('news_index', 999),
-            'stock_code': record.get('stock_code', ''),
-            'stock_name': record.get('stock_name', ''),
-            'report_filename': record.get('report_filename', ''),
-            'timestamp': record.get('timestamp', '')
-        })
+    index_file = f"{output_dir}/index.html"
+    updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    static_prefix = prepare_static_assets(output_dir, output_dir)
     
-    # 添加新记录
+    # 需要更新的日期：包含本次新报告的日期（无法从路径识别时按今天处理）以及指定刷新的日期
+    dates_to_update = set(refresh_dates)
     for result in results:
-        report_filename = os.path.basename(result['report_file'])
-        # 从文件名中提取时间戳 (格式: stock_code_YYYYMMDD_HHMMSS.html)
-        timestamp_parts = report_filename.split('_')
-        if len(timestamp_parts) >= 3:
-            date_part = timestamp_parts[-2]
-            time_part = timestamp_parts[-1].replace('.html', '')
-            report_timestamp = f"{date_part[:4]}-{date_part[4:6]}-{date_part[6:]} {time_part[:2]}:{time_part[2:4]}:{time_part[4:]}"
-        else:
-            report_timestamp = formatted_timestamp
-            
-        combined_records.append({
-            'news_index': result.get('news_index', 0) + 1,
-            'stock_code': result.get('stock_code', ''),
-            'stock_name': result.get('stock_name', ''),
-            'report_filename': report_filename,
-            'timestamp': report_timestamp
-        })
+        if result.get('report_file'):
+            dates_to_update.add(report_date_key(result['report_file']) or updated_at[:10])
     
-    # 去除重复记录（以股票代码和报告文件名为依据）
-    unique_records = []
-    seen = set()
-    for record in combined_records:
-        key = f"{record['stock_code']}_{record['report_filename']}"
-        if key not in seen and record['report_filename']:
-            seen.add(key)
-            unique_records.append(record)
-    
-    # 按时间戳排序，最新的在前面
-    unique_records.sort(key=lambda x: (x.get('timestamp', '')), reverse=True)
+    with report_lock(output_dir):
+        summary = load_index_summary(output_dir)
+        if summary is None:
+            # 升级后第一次生成索引：根据总清单生成按日清单和全部日期页
+            summary = {}
+            dates_to_update |= rebuild_day_manifests(output_dir)
+        
+        for date_key in dates_to_update:
+            # 压缩的报告（.html.gz）浏览器不能直接从本地打开，只作为归档保留，不列入索引
+            records = [record for record in load_day_manifest(output_dir, date_key) if not record.get('compressed')]
+            _write_date_pages(output_dir, date_key, records, updated_at, static_prefix)
+            if records:
+                summary[date_key] = {'count': len(records), 'latest': records[0].get('created_at', '')}
+            else:
+                summary.pop(date_key, None)
+        save_index_summary(output_dir, summary)
     
-    index_html = index_html.format(
-        timestamp=formatted_timestamp,
-        total_reports=len(unique_records)
+    # 生成按日期汇总的首页（日期倒序，没有日期的旧报告排在最后）
+    days = sorted(summary.items(), key=lambda item: (item[0] != "未知日期", item[0]), reverse=True)
+    total_reports = sum(day['count'] for _, day in days)
+    index_html = render_template(
+        "index.html",
+        static_prefix=static_prefix,
+        updated_at=updated_at,
+        total_reports=total_reports,
+        days=[
+            {
+                'date_key': date_key,
+                'page_file': _date_page_filename(date_key, 1),
+                'count': day['count'],
+                'latest': day['latest']
+            }
+            for date_key, day in days
+        ]
     )
     
-    # 添加每个结果的行
-    for i, record in enumerate(unique_records):
-        row_html = """
-                <tr>
-                    <td>{index}</td>
-                    <td>{stock_code}</td>
-                    <td>{stock_name}</td>
-                    <td><a href="{report_filename}" target="_blank">查看报告</a></td>
-                    <td>{timestamp}</td>
-                </tr>
-        """
-        index_html += row_html.format(
-            index=i + 1,
-            stock_code=record.get('stock_code', ''),
-            stock_name=record.get('stock_name', ''),
-            report_filename=record.get('report_filename', ''),
-            timestamp=record.get('timestamp', '')
-        )
-    
-    # 添加HTML结束标签
-    index_html += """
-            </table>
-        </div>
-    </body>
-    </html>
-    """
-    
     # 保存索引页面
     with open(index_file, 'w', encoding='utf-8') as f:
         f.write(index_html)
     
-    print(f"已生成报告索引页: {index_file}，包含 {len(unique_records)} 条记录")
-    return index_file 
\ No newline at end of file
+    print(f"已生成报告索引页: {index_file}，包含 {total_reports} 条记录，更新了 {len(dates_to_update)} 个日期索引页")
+    return index_file
+
+def apply_report_retention(output_dir='../output', blocking=False):
+    """
+    按 report_storage 配置压缩旧报告、清理过期报告，并刷新受影响日期的索引页
+
+    需要检查全部报告，应由单个进程定期调用（监视器每天一次，或单独运行分析时运行结束后一次）
+
+    参数:
+    output_dir: 报告输出目录
+    blocking: 为False时如果其他进程正在访问报告目录则跳过本次清理
+
+    返回:
+    受影响的日期集合
+    """
+    report_store = ReportStore(output_dir, **load_report_storage_config())
+    refresh_dates = report_store.apply_retention(blocking=blocking)
+    if refresh_dates and os.path.exists(os.path.join(output_dir, "index.html")):
+        generate_index_page([], output_dir, refresh_dates)
+    return refresh_dates
@@ -0,0 +1,65 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# 将src目录添加到系统路径
+sys.path.append(os.path.join(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')), 'src'))
+
+from report_store import ReportStore, load_report_manifest
+
+class ReportRetentionTest(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.store = ReportStore(self.output_dir, max_total_mb=1)
+        self.now = datetime(2026, 10, 19, 12, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def add_report(self, index, chart_bytes, html_size=1024):
+        """生成一份报告（HTML + 图表），第index份报告比第index-1份早一小时"""
+        created = self.now - timedelta(hours=index)
+        html_file = self.store.new_report_path("600000", created)
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write("x" * html_size)
+        chart_file = self.store.chart_path(chart_bytes)
+        record = {
+            'stock_code': "600000",
+            'stock_name': "测试股票",
+            'report_file': self.store.relative_path(html_file),
+            'chart_file': self.store.relative_path(chart_file),
+            'created_at': created.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        self.store.commit_report(record, chart_bytes)
+        return record
+
+    def test_capacity_counts_freed_chart_bytes(self):
+        # 图表占主要空间：5份报告各有一个300KB的图表，总计约1.5MB，上限1MB
+        records = [self.add_report(i, bytes([i]) * 300 * 1024) for i in range(5)]
+
+        self.store.apply_retention(now=self.now)
+
+        remaining = {record['report_file'] for record in load_report_manifest(self.output_dir)}
+        # 删除最旧的两份后即低于上限，不应删除全部报告
+        self.assertEqual(remaining, {record['report_file'] for record in records[:3]})
+        for record in records[3:]:
+            self.assertFalse(os.path.exists(os.path.join(self.output_dir, record['chart_file'])))
+        for record in records[:3]:
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, record['chart_file'])))
+
+    def test_shared_chart_is_freed_only_with_last_reference(self):
+        # 4份报告共享一个900KB的图表，HTML各100KB：删除部分报告只释放HTML的空间
+        shared_chart = b"c" * 900 * 1024
+        records = [self.add_report(i, shared_chart, html_size=100 * 1024) for i in range(4)]
+
+        self.store.apply_retention(now=self.now)
+
+        remaining = {record['report_file'] for record in load_report_manifest(self.output_dir)}
+        self.assertEqual(remaining, {records[0]['report_file']})
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, records[0]['chart_file'])))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime, date, timedelta, time as dt_time
+
+logger = logging.getLogger("TradingCalendar")
+
+# 交易时段名称
+SESSION_PRE_OPEN = "pre_open"          # 开盘集合竞价 09:15-09:30
+SESSION_CONTINUOUS = "continuous"      # 连续竞价 09:30-11:30、13:00-15:00
+SESSION_LUNCH_BREAK = "lunch_break"    # 午间休市 11:30-13:00
+SESSION_AFTER_HOURS = "after_hours"    # 盘后 15:00-18:00（公告、盘后新闻集中发布）
+SESSION_CLOSED = "closed"              # 夜间及非交易日
+
+# 交易日内的时段划分（开始时间, 结束时间, 时段），未覆盖的时间为 closed
+TRADING_DAY_SESSIONS = [
+    (dt_time(9, 15), dt_time(9, 30), SESSION_PRE_OPEN),
+    (dt_time(9, 30), dt_time(11, 30), SESSION_CONTINUOUS),
+    (dt_time(11, 30), dt_time(13, 0), SESSION_LUNCH_BREAK),
+    (dt_time(13, 0), dt_time(15, 0), SESSION_CONTINUOUS),
+    (dt_time(15, 0), dt_time(18, 0), SESSION_AFTER_HOURS)
+]
+
+MARKET_OPEN_TIME = dt_time(9, 15)
+
+class TradingCalendar:
+    def __init__(self, config_file="config.json"):
+        """
+        初始化A股交易日历
+
+        交易日列表从 akshare 获取并缓存到本地文件，获取失败时按周一至周五减去配置的节假日判断；
+        根据当前所处的交易时段（盘前、连续竞价、午间休市、盘后、休市）给出不同的轮询间隔
+
+        参数:
+        config_file: 配置文件路径，读取其中的 trading_calendar 部分
+        """
+        self.config = self._load_config(config_file)
+        self.cache_file = self.config["cache_file"]
+        self.holidays = set(self.config["holidays"])
+        self.prewarm_minutes = self.config["prewarm_minutes_before_open"]
+        self._trade_dates = None
+        self._last_trade_date = ""
+        self._last_refresh_day = None
+        self._lock = threading.Lock()
+
+    def _load_config(self, config_file):
+        """加载交易日历配置"""
+        calendar_config = self._get_default_config()
+        try:
+            if os.path.exists(config_file):
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    user_config = json.load(f).get("trading_calendar", {})
+                for key in ("pipeline_interval_minutes", "watcher_check_seconds"):
+                    calendar_config[key].update(user_config.pop(key, {}))
+                calendar_config.update(user_config)
+        except Exception as e:
+            logger.error(f"加载交易日历配置时出错: {str(e)}，使用默认配置")
+        return calendar_config
+
+    def _get_default_config(self):
+        """获取默认配置"""
+        return {
+            "cache_file": "data/trade_calendar.json",
+            "holidays": [],
+            "prewarm_minutes_before_open": 15,
+            "pipeline_interval_minutes": {
+                SESSION_PRE_OPEN: 1,
+                SESSION_CONTINUOUS: 1,
+                SESSION_LUNCH_BREAK: 5,
+                SESSION_AFTER_HOURS: 5,
+                SESSION_CLOSED: 30
+            },
+            "watcher_check_seconds": {
+                SESSION_PRE_OPEN: 10,
+                SESSION_CONTINUOUS: 15,
+                SESSION_LUNCH_BREAK: 60,
+                SESSION_AFTER_HOURS: 60,
+                SESSION_CLOSED: 600
+            }
+        }
+
+    def _set_trade_dates(self, trade_dates):
+        """设置交易日列表并记录最后一个交易日"""
+        self._trade_dates = set(trade_dates) or None
+        self._last_trade_date = max(self._trade_dates) if self._trade_dates else ""
+
+    def _load_trade_dates(self, today):
+        """
+        加载交易日列表：优先使用本地缓存，缓存不覆盖今天时从 akshare 重新获取（每天最多尝试一次）
+
+        返回:
+        交易日字符串集合（YYYY-MM-DD，可能不覆盖今天），无法获取时返回None
+        """
+        if self._last_trade_date >= today.isoformat():
+            return self._trade_dates
+
+        if self._trade_dates is None and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._set_trade_dates(json.load(f))
+                if self._last_trade_date >= today.isoformat():
+                    return self._trade_dates
+            except Exception as e:
+                logger.warning(f"读取交易日历缓存 {self.cache_file} 时出错: {str(e)}")
+
+        if self._last_refresh_day != today:
+            self._last_refresh_day = today
+            try:
+                import akshare as ak
+                trade_dates = ak.tool_trade_date_hist_sina()
+                self._set_trade_dates(str(value)[:10] for value in trade_dates['trade_date'])
+                cache_dir = os.path.dirname(self.cache_file)
+                if cache_dir:
+                    os.makedirs(cache_dir, exist_ok=True)
+                with open(self.cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(sorted(self._trade_dates or []), f)
+                logger.info(f"已更新交易日历，最后一个交易日为 {self._last_trade_date}")
+            except Exception as e:
+                logger.warning(f"获取交易日历失败: {str(e)}，按工作日判断交易日")
+
+        return self._trade_dates
+
+    def is_trading_day(self, day=None):
+        """
+        判断是否为交易日
+
+        参数:
+        day: date或datetime对象，默认为今天
+        """
+        day = day or date.today()
+        if isinstance(day, datetime):
+            day = day.date()
+        with self._lock:
+            trade_dates = self._load_trade_dates(date.today())
+        if trade_dates is not None and day.isoformat() <= self._last_trade_date:
+            return day.isoformat() in trade_dates
+        return day.weekday() < 5 and day.isoformat() not in self.holidays
+
+    def get_session(self, now=None):
+        """
+        获取当前所处的交易时段
+
+        返回:
+        时段名称（pre_open、continuous、lunch_break、after_hours、closed）
+        """
+        now = now or datetime.now()
+        if not self.is_trading_day(now):
+            return SESSION_CLOSED
+        current = now.time()
+        for start, end, session in TRADING_DAY_SESSIONS:
+            if start <= current < end:
+                return session
+        return SESSION_CLOSED
+
+    def is_market_hours(self, now=None):
+        """判断是否处于开盘集合竞价或连续竞价时段"""
+        return self.get_session(now) in (SESSION_PRE_OPEN, SESSION_CONTINUOUS)
+
+    def trading_day(self, now=None):
+        """
+        获取最近的交易日（今天是交易日时返回今天），可以用作行情数据缓存键
+
+        返回:
+        日期字符串，格式为 YYYY-MM-DD
+        """
+        day = (now or datetime.now()).date()
+        for _ in range(30):
+            if self.is_trading_day(day):
+                break
+            day -= timedelta(days=1)
+        return day.strftime('%Y-%m-%d')
+
+    def next_open(self, now=None):
+        """获取下一次开盘（集合竞价开始）的时间"""
+        now = now or datetime.now()
+        day = now.date()
+        if now.time() >= MARKET_OPEN_TIME:
+            day += timedelta(days=1)
+        for _ in range(30):
+            if self.is_trading_day(day):
+                break
+            day += timedelta(days=1)
+        return datetime.combine(day, MARKET_OPEN_TIME)
+
+    def _next_boundary(self, now):
+        """获取下一个时段切换的时间"""
+        if self.is_trading_day(now):
+            for start, end, _ in TRADING_DAY_SESSIONS:
+                for boundary in (start, end):
+                    moment = datetime.combine(now.date(), boundary)
+                    if moment > now:
+                        return moment
+        return self.next_open(now)
+
+    def should_prewarm(self, now=None):
+        """判断是否处于开盘前的缓存预热窗口（集合竞价前 prewarm_minutes 分钟至连续竞价开始）"""
+        now = now or datetime.now()
+        if not self.is_trading_day(now):
+            return False
+        open_time = datetime.combine(now.date(), MARKET_OPEN_TIME)
+        return open_time - timedelta(minutes=self.prewarm_minutes) <= now < open_time + timedelta(minutes=15)
+
+    def wait_seconds(self, intervals, now=None):
+        """
+        根据当前时段计算下次轮询前的等待时间（不会跨过时段切换，保证开盘时立即切换到较短的间隔）
+
+        参数:
+        intervals: 各时段的轮询间隔（秒）
+        now: 当前时间，默认为系统时间
+
+        返回:
+        等待秒数
+        """
+        now = now or datetime.now()
+        interval = intervals.get(self.get_session(now), intervals.get(SESSION_CLOSED, 60))
+        # 预热窗口内按盘前间隔轮询
+        if self.should_prewarm(now):
+            interval = min(interval, intervals.get(SESSION_PRE_OPEN, interval))
+        until_boundary = (self._next_boundary(now) - now).total_seconds()
+        prewarm_start = datetime.combine(self.next_open(now).date(), MARKET_OPEN_TIME) - timedelta(minutes=self.prewarm_minutes)
+        if prewarm_start > now:
+            until_boundary = min(until_boundary, (prewarm_start - now).total_seconds())
+        return max(min(interval, until_boundary), 1)
+
+    def pipeline_wait_seconds(self, now=None):
+        """数据处理流水线下次运行前的等待秒数"""
+        intervals = {session: minutes * 60 for session, minutes in self.config["pipeline_interval_minutes"].items()}
+        return self.wait_seconds(intervals, now)
+
+    def watcher_wait_seconds(self, now=None):
+        """新闻监视器下次主动检查前的等待秒数"""
+        return self.wait_seconds(self.config["watcher_check_seconds"], now)
+
+_calendar = None
+_calendar_lock = threading.Lock()
+
+def get_calendar(config_file="config.json"):
+    """获取进程内共享的交易日历（交易日列表只加载一次）"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = TradingCalendar(config_file)
+        return _calendar